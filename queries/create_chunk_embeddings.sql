@@ -1,8 +1,13 @@
-DROP TABLE IF EXISTS chunk_embeddings;
-CREATE TABLE chunk_embeddings (
+CREATE TABLE IF NOT EXISTS chunk_embeddings (
+    chunk_id VARCHAR,
     dossier_id VARCHAR,
     origin VARCHAR,
     index INTEGER,
+    start_offset INTEGER,
+    end_offset INTEGER,
     content TEXT,
-    embedding FLOAT[1536]
+    content_hash VARCHAR,
+    embedding FLOAT[$dimension] NOT NULL,
+    embedding_int8 TINYINT[$dimension],
+    embedding_bits BIT
 );
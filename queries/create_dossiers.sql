@@ -1,5 +1,4 @@
-DROP TABLE IF EXISTS $table_name;
-CREATE TABLE $table_name (
+CREATE TABLE IF NOT EXISTS $table_name (
     id TEXT PRIMARY KEY,
     titel TEXT,
     type TEXT,
@@ -0,0 +1,271 @@
+import asyncio
+import contextlib
+import json
+from collections.abc import AsyncIterator, Iterator
+from datetime import date
+from pathlib import Path
+
+import duckdb
+from pydantic import BaseModel, ValidationError
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from kwak.schemas.dossier import DossierChunk
+from kwak.services.cache.embeddings import QueryEmbeddingCache
+from kwak.services.completions.base import AbstractCompletion
+from kwak.services.database import DEFAULT_DB_PATH
+from kwak.services.embedding.base import AbstractEmbeddingProvider
+from kwak.services.factories import COMPLETION_REGISTRY, EMBEDDING_REGISTRY
+from kwak.services.rag.ingest import stored_dimension
+from kwak.services.rag.prompt import build_prompt
+from kwak.services.rag.quantize import Quantization
+from kwak.services.rag.retrieval import (
+    ChunkFilter,
+    SearchMode,
+    embed_query,
+    retrieve,
+)
+from kwak.services.rag.snapshot import db_mtime, load_snapshot
+
+
+class SearchRequest(BaseModel):
+    """Body of a /search request."""
+
+    query: str
+    provider: str = "openai"
+    top_k: int = 5
+    mode: SearchMode = "vector"
+    exact: bool = False
+    ef_search: int | None = None
+    quantization: Quantization = "none"
+    store: str = "duckdb"
+    cache: bool = True
+    type: str | None = None
+    start: date | None = None
+    end: date | None = None
+    min_budget: float | None = None
+    max_budget: float | None = None
+
+
+class AskRequest(SearchRequest):
+    """Body of an /ask request."""
+
+    model: str = "openai"
+
+
+class WarmState:
+    """Clients and an in-memory snapshot of the database, shared by requests.
+
+    The snapshot is swapped for a fresh one whenever the database file changes;
+    requests already running keep using the snapshot they started with, which
+    is closed when the last of them finishes. The query-embedding cache stays
+    open for the lifetime of the service.
+    """
+
+    def __init__(self, db_path: Path, poll_interval: float) -> None:
+        """Prepare the state; the snapshot is loaded by `reload`."""
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.con: duckdb.DuckDBPyConnection | None = None
+        # Requests running per snapshot, including replaced ones not closed yet
+        self.users: dict[duckdb.DuckDBPyConnection, int] = {}
+        self.cache: QueryEmbeddingCache | None = None
+        self.mtime = 0.0
+        self.dimension: int | None = None
+        self.embedders: dict[tuple[str, int | None], AbstractEmbeddingProvider] = {}
+        self.completions: dict[str, AbstractCompletion] = {}
+
+    def embedder(self, provider: str) -> AbstractEmbeddingProvider:
+        """Return the warm embedder for a provider, creating it on first use.
+
+        Queries are embedded at the dimension the snapshot's chunks are stored in.
+        """
+        if provider not in EMBEDDING_REGISTRY:
+            msg = f"Unsupported embedding provider: {provider}"
+            raise ValueError(msg)
+        key = (provider, self.dimension)
+        if key not in self.embedders:
+            self.embedders[key] = EMBEDDING_REGISTRY[provider](
+                dimensions=self.dimension
+            )
+        return self.embedders[key]
+
+    def completion(self, model: str) -> AbstractCompletion:
+        """Return the warm completion client for a model."""
+        if model not in COMPLETION_REGISTRY:
+            msg = f"Unsupported completion model: {model}"
+            raise ValueError(msg)
+        if model not in self.completions:
+            self.completions[model] = COMPLETION_REGISTRY[model]()
+        return self.completions[model]
+
+    async def reload(self) -> None:
+        """Load a new snapshot if the database changed since the last one."""
+        mtime = db_mtime(self.db_path)
+        if self.con is not None and mtime == self.mtime:
+            return
+        try:
+            con = await asyncio.to_thread(load_snapshot, self.db_path)
+        except duckdb.Error:
+            # A writer holds the file, or it is not populated yet: retry next poll.
+            return
+        old, self.con, self.mtime = self.con, con, mtime
+        self.dimension = stored_dimension(con)
+        if old is not None and not self.users.get(old):
+            old.close()
+
+    async def open(self) -> None:
+        """Load the first snapshot and open the query-embedding cache."""
+        await self.reload()
+        try:
+            self.cache = await asyncio.to_thread(QueryEmbeddingCache)
+        except duckdb.IOException:
+            # Another process holds the cache file; queries are embedded directly.
+            self.cache = None
+
+    def close(self) -> None:
+        """Close the current snapshot and the query-embedding cache."""
+        if self.con is not None and not self.users.get(self.con):
+            self.con.close()
+        self.con = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    @contextlib.contextmanager
+    def snapshot(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """Lend the current snapshot to a request.
+
+        A snapshot replaced while requests still use it is closed once the last
+        of them returns it.
+        """
+        if self.con is None:
+            msg = f"No snapshot of {self.db_path} loaded yet"
+            raise RuntimeError(msg)
+        con = self.con
+        self.users[con] = self.users.get(con, 0) + 1
+        try:
+            yield con
+        finally:
+            self.users[con] -= 1
+            if not self.users[con]:
+                del self.users[con]
+                if con is not self.con:
+                    con.close()
+
+    async def watch(self) -> None:
+        """Reload the snapshot whenever the database file changes."""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.reload()
+
+    async def search(self, request: SearchRequest) -> list[DossierChunk]:
+        """Run retrieval for a request against the current snapshot."""
+        with self.snapshot() as con:
+            embedding = None
+            if request.mode != "keyword":
+                embedding = await embed_query(
+                    self.embedder(request.provider),
+                    request.query,
+                    use_cache=request.cache and self.cache is not None,
+                    cache=self.cache,
+                )
+
+            filters = ChunkFilter(
+                type=request.type,
+                start=request.start,
+                end=request.end,
+                min_budget=request.min_budget,
+                max_budget=request.max_budget,
+            )
+            # Every request gets its own cursor, so queries can run in parallel
+            with con.cursor() as cursor:
+                return await asyncio.to_thread(
+                    retrieve,
+                    cursor,
+                    request.query,
+                    embedding,
+                    request.top_k,
+                    exact=request.exact,
+                    ef_search=request.ef_search,
+                    filters=filters,
+                    mode=request.mode,
+                    quantization=request.quantization,
+                    store=request.store,
+                )
+
+
+def error_response(error: Exception) -> JSONResponse:
+    """Map a request error to a JSON response with a matching status code.
+
+    Invalid bodies give 422, unsupported providers or models 400, as do queries
+    the snapshot cannot answer, e.g. for an index it lacks. Requests arriving
+    before the first snapshot is loaded give 503, as do database failures such
+    as I/O errors or running out of memory.
+    """
+    if isinstance(error, ValidationError):
+        return JSONResponse(
+            {"error": json.loads(error.json(include_url=False))}, status_code=422
+        )
+    invalid = isinstance(error, ValueError | duckdb.ProgrammingError)
+    status_code = 400 if invalid else 503
+    return JSONResponse({"error": str(error)}, status_code=status_code)
+
+
+def create_app(
+    db_path: Path = DEFAULT_DB_PATH, poll_interval: float = 2.0
+) -> Starlette:
+    """Create the HTTP service exposing /search and /ask over a warm snapshot.
+
+    Run it with `kwak serve`, or `uvicorn --factory kwak.api.app:create_app`.
+    """
+    state = WarmState(db_path, poll_interval)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(_: Starlette) -> AsyncIterator[None]:
+        await state.open()
+        watcher = asyncio.create_task(state.watch())
+        try:
+            yield
+        finally:
+            watcher.cancel()
+            state.close()
+
+    async def search(request: Request) -> JSONResponse:
+        try:
+            body = SearchRequest.model_validate_json(await request.body())
+            results = await state.search(body)
+        except (ValueError, RuntimeError, duckdb.Error) as e:
+            return error_response(e)
+
+        return JSONResponse({"chunks": [c.model_dump(mode="json") for c in results]})
+
+    async def ask(request: Request) -> JSONResponse:
+        try:
+            body = AskRequest.model_validate_json(await request.body())
+            completion = state.completion(body.model)
+            results = await state.search(body)
+        except (ValueError, RuntimeError, duckdb.Error) as e:
+            return error_response(e)
+
+        answer = None
+        if results:
+            prompt = build_prompt(body.query, results)
+            answer = await asyncio.to_thread(completion.complete, prompt)
+
+        return JSONResponse(
+            {
+                "answer": answer,
+                "chunks": [c.model_dump(mode="json") for c in results],
+            }
+        )
+
+    return Starlette(
+        routes=[
+            Route("/search", search, methods=["POST"]),
+            Route("/ask", ask, methods=["POST"]),
+        ],
+        lifespan=lifespan,
+    )
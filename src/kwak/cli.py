@@ -1,26 +1,148 @@
 import asyncio
+import contextlib
 import json
+import time
+from collections.abc import AsyncIterator, Iterator
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
+from typing import TYPE_CHECKING, cast, get_args
 
 import duckdb
 import typer
 from rich.console import Console
+from rich.live import Live
 from rich.progress import Progress
-
-from kwak.schemas.dossier import DossierChunk, SubsidieDossier
-from kwak.services.chunkers.semantic import SemanticChunker
+from rich.table import Table
+from rich.text import Text
+
+from kwak.schemas.dossier import ChunkRecord, SubsidieDossier
+from kwak.schemas.questions import Answer, Question
+from kwak.services.bench import (
+    BenchConfig,
+    Distribution,
+    compare,
+    run_benchmark,
+    slower_quantized_scans,
+)
+from kwak.services.cache.answers import AnswerCache
+from kwak.services.cache.base import DEFAULT_CACHE_PATH
+from kwak.services.cache.chunks import SemanticChunkCache
+from kwak.services.cache.embeddings import QueryEmbeddingCache
+from kwak.services.chunkers.sentence import SentenceChunker
 from kwak.services.chunkers.word_count import WordCountChunker
+from kwak.services.completions.base import AbstractCompletion
+from kwak.services.database import DATABASE, DEFAULT_DB_PATH, DatabaseSettings
+from kwak.services.embedding.base import MAX_REQUEST_TOKENS, BatchPolicy
 from kwak.services.factories import (
     COMPLETION_REGISTRY,
     EMBEDDING_REGISTRY,
     GENERATOR_REGISTRY,
+    VECTOR_STORE_REGISTRY,
+)
+from kwak.services.generators.base import GenerationPolicy
+from kwak.services.rag.batch import answer_batch
+from kwak.services.rag.context import Context, ContextPolicy, assemble_context
+from kwak.services.rag.index import (
+    create_fts_index,
+    has_fts_index,
+    measure_recall,
+)
+from kwak.services.rag.ingest import (
+    MAX_HEADER_TOKENS,
+    embedded_chunks,
+    export_chunk_embeddings,
+    import_chunk_embeddings,
+    ingest_dossiers,
+    stored_dimension,
+    sync_chunk_embeddings,
 )
-from kwak.services.rag.retrieval import search_chunks
-from kwak.utils.files import append_jsonl, load_jsonl, overwrite_jsonl
+from kwak.services.rag.prompt import render_prompt
+from kwak.services.rag.quantize import Quantization
+from kwak.services.rag.retrieval import ChunkFilter, SearchMode, search_chunks
+from kwak.services.vectorstores.base import AbstractVectorStore, StorePolicy
+from kwak.utils.files import append_jsonl, awrite_jsonl, iter_jsonl
+from kwak.utils.tracing import TRACER
+
+if TYPE_CHECKING:
+    from kwak.services.chunkers.base import AbstractChunker
 
 app = typer.Typer(help="🦆 kwak: A RAG-ready CLI for subsidiedossiers")
+cache_app = typer.Typer(help="Inspect and clear the persistent caches")
+app.add_typer(cache_app, name="cache")
 console = Console()
 
+CACHES = {
+    "answers": AnswerCache,
+    "query-embeddings": QueryEmbeddingCache,
+    "semantic-chunks": SemanticChunkCache,
+}
+DEFAULT_PROFILE_PATH = Path("data/profile/trace.json")
+
+
+@app.callback()
+def main(  # noqa: PLR0913
+    ctx: typer.Context,
+    profile: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--profile",
+        help="Time pipeline stages and print a summary when the command ends",
+    ),
+    profile_output: Path = typer.Option(  # noqa: B008
+        DEFAULT_PROFILE_PATH, help="Where --profile writes its Chrome trace"
+    ),
+    db: Path = typer.Option(  # noqa: B008
+        DEFAULT_DB_PATH, envvar="KWAK_DB", help="DuckDB database file"
+    ),
+    db_threads: int | None = typer.Option(
+        None, envvar="KWAK_DB_THREADS", help="DuckDB worker threads"
+    ),
+    db_memory_limit: str | None = typer.Option(
+        None, envvar="KWAK_DB_MEMORY_LIMIT", help="DuckDB memory limit, e.g. 4GB"
+    ),
+    db_temp_directory: Path | None = typer.Option(  # noqa: B008
+        None,
+        envvar="KWAK_DB_TEMP_DIRECTORY",
+        help="Where DuckDB spills work that does not fit in memory",
+    ),
+) -> None:
+    """🦆 kwak: A RAG-ready CLI for subsidiedossiers."""
+    DATABASE.configure(
+        DatabaseSettings(db, db_threads, db_memory_limit, db_temp_directory)
+    )
+    ctx.call_on_close(DATABASE.close)
+    if profile:
+        TRACER.enable()
+        ctx.call_on_close(lambda: print_profile(profile_output))
+
+
+def print_profile(path: Path) -> None:
+    """Print the time and counters spent per traced stage, and write the trace."""
+    if not TRACER.spans:
+        return
+    table = Table(
+        "Stage", "Calls", "Total (s)", "Max (s)", "Tokens", "Rows scanned", "Bytes"
+    )
+    for s in TRACER.summary():
+        counters = dict(s.counters)
+        counters["tokens"] = sum(
+            counters.pop(key, 0)
+            for key in ("tokens", "prompt_tokens", "completion_tokens")
+        )
+        table.add_row(
+            s.name,
+            str(s.count),
+            f"{s.total:.3f}",
+            f"{s.max:.3f}",
+            *(
+                f"{counters[key]:,.0f}" if counters.get(key) else ""
+                for key in ("tokens", "rows_scanned", "bytes")
+            ),
+        )
+    console.print(table)
+    TRACER.write_chrome_trace(path)
+    console.print(f"⏱️ Wrote trace to {path} (open it in chrome://tracing or Perfetto)")
+
 
 @app.command()
 def say(word: str) -> None:
@@ -38,35 +160,46 @@ def generate_data(  # noqa: PLR0913
     output: Path = typer.Option(  # noqa: B008
         Path("data/generated/subsidiedossiers.jsonl"), help="Output file path"
     ),
+    concurrency: int = typer.Option(4, help="Maximum generations in flight"),
+    timeout: float = typer.Option(300.0, help="Seconds before a generation times out"),
+    retries: int = typer.Option(3, help="Retries per failed generation"),
 ) -> None:
     """Generate synthetic subsidiedossiers."""
     if model not in GENERATOR_REGISTRY:
         raise typer.BadParameter(f"Unsupported model: {model}")  # noqa: EM102, TRY003
 
-    generator = GENERATOR_REGISTRY[model]()
+    policy = GenerationPolicy(
+        max_concurrency=concurrency, timeout=timeout, max_retries=retries
+    )
+    generator = GENERATOR_REGISTRY[model](policy=policy)
 
-    dossiers: list[SubsidieDossier] = []
+    errors: list[Exception] = []
+    written = 0
 
     async def generate_all() -> None:
+        nonlocal written
         with Progress() as progress:
             task = progress.add_task("Generating dossiers...", total=count)
-            for _ in range(count):
-                dossier = await generator.generate(type_, start_year, end_year)
-                dossiers.append(dossier)
+            async for dossier in generator.generate_many(
+                count, type_, start_year, end_year, on_error=errors.append
+            ):
+                # Append each dossier as soon as it is done, so a crash keeps it
+                append_jsonl(output, [dossier])
+                written += 1
                 progress.advance(task)
 
     asyncio.run(generate_all())
 
-    output.parent.mkdir(parents=True, exist_ok=True)
-    append_jsonl(output, dossiers)
-
-    console.print(f"✅ [green]Successfully wrote {count} dossiers to {output}[/green]")
+    for e in errors:
+        console.print(f"[yellow]⚠️ Generation failed:[/yellow] {e}")
+    console.print(
+        f"✅ [green]Successfully wrote {written} dossiers to {output}[/green]"
+    )
 
 
 @app.command()
 def updatedb() -> None:
     """Update the database with the latest data."""
-    db_path = "data/kwak.db"
     jsonl_path = Path("data/generated/subsidiedossiers.jsonl")
     table_name = "dossiers"
 
@@ -74,42 +207,81 @@ def updatedb() -> None:
         console.print(f"[red]❌ JSONL file not found at {jsonl_path}[/red]")
         raise typer.Exit
 
-    # Recreate table
-    with Path("queries/create_dossiers.sql").open() as qf:
-        create_stmt = qf.read().replace("$table_name", table_name)
-
-    with duckdb.connect(db_path) as con:
-        con.execute(create_stmt)
+    with DATABASE.writer() as con:
         console.print(f"📥 Inserting data from {jsonl_path.name}...")
+        try:
+            report = ingest_dossiers(con, jsonl_path, table_name=table_name)
+        except (ValueError, duckdb.Error) as e:
+            console.print(f"[red]❌ Ingest failed:[/red] {e}")
+            raise typer.Exit(code=1) from None
+
+        console.print("🗂️ Building full-text index...")
+        try:
+            create_fts_index(con, table_name, "id", "id", "titel")
+        except duckdb.Error as e:
+            console.print(f"[yellow]⚠️ Skipping full-text index:[/yellow] {e}")
 
-        # Read JSONL
-        records = load_jsonl(
-            Path("data/generated/subsidiedossiers.jsonl"), model=SubsidieDossier
+    console.print(
+        f"✅ [green]Inserted {report.inserted} dossiers, "
+        f"updated {report.updated}[/green]"
+    )
+
+
+def select_dossiers(range_: str, skipped: list[int]) -> Iterator[SubsidieDossier]:
+    """Stream the generated dossiers in range, recording malformed line numbers."""
+    dossiers_path = Path("data/generated/subsidiedossiers.jsonl")
+    selected: Iterator[SubsidieDossier]
+
+    if range_ == "all":
+        # If the user specified "all", include all dossiers
+        selected = iter_jsonl(dossiers_path, SubsidieDossier, on_skip=skipped.append)
+
+    elif range_.startswith("first:"):
+        # If the range starts with "first:", extract the number after the colon
+        # and stop reading after the first N dossiers
+        n = int(range_.split(":")[1])
+        selected = islice(
+            iter_jsonl(dossiers_path, SubsidieDossier, on_skip=skipped.append), n
         )
 
-        # Convert dates from string to ISO for DuckDB
-        rows = [
-            (
-                r.id,
-                r.titel,
-                r.type,
-                r.startdatum,
-                r.einddatum,
-                r.goedgekeurd_budget,
-                r.omschrijving,
-                r.advies,
-            )
-            for r in records
-        ]
+    elif range_.startswith("last:"):
+        # If the range starts with "last:", extract the number after the colon
+        # and read only the last N lines of the file
+        n = int(range_.split(":")[1])
+        selected = iter_jsonl(
+            dossiers_path, SubsidieDossier, last=n, on_skip=skipped.append
+        )
+    else:
+        console.print("[red]❌ Invalid range. Use 'all', 'first:N' of 'last:N'.[/red]")
+        raise typer.Exit(code=1)
+
+    return selected
 
-        con.executemany(
-            f"""INSERT INTO {table_name} VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",  # noqa: S608
-            rows,
+
+def sentence_chunker(
+    max_tokens: int, overlap: int, workers: int | None, provider: str
+) -> SentenceChunker:
+    """Build a SentenceChunker whose chunks fit the provider's input limit."""
+    if provider not in EMBEDDING_REGISTRY:
+        console.print(f"[red]❌ Unsupported embedding provider: {provider}[/red]")
+        raise typer.Exit(code=1)
+    limit = EMBEDDING_REGISTRY[provider].max_input_tokens - MAX_HEADER_TOKENS
+    if max_tokens > limit:
+        console.print(
+            f"[red]❌ {provider} embeds at most {limit} tokens per chunk "
+            "next to the dossier header; lower --max-tokens.[/red]"
         )
+        raise typer.Exit(code=1)
+
+    try:
+        return SentenceChunker(max_tokens, overlap, workers)
+    except ValueError as e:
+        console.print(f"[red]❌ {e}[/red]")
+        raise typer.Exit(code=1) from None
 
 
 @app.command()
-def chunk_data(
+def chunk_data(  # noqa: C901, PLR0913
     range: str = typer.Option(  # noqa: A002
         "all",
         help="Which jsonl objects to parse: 'all', 'first:N' of 'last:N'",
@@ -118,127 +290,350 @@ def chunk_data(
         "semantic",
         "--strategy",
         "-s",
-        help="Chunking strategy: 'semantic' (LLM) of 'wordcount' (naïef)",
+        help="Chunking strategy: 'semantic' (LLM), 'sentence' (snel) of 'wordcount'",
+    ),
+    concurrency: int = typer.Option(8, help="Semantic: maximum LLM requests in flight"),
+    cache: bool = typer.Option(  # noqa: FBT001
+        True,  # noqa: FBT003
+        help="Semantic: reuse cached chunkings of unchanged texts",
+    ),
+    max_tokens: int = typer.Option(256, help="Sentence: maximum tokens per chunk"),
+    overlap: int = typer.Option(
+        32, help="Sentence: tokens of sentences repeated between chunks"
+    ),
+    workers: int | None = typer.Option(
+        None, help="Sentence: worker processes (default: one per CPU core)"
+    ),
+    provider: str = typer.Option(
+        "openai", help="Sentence: embedding provider whose input limit applies"
     ),
 ) -> None:
     """Split dossiers into semantic chunks and store them as JSONL."""
-    chunker: SemanticChunker | WordCountChunker
-    if strategy == "semantic":
-        chunker = SemanticChunker()
-    elif strategy == "wordcount":
-        chunker = WordCountChunker()
-    else:
+    if strategy not in ("semantic", "sentence", "wordcount"):
         console.print(
-            "[red]❌ Invalid strategy. Choose 'semantic' or 'wordcount'.[/red]"
+            "[red]❌ Invalid strategy. Choose 'semantic', 'sentence' or "
+            "'wordcount'.[/red]"
         )
         raise typer.Exit(code=1)
+    skipped: list[int] = []
+    selected = select_dossiers(range, skipped)
 
-    dossiers = load_jsonl(
-        Path("data/generated/subsidiedossiers.jsonl"), model=SubsidieDossier
-    )
+    chunk_cache = None
+    if strategy == "semantic" and cache:
+        try:
+            chunk_cache = SemanticChunkCache()
+        except duckdb.IOException:
+            console.print("[yellow]⚠️ Chunk cache in use; chunking without it[/yellow]")
 
-    if range == "all":
-        # If the user specified "all", include all dossiers
-        selected = dossiers
-
-    elif range.startswith("first:"):
-        # If the range starts with "first:", extract the number after the colon
-        # and select the first N dossiers from the list
-        n = int(range.split(":")[1])
-        selected = dossiers[:n]
+    chunker: AbstractChunker
+    if strategy == "semantic":
+        # Imported here, as the LLM SDKs it needs take seconds to load
+        from kwak.services.chunkers.semantic import SemanticChunker
 
-    elif range.startswith("last:"):
-        # If the range starts with "last:", extract the number after the colon
-        # and select the last N dossiers from the list
-        n = int(range.split(":")[1])
-        selected = dossiers[-n:]
+        chunker = SemanticChunker(max_concurrency=concurrency, cache=chunk_cache)
+    elif strategy == "sentence":
+        chunker = sentence_chunker(max_tokens, overlap, workers, provider)
     else:
-        console.print("[red]❌ Invalid range. Use 'all', 'first:N' of 'last:N'.[/red]")
-        raise typer.Exit(code=1)
+        chunker = WordCountChunker()
+
+    dossier_count = 0
 
-    all_chunks = []
-    for dossier in selected:
-        chunks = list(chunker.chunk(dossier))
-        all_chunks.extend(chunks)
+    async def chunks() -> AsyncIterator[ChunkRecord]:
+        """Chunk the selected dossiers concurrently while counting them."""
+        nonlocal dossier_count
+        async for dossier_chunks in chunker.chunk_many(selected):
+            dossier_count += 1
+            for chunk in dossier_chunks:
+                yield chunk
 
-    overwrite_jsonl(Path("data/chunks/subsidiedossierchunks.jsonl"), all_chunks)
+    try:
+        chunk_count = asyncio.run(
+            awrite_jsonl(Path("data/chunks/subsidiedossierchunks.jsonl"), chunks())
+        )
+    finally:
+        if chunk_cache is not None:
+            chunk_cache.close()
+
+    if skipped:
+        console.print(f"[yellow]⚠️ Skipped {len(skipped)} malformed dossiers[/yellow]")
     console.print(
-        f"✅ [green]Chunked {len(selected)} dossiers into {len(all_chunks)} \
+        f"✅ [green]Chunked {dossier_count} dossiers into {chunk_count} \
             chunks[/green]"
     )
 
 
+def build_indexes(
+    con: duckdb.DuckDBPyConnection,
+    vector_store: AbstractVectorStore,
+    *,
+    changed: bool,
+) -> None:
+    """Build the vector store and chunk full-text index if stale or missing."""
+    if changed or not vector_store.is_built():
+        console.print(f"🗂️ Building {vector_store.name} vector store...")
+        try:
+            vector_store.build()
+        except duckdb.Error as e:
+            console.print(f"[yellow]⚠️ Skipping vector store:[/yellow] {e}")
+
+    if changed or not has_fts_index(con, "chunk_embeddings"):
+        console.print("🗂️ Building full-text index...")
+        try:
+            create_fts_index(con, "chunk_embeddings", "chunk_id", "content")
+        except duckdb.Error as e:
+            console.print(f"[yellow]⚠️ Skipping full-text index:[/yellow] {e}")
+
+
 @app.command()
-def embed_chunks(
-    provider: str = typer.Option("openai", help="Embedding provider: openai or ollama"),
+def embed_chunks(  # noqa: PLR0913
+    provider: str = typer.Option(
+        "openai", help="Embedding provider: openai, ollama or local"
+    ),
     show: bool = typer.Option(False, help="Print embeddings to terminal"),  # noqa: FBT001, FBT003
+    index: bool = typer.Option(True, help="Build the vector store and full-text index"),  # noqa: FBT001, FBT003
+    store: str = typer.Option(
+        "duckdb", help="Vector store: duckdb (HNSW index) or numpy (memory-mapped)"
+    ),
+    hnsw_m: int = typer.Option(16, help="HNSW: max neighbours per node (M)"),
+    hnsw_ef_construction: int = typer.Option(
+        128, help="HNSW: candidate list size while building (ef_construction)"
+    ),
+    batch_size: int = typer.Option(2048, help="Maximum texts per embedding request"),
+    batch_tokens: int = typer.Option(
+        MAX_REQUEST_TOKENS, help="Maximum (estimated) tokens per embedding request"
+    ),
+    concurrency: int = typer.Option(4, help="Maximum embedding requests in flight"),
+    dimensions: int | None = typer.Option(
+        None, help="Store shortened (Matryoshka) vectors of this many dimensions"
+    ),
 ) -> None:
-    """Generate vector embeddings for each chunk and print or store them."""
+    """Generate vector embeddings for each chunk and print or store them.
+
+    Every vector is also stored int8- and binary-quantized, for the compact
+    scans of `kwak ask --quantization`.
+    """
     if provider not in EMBEDDING_REGISTRY:
         console.print(f"[red]❌ Unsupported embedding provider: {provider}[/red]")
         raise typer.Exit
+    if store not in VECTOR_STORE_REGISTRY:
+        console.print(f"[red]❌ Unsupported vector store: {store}[/red]")
+        raise typer.Exit(code=1)
 
-    embedder = EMBEDDING_REGISTRY[provider]()
+    policy = BatchPolicy(
+        max_items=batch_size, max_tokens=batch_tokens, max_concurrency=concurrency
+    )
+    try:
+        embedder = EMBEDDING_REGISTRY[provider](policy=policy, dimensions=dimensions)
+    except ValueError as e:
+        console.print(f"[red]❌ {e}[/red]")
+        raise typer.Exit(code=1) from None
+
+    skipped: list[int] = []
+    chunks = iter_jsonl(
+        Path("data/chunks/subsidiedossierchunks.jsonl"),
+        ChunkRecord,
+        on_skip=skipped.append,
+    )
 
-    chunks: list[DossierChunk] = load_jsonl(
-        Path("data/chunks/subsidiedossierchunks.jsonl"), model=DossierChunk
+    store_policy = StorePolicy(hnsw_m=hnsw_m, hnsw_ef_construction=hnsw_ef_construction)
+    with DATABASE.writer() as con, Progress() as progress:
+        # Checked before embedding, as a failed command discards its writes
+        try:
+            vector_store = VECTOR_STORE_REGISTRY[store](con, store_policy)
+        except ValueError as e:
+            progress.stop()
+            console.print(f"[red]❌ {e}[/red]")
+            raise typer.Exit(code=1) from None
+
+        task = progress.add_task(f"🔢 Generating embeddings using {provider}...")
+        report = asyncio.run(
+            sync_chunk_embeddings(
+                con,
+                chunks,
+                embedder,
+                on_start=lambda n: progress.update(task, total=n),
+                on_batch=lambda n: progress.advance(task, n),
+                complete=lambda: not skipped,
+            )
+        )
+        progress.stop()
+
+        if show:
+            for content, head, dimension in embedded_chunks(con):
+                console.print("\n[bold]Chunk:[/bold]", content[:100])
+                console.print(
+                    "[blue]Vector:[/blue]",
+                    json.dumps(head) + f"... ({dimension} dims)",
+                )
+
+        if index:
+            build_indexes(con, vector_store, changed=report.changed)
+
+    if skipped:
+        console.print(f"[yellow]⚠️ Skipped {len(skipped)} malformed chunks[/yellow]")
+    if report.kept:
+        console.print(
+            f"[yellow]⚠️ Kept {report.kept} stored chunks missing from the "
+            "incomplete chunk file[/yellow]"
+        )
+    console.print(
+        f"✅ [green]Embedded {report.new} new chunks, reused {report.reused}, "
+        f"removed {report.removed}[/green]"
     )
-    texts = [chunk.content for chunk in chunks]
 
-    console.print(f"🔢 Generating embeddings using {provider}...")
-    embeddings = asyncio.run(embedder.embed(texts))
 
-    if not embeddings or len(embeddings) != len(chunks):
-        console.print("[red]❌ Embedding mismatch or failure[/red]")
-        raise typer.Exit
+@app.command()
+def export_embeddings(
+    output: Path = typer.Argument(  # noqa: B008
+        Path("data/embeddings/chunk_embeddings.parquet"),
+        help="Parquet file to write the embedded chunks to",
+    ),
+) -> None:
+    """Export the embedded chunks and their vectors to a Parquet file."""
+    try:
+        with DATABASE.reader() as con:
+            count = export_chunk_embeddings(con, output)
+    except duckdb.Error as e:
+        console.print(f"[red]❌ Export failed:[/red] {e}")
+        raise typer.Exit(code=1) from None
+    console.print(f"✅ [green]Exported {count} chunk embeddings to {output}[/green]")
+
+
+@app.command()
+def import_embeddings(
+    input_path: Path = typer.Argument(  # noqa: B008
+        ..., help="Parquet file written by export-embeddings"
+    ),
+    index: bool = typer.Option(True, help="Build the vector store and full-text index"),  # noqa: FBT001, FBT003
+    store: str = typer.Option(
+        "duckdb", help="Vector store: duckdb (HNSW index) or numpy (memory-mapped)"
+    ),
+) -> None:
+    """Import embedded chunks from Parquet, replacing chunks with the same id."""
+    if store not in VECTOR_STORE_REGISTRY:
+        console.print(f"[red]❌ Unsupported vector store: {store}[/red]")
+        raise typer.Exit(code=1)
+    if not input_path.exists():
+        console.print(f"[red]❌ Parquet file not found at {input_path}[/red]")
+        raise typer.Exit(code=1)
+
+    with DATABASE.writer() as con:
+        try:
+            vector_store = VECTOR_STORE_REGISTRY[store](con)
+            count = import_chunk_embeddings(con, input_path)
+        except (ValueError, duckdb.Error) as e:
+            console.print(f"[red]❌ Import failed:[/red] {e}")
+            raise typer.Exit(code=1) from None
+
+        if index:
+            build_indexes(con, vector_store, changed=count > 0)
+
+    console.print(f"✅ [green]Imported {count} chunk embeddings[/green]")
 
-    dim = len(embeddings[0])
-    for i, vector in enumerate(embeddings):
-        if len(vector) != dim:
-            console.print(f"[red]❌ Inconsistent embedding length at index {i}[/red]")
-            raise typer.Exit
-
-    # Prepare table if not exists
-    with Path("queries/create_chunk_embeddings.sql").open() as f:
-        create_stmt = f.read()
-
-    db_path = "data/kwak.db"
-    with duckdb.connect(db_path) as con:
-        con.execute(create_stmt)
-
-        rows = [
-            (
-                chunk.dossier_id,
-                chunk.origin,
-                idx,
-                chunk.content,
-                vector,
-            )
-            for idx, (chunk, vector) in enumerate(zip(chunks, embeddings, strict=False))
-        ]
 
-        con.executemany(
-            "INSERT INTO chunk_embeddings VALUES (?, ?, ?, ?, ?)",
-            rows,
+@app.command()
+def index_recall(
+    sample: int = typer.Option(100, help="Number of stored chunks used as queries"),
+    top_k: int = typer.Option(10, help="Number of neighbours compared per query"),
+    ef_search: int | None = typer.Option(
+        None, help="HNSW: candidate list size while searching (ef_search)"
+    ),
+    quantization: str = typer.Option(
+        "none", help="Measure the 'int8' or 'binary' rescored scan instead of HNSW"
+    ),
+) -> None:
+    """Measure recall@k of approximate search against a brute-force scan."""
+    if quantization not in get_args(Quantization):
+        console.print(
+            "[red]❌ Invalid quantization. Choose 'none', 'int8' or 'binary'.[/red]"
         )
+        raise typer.Exit(code=1)
 
-    if show:
-        for chunk, vector in zip(chunks, embeddings, strict=False):
-            console.print("\n[bold]Chunk:[/bold]", chunk.content[:100])
-            console.print(
-                "[blue]Vector:[/blue]",
-                json.dumps(vector[:5]) + f"... ({len(vector)} dims)",
+    with DATABASE.reader() as con:
+        try:
+            recall = measure_recall(
+                con,
+                sample_size=sample,
+                top_k=top_k,
+                ef_search=ef_search,
+                quantization=cast("Quantization", quantization),
             )
+        except ValueError as e:
+            console.print(f"[red]❌ {e}[/red]")
+            raise typer.Exit(code=1) from None
+
+    console.print(f"🎯 recall@{top_k}: [bold]{recall:.3f}[/bold] ({sample} queries)")
+
+
+async def stream_answer(
+    completion: AbstractCompletion, prompt: str
+) -> tuple[str, float | None, float]:
+    """Render the answer live as it streams in.
+
+    Returns the answer, the seconds until the first token arrived (None if
+    none did) and the seconds until the answer was complete.
+    """
+    start = time.perf_counter()
+    first_token = None
+    answer = Text()
+    with Live(answer, console=console, refresh_per_second=15):
+        async for token in completion.stream(prompt):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            answer.append(token)
+    if not console.is_terminal:
+        # Live only ends its output with a newline on terminals
+        console.line()
+    return answer.plain, first_token, time.perf_counter() - start
+
+
+def print_answer(
+    completion: AbstractCompletion,
+    query: str,
+    context: Context,
+    *,
+    use_cache: bool,
+) -> None:
+    """Print the answer to query from the answer cache, or stream it live."""
+    answer_cache = None
+    if use_cache:
+        # Another process may hold the cache file; answer without it then.
+        with contextlib.suppress(duckdb.IOException):
+            answer_cache = AnswerCache()
+
+    try:
+        key = (
+            answer_cache.key_for(completion, query, context.text)
+            if answer_cache
+            else ""
+        )
+        cached = answer_cache.get(key) if answer_cache else None
+        if cached is not None:
+            console.print(Text(cached))
+            console.print("[dim]⚡ Answer served from cache[/dim]")
+            return
+
+        answer, first_token, total = asyncio.run(
+            stream_answer(completion, render_prompt(query, context.text))
+        )
+        if answer_cache and answer:
+            answer_cache.put(key, answer)
+    finally:
+        if answer_cache:
+            answer_cache.close()
 
-    # Optional: store in DuckDB later
-    console.print(f"✅ [green]Generated {len(embeddings)} embeddings[/green]")
+    if first_token is not None:
+        console.print(
+            f"[dim]⏱️ First token after {first_token:.2f}s, "
+            f"answer complete after {total:.2f}s[/dim]"
+        )
 
 
 @app.command("ask")
-def ask(
+def ask(  # noqa: PLR0913
     query: str = typer.Argument(..., help="Your search query"),
     provider: str = typer.Option(
-        "openai", help="Embedding provider (openai or ollama)"
+        "openai", help="Embedding provider (openai, ollama or local)"
     ),
     top_k: int = typer.Option(5, help="Number of top results to return"),
     show: bool = typer.Option(  # noqa: FBT001
@@ -248,12 +643,84 @@ def ask(
     model: str = typer.Option(
         "openai", help="LLM to use for answering (openai or ollama)"
     ),
+    exact: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        help="Bypass the HNSW index and scan all chunks (brute force)",
+    ),
+    ef_search: int | None = typer.Option(
+        None, help="HNSW: candidate list size while searching (ef_search)"
+    ),
+    cache: bool = typer.Option(  # noqa: FBT001
+        True,  # noqa: FBT003
+        help="Reuse cached query embeddings and answers",
+    ),
+    type_: str | None = typer.Option(
+        None, "--type", help="Only search dossiers of this type"
+    ),
+    start: datetime | None = typer.Option(  # noqa: B008
+        None,
+        formats=["%Y-%m-%d"],
+        help="Only dossiers running on or after this date",
+    ),
+    end: datetime | None = typer.Option(  # noqa: B008
+        None,
+        formats=["%Y-%m-%d"],
+        help="Only dossiers running on or before this date",
+    ),
+    min_budget: float | None = typer.Option(None, help="Minimum approved budget"),
+    max_budget: float | None = typer.Option(None, help="Maximum approved budget"),
+    mode: str = typer.Option(
+        "vector", help="Retrieval: 'vector', 'keyword' (BM25) or 'hybrid'"
+    ),
+    quantization: str = typer.Option(
+        "none",
+        help="Scan 'int8' or 'binary' vectors first, rescoring a shortlist",
+    ),
+    store: str = typer.Option(
+        "duckdb", help="Vector store built by embed-chunks: duckdb or numpy"
+    ),
+    context_tokens: int = typer.Option(
+        3_000, help="Token budget of the context passed to the LLM"
+    ),
+    mmr: float | None = typer.Option(
+        None, help="Diversify the context by MMR: 1 is relevance only, 0 diversity"
+    ),
 ) -> None:
     """Ask a question, retrieve relevant dossier chunks, and generate an answer."""
+    if mode not in get_args(SearchMode):
+        console.print(
+            "[red]❌ Invalid mode. Choose 'vector', 'keyword' or 'hybrid'.[/red]"
+        )
+        raise typer.Exit(code=1)
+    if quantization not in get_args(Quantization):
+        console.print(
+            "[red]❌ Invalid quantization. Choose 'none', 'int8' or 'binary'.[/red]"
+        )
+        raise typer.Exit(code=1)
+
     console.print(f"[bold blue]🔍 Searching for:[/bold blue] {query}\n")
 
+    filters = ChunkFilter(
+        type=type_,
+        start=start.date() if start else None,
+        end=end.date() if end else None,
+        min_budget=min_budget,
+        max_budget=max_budget,
+    )
+
     try:
-        results = search_chunks(query=query, provider=provider, top_k=top_k)
+        results = search_chunks(
+            query=query,
+            provider=provider,
+            top_k=top_k,
+            exact=exact,
+            ef_search=ef_search,
+            use_cache=cache,
+            filters=filters,
+            mode=cast("SearchMode", mode),
+            quantization=cast("Quantization", quantization),
+            store=store,
+        )
     except Exception as e:  # noqa: BLE001
         console.print(f"[red]❌ Retrieval failed:[/red] {e}")
         raise typer.Exit from None
@@ -262,29 +729,24 @@ def ask(
         console.print("[yellow]⚠️ No results found.[/yellow]")
         raise typer.Exit
 
-    # Generate answer using an LLM
-    context = "\n\n".join(c.content for c in results)
-
-    prompt = f"""Beantwoord de volgende vraag zo goed mogelijk op basis van de
-context uit subsidiedossiers hieronder.
-
-Vraag: {query}
-
-Context:
-{context}
-
-Antwoord:"""
+    context = assemble_context(
+        results, ContextPolicy(max_tokens=context_tokens, mmr=mmr)
+    )
+    console.print(
+        f"[dim]📉 Context: {context.used} of {context.chunks} chunks, "
+        f"~{context.tokens} tokens ({context.tokens_saved} saved, "
+        f"{context.duplicates} duplicates dropped)[/dim]"
+    )
 
+    # Generate answer using an LLM
+    console.rule("[bold green]💡 Antwoord[/bold green]")
     try:
         completion = COMPLETION_REGISTRY[model]()
-        answer = completion.complete(prompt)
+        print_answer(completion, query, context, use_cache=cache)
     except Exception as e:  # noqa: BLE001
         console.print(f"[red]❌ LLM completion failed:[/red] {e}")
         raise typer.Exit(code=1)  # noqa: B904
 
-    console.rule("[bold green]💡 Antwoord[/bold green]")
-    console.print(answer)
-
     if show:
         for i, chunk in enumerate(results, 1):
             console.rule(f"[green]Result {i}[/green]")
@@ -294,3 +756,205 @@ Antwoord:"""
             console.print("\n[italic]Chunk Content:[/italic]")
             console.print(chunk.content)
             console.print()
+
+
+@app.command()
+def ask_batch(  # noqa: PLR0913
+    input_path: Path = typer.Argument(  # noqa: B008
+        ..., help="JSONL file with one {id, question} object per line"
+    ),
+    output: Path = typer.Option(  # noqa: B008
+        Path("data/answers/answers.jsonl"), help="Output JSONL file for the answers"
+    ),
+    provider: str = typer.Option(
+        "openai", help="Embedding provider (openai, ollama or local)"
+    ),
+    model: str = typer.Option(
+        "openai", help="LLM to use for answering (openai or ollama)"
+    ),
+    top_k: int = typer.Option(5, help="Number of chunks retrieved per question"),
+    concurrency: int = typer.Option(8, help="Maximum completions in flight"),
+) -> None:
+    """Answer a JSONL file of questions with batched retrieval and completions."""
+    if provider not in EMBEDDING_REGISTRY:
+        console.print(f"[red]❌ Unsupported embedding provider: {provider}[/red]")
+        raise typer.Exit(code=1)
+    if model not in COMPLETION_REGISTRY:
+        console.print(f"[red]❌ Unsupported completion model: {model}[/red]")
+        raise typer.Exit(code=1)
+
+    if not input_path.exists():
+        console.print(f"[red]❌ JSONL file not found at {input_path}[/red]")
+        raise typer.Exit(code=1)
+
+    skipped: list[int] = []
+    questions = list(iter_jsonl(input_path, Question, on_skip=skipped.append))
+    if skipped:
+        console.print(f"[yellow]⚠️ Skipped {len(skipped)} malformed questions[/yellow]")
+
+    completion = COMPLETION_REGISTRY[model]()
+    failed = 0
+
+    with DATABASE.reader() as con, Progress() as progress:
+        try:
+            embedder = EMBEDDING_REGISTRY[provider](dimensions=stored_dimension(con))
+        except ValueError as e:
+            console.print(f"[red]❌ {e}[/red]")
+            raise typer.Exit(code=1) from None
+        task = progress.add_task("🔍 Retrieving...", total=len(questions))
+
+        async def answers() -> AsyncIterator[Answer]:
+            """Answer all questions while tracking progress and failures."""
+            nonlocal failed
+            async for answer in answer_batch(
+                con,
+                questions,
+                embedder,
+                completion,
+                top_k=top_k,
+                max_concurrency=concurrency,
+                on_retrieved=lambda: progress.update(
+                    task, description="💬 Answering..."
+                ),
+            ):
+                failed += answer.error is not None
+                progress.advance(task)
+                yield answer
+
+        written = asyncio.run(awrite_jsonl(output, answers()))
+
+    if failed:
+        console.print(f"[yellow]⚠️ {failed} questions could not be answered[/yellow]")
+    console.print(f"✅ [green]Wrote {written} answers to {output}[/green]")
+
+
+@app.command()
+def bench(  # noqa: PLR0913
+    chunks: int = typer.Option(10_000, help="Number of synthetic chunks"),
+    distribution: str = typer.Option(
+        "random", help="Vector distribution: 'random' or 'clustered'"
+    ),
+    queries: int = typer.Option(100, help="Number of timed queries per mode"),
+    batch_size: int = typer.Option(100, help="Queries per batch query"),
+    top_k: int = typer.Option(10, help="Number of results per query"),
+    seed: int = typer.Option(42, help="Seed of the synthetic corpus"),
+    repeat: int = typer.Option(3, min=1, help="Runs whose median each metric reports"),
+    output: Path = typer.Option(  # noqa: B008
+        Path("data/bench/report.json"), help="Where to write the JSON report"
+    ),
+    baseline: Path | None = typer.Option(  # noqa: B008
+        None, help="Baseline report to compare against"
+    ),
+    tolerance: float = typer.Option(
+        0.2,
+        help="Fail when a metric is this fraction worse than the baseline, "
+        "and by more than its noise floor",
+    ),
+) -> None:
+    """Benchmark ingest, indexing and retrieval offline on a synthetic corpus."""
+    if distribution not in get_args(Distribution):
+        console.print(
+            "[red]❌ Invalid distribution. Use 'random' or 'clustered'.[/red]"
+        )
+        raise typer.Exit(code=1)
+
+    config = BenchConfig(
+        chunks=chunks,
+        distribution=cast("Distribution", distribution),
+        queries=queries,
+        batch_size=batch_size,
+        top_k=top_k,
+        seed=seed,
+        repeat=repeat,
+    )
+    with console.status("Benchmarking...") as status:
+        report = run_benchmark(
+            config, on_stage=lambda name: status.update(f"⏱️ {name}...")
+        )
+    report.write(output)
+
+    table = Table("Metric", "Value")
+    for metric, value in report.metrics().items():
+        table.add_row(metric, f"{value:,.3f}")
+    console.print(table)
+    console.print(f"✅ [green]Wrote report to {output}[/green]")
+
+    slower = slower_quantized_scans(report)
+    for name in slower:
+        console.print(f"[red]❌ {name} queries are not faster than exact ones[/red]")
+    if baseline is None:
+        if slower:
+            raise typer.Exit(code=1)
+        return
+
+    regressions = 0
+    table = Table("Metric", "Baseline", "Current", "Ratio")
+    for c in compare(report, baseline):
+        regressed = c.regressed(tolerance)
+        regressions += regressed
+        style = "red" if regressed else "green"
+        table.add_row(
+            c.metric,
+            f"{c.baseline:,.3f}",
+            f"{c.current:,.3f}",
+            f"[{style}]{c.ratio:.2f}x[/{style}]",
+        )
+    console.print(table)
+    if regressions:
+        console.print(f"[red]❌ {regressions} metrics regressed beyond tolerance[/red]")
+    if regressions or slower:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", help="Interface to listen on"),
+    port: int = typer.Option(8000, help="Port to listen on"),
+    poll_interval: float = typer.Option(
+        2.0, help="Seconds between checks for a changed database"
+    ),
+) -> None:
+    """Serve /search and /ask over HTTP with warm clients and data."""
+    import uvicorn
+
+    from kwak.api.app import create_app
+
+    console.print(f"🦆 Serving on http://{host}:{port}")
+    uvicorn.run(create_app(DATABASE.settings.path, poll_interval), host=host, port=port)
+
+
+@cache_app.command("stats")
+def cache_stats() -> None:
+    """Show size and hit/miss counters of every cache."""
+    if not DEFAULT_CACHE_PATH.exists():
+        console.print("[yellow]⚠️ No cache found.[/yellow]")
+        raise typer.Exit
+
+    table = Table("Cache", "Entries", "Hits", "Misses", "Hit rate")
+    for name, cache_cls in CACHES.items():
+        with cache_cls() as c:
+            stats = c.stats()
+        table.add_row(
+            name,
+            str(stats.entries),
+            str(stats.hits),
+            str(stats.misses),
+            f"{stats.hit_rate:.1%}",
+        )
+    console.print(table)
+
+
+@cache_app.command("clear")
+def cache_clear(
+    name: str = typer.Argument("all", help="Cache to clear, or 'all'"),
+) -> None:
+    """Remove all entries from one or all caches."""
+    if name != "all" and name not in CACHES:
+        console.print(f"[red]❌ Unknown cache: {name}[/red]")
+        raise typer.Exit(code=1)
+
+    for cache_name, cache_cls in CACHES.items():
+        if name in ("all", cache_name):
+            with cache_cls() as c:
+                c.clear()
+            console.print(f"🧹 Cleared {cache_name}")
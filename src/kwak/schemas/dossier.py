@@ -17,8 +17,25 @@ class SubsidieDossier(BaseModel):
     advies: str
 
 
+class ChunkRecord(BaseModel):
+    """Schema for a stored chunk: a span of one text field of a dossier.
+
+    The dossier's metadata is not repeated per chunk; it is joined from the
+    dossiers table when chunks are embedded or retrieved. start and end are the
+    character offsets of the span in the field, or None if the chunker reworded
+    the text so it cannot be located.
+    """
+
+    dossier_id: str
+    origin: Literal["omschrijving", "advies"]
+    index: int
+    start: int | None
+    end: int | None
+    content: str
+
+
 class DossierChunk(BaseModel):
-    """Schema for a semantically chunked section of a subsidy dossier."""
+    """Schema for a retrieved chunk joined with the metadata of its dossier."""
 
     dossier_id: str
     type: str
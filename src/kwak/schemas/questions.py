@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+
+
+class Question(BaseModel):
+    """Schema for a question in a batch of questions to answer."""
+
+    id: str | None = None
+    question: str
+
+
+class Answer(BaseModel):
+    """Schema for the answer to a batch question and the chunks it was based on."""
+
+    id: str | None = None
+    question: str
+    answer: str | None
+    chunk_ids: list[str]
+    error: str | None = None
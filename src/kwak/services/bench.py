@@ -0,0 +1,409 @@
+import contextlib
+import json
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, Literal
+
+import duckdb
+
+from kwak.schemas.dossier import SubsidieDossier
+from kwak.services.rag.index import create_fts_index, create_hnsw_index
+from kwak.services.rag.ingest import ensure_chunk_table, ingest_dossiers
+from kwak.services.rag.quantize import quantize_chunk_embeddings
+from kwak.services.rag.retrieval import nearest_chunk_ids, retrieve
+from kwak.services.rag.vectors import insert_vectors
+from kwak.utils.files import write_jsonl
+
+Distribution = Literal["random", "clustered"]
+
+# Largest value of DuckDB's hash(), used to map hashes onto [0, 1).
+HASH_RANGE = 2.0**64
+TYPES = ("erfgoed", "kunst", "jeugd", "sport", "onderwijs")
+# Fresh interpreters timed importing the CLI; the fastest run is reported.
+IMPORT_RUNS = 3
+# Stored vectors re-inserted as Python lists, the way embed-chunks receives them.
+INSERT_SAMPLE = 2_000
+# Smallest change per metric group (seconds, milliseconds, bytes) that counts as
+# a regression, so jitter on fast stages does not fail a baseline comparison.
+NOISE_FLOORS = {"timings": 0.1, "latency": 5.0, "memory": 32 * 2**20}
+
+
+@dataclass(frozen=True)
+class BenchConfig:
+    """Size and shape of a synthetic benchmark corpus and query load.
+
+    The benchmark runs repeat times and every metric reports its median run.
+    """
+
+    chunks: int = 10_000
+    chunks_per_dossier: int = 10
+    distribution: Distribution = "random"
+    clusters: int = 100
+    queries: int = 100
+    batch_size: int = 100
+    top_k: int = 10
+    seed: int = 42
+    repeat: int = 3
+
+    @property
+    def dossiers(self) -> int:
+        """Number of dossiers the chunks are spread over."""
+        return -(-self.chunks // self.chunks_per_dossier)
+
+
+@dataclass
+class BenchReport:
+    """Timings, latency percentiles and memory use of one benchmark run."""
+
+    config: dict[str, Any]
+    environment: dict[str, str]
+    timings: dict[str, float] = field(default_factory=dict)
+    latency: dict[str, dict[str, float]] = field(default_factory=dict)
+    memory: dict[str, int] = field(default_factory=dict)
+
+    def metrics(self) -> dict[str, float]:
+        """Flatten all lower-is-better measurements into dotted metric names."""
+        flat = {f"timings.{name}": value for name, value in self.timings.items()}
+        for name, percentiles in self.latency.items():
+            flat.update({f"latency.{name}.{p}": v for p, v in percentiles.items()})
+        flat.update({f"memory.{name}": value for name, value in self.memory.items()})
+        return flat
+
+    def write(self, path: Path) -> None:
+        """Write the report as JSON."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(asdict(self), indent=2) + "\n", encoding="utf-8")
+
+
+@dataclass(frozen=True)
+class Comparison:
+    """A metric of the current run next to the same metric of a baseline."""
+
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        """Current value relative to the baseline (above 1 is slower or larger)."""
+        return self.current / self.baseline if self.baseline else float("inf")
+
+    def regressed(self, tolerance: float) -> bool:
+        """Whether the metric got worse by more than tolerance and the noise floor."""
+        floor = NOISE_FLOORS.get(self.metric.partition(".")[0], 0.0)
+        return self.ratio > 1 + tolerance and self.current - self.baseline > floor
+
+
+def compare(report: BenchReport, baseline_path: Path) -> list[Comparison]:
+    """Compare the metrics of a report with those of a stored baseline report."""
+    data = json.loads(baseline_path.read_text(encoding="utf-8"))
+    baseline = BenchReport(**data).metrics()
+    return [
+        Comparison(metric, baseline[metric], value)
+        for metric, value in report.metrics().items()
+        if metric in baseline
+    ]
+
+
+def slower_quantized_scans(report: BenchReport) -> list[str]:
+    """Return the quantizations whose median query is no faster than exact search.
+
+    Scanning compact int8 or binary vectors is only worth its lost precision
+    when it beats the full-precision scan it approximates.
+    """
+    exact = report.latency.get("query_exact", {}).get("p50")
+    if exact is None:
+        return []
+    return [
+        name
+        for name in ("int8", "binary")
+        if report.latency.get(f"query_{name}", {}).get("p50", 0.0) >= exact
+    ]
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """Summarize latency samples (in seconds) as p50/p95/p99 milliseconds."""
+    if len(samples) < 2:  # noqa: PLR2004
+        samples = samples * 2
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50": cuts[49] * 1000,
+        "p95": cuts[94] * 1000,
+        "p99": cuts[98] * 1000,
+    }
+
+
+def synthetic_dossiers(config: BenchConfig) -> Iterator[SubsidieDossier]:
+    """Yield deterministic synthetic dossiers for the configured corpus."""
+    rng = random.Random(config.seed)  # noqa: S311
+    for i in range(config.dossiers):
+        start = date(2018, 1, 1) + timedelta(days=rng.randint(0, 4 * 365))
+        yield SubsidieDossier(
+            id=f"D{i:08d}",
+            titel=f"Synthetisch dossier {i}",
+            type=rng.choice(TYPES),
+            startdatum=start,
+            einddatum=start + timedelta(days=rng.randint(30, 3 * 365)),
+            goedgekeurd_budget=round(rng.uniform(10_000, 1_000_000), 2),
+            omschrijving=f"Omschrijving van synthetisch dossier {i}.",
+            advies=f"Advies over synthetisch dossier {i}.",
+        )
+
+
+def _hash(*parts: str) -> str:
+    """Build SQL hashing several values into one well-mixed 64-bit hash.
+
+    DuckDB's own hash(a, b, ...) combines the hashes of its arguments so weakly
+    that vectors built from hash(seed, i, j) share their signs across i; every
+    part is folded in with a fresh hash instead.
+    """
+    combined = f"hash({parts[0]})"
+    for part in parts[1:]:
+        combined = f"hash(xor({combined}, hash({part})))"
+    return combined
+
+
+def _unit(*parts: str) -> str:
+    """Build SQL for a deterministic pseudo-random value in [-0.5, 0.5)."""
+    return f"({_hash(*parts)} / {HASH_RANGE} - 0.5)"
+
+
+def load_synthetic_chunks(con: duckdb.DuckDBPyConnection, config: BenchConfig) -> None:
+    """Fill chunk_embeddings with deterministic synthetic chunks and vectors.
+
+    Vectors are derived from hashes inside DuckDB, so even a million 1536-dim
+    chunks are generated without passing through Python. Clustered vectors are
+    a per-cluster centroid plus a small amount of noise. The offsets and the
+    quantized columns are left empty.
+    """
+    seed = str(int(config.seed))
+    if config.distribution == "clustered":
+        cluster = f"-1 - {_hash(seed, 'i')} % {int(config.clusters)}"
+        centroid = _unit(seed, cluster, "j")
+        element = f"{centroid} + 0.1 * {_unit(seed, 'i', 'j')}"
+    else:
+        element = _unit(seed, "i", "j")
+
+    ensure_chunk_table(con)
+    con.execute(
+        f"""
+        INSERT INTO chunk_embeddings BY NAME
+        SELECT
+            'D' || lpad((i // {int(config.chunks_per_dossier)})::VARCHAR, 8, '0')
+                || ':omschrijving:' || (i % {int(config.chunks_per_dossier)})
+                AS chunk_id,
+            'D' || lpad((i // {int(config.chunks_per_dossier)})::VARCHAR, 8, '0')
+                AS dossier_id,
+            'omschrijving' AS origin,
+            i % {int(config.chunks_per_dossier)} AS index,
+            array_to_string(
+                list_transform(
+                    range(40), k -> 'term' || ({_hash(seed, "i", "k")} % 5000)
+                ),
+                ' '
+            ) AS content,
+            md5(i::VARCHAR) AS content_hash,
+            list_transform(range(1536), j -> {element})::FLOAT[1536] AS embedding
+        FROM range({int(config.chunks)}) t(i)
+        """  # noqa: S608
+    )
+
+
+def time_vector_insert(con: duckdb.DuckDBPyConnection, sample: int) -> float:
+    """Time bulk inserting sample stored vectors into a scratch table.
+
+    The vectors are fetched as Python lists first, so only the insert is timed.
+    """
+    rows = con.execute(
+        "SELECT content_hash, embedding FROM chunk_embeddings LIMIT $sample",
+        {"sample": sample},
+    ).fetchall()
+    con.execute(
+        "CREATE OR REPLACE TEMP TABLE bench_vectors "
+        "(content_hash VARCHAR, embedding FLOAT[1536])"
+    )
+    elapsed = _timed(
+        lambda: insert_vectors(
+            con, "bench_vectors", [r[0] for r in rows], [r[1] for r in rows], 1536
+        )
+    )
+    con.execute("DROP TABLE bench_vectors")
+    return elapsed
+
+
+def _timed(func: Callable[[], object]) -> float:
+    """Run func and return its wall-clock duration in seconds."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def cli_import_time(runs: int = IMPORT_RUNS) -> float:
+    """Time a fresh interpreter importing the CLI, best of runs, in seconds.
+
+    This is the startup cost every kwak command pays before doing any work,
+    so provider SDKs imported at module level show up here as a regression.
+    """
+    command = [sys.executable, "-c", "import kwak.cli"]
+    return min(
+        _timed(partial(subprocess.run, command, check=True)) for _ in range(runs)
+    )
+
+
+def _peak_rss() -> int:
+    """Return the peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def median_report(reports: list[BenchReport]) -> BenchReport:
+    """Merge the reports of repeated runs, taking the median of every metric."""
+    first = reports[0]
+    return BenchReport(
+        config=first.config,
+        environment=first.environment,
+        timings={
+            name: statistics.median(r.timings[name] for r in reports)
+            for name in first.timings
+        },
+        latency={
+            name: {
+                p: statistics.median(r.latency[name][p] for r in reports) for p in cuts
+            }
+            for name, cuts in first.latency.items()
+        },
+        memory={
+            name: int(statistics.median(r.memory[name] for r in reports))
+            for name in first.memory
+        },
+    )
+
+
+def run_benchmark(
+    config: BenchConfig, on_stage: Callable[[str], None] | None = None
+) -> BenchReport:
+    """Benchmark CLI startup, ingest, index builds and queries on a synthetic corpus.
+
+    Everything runs against a temporary DuckDB file, offline and without an
+    embedding provider: query vectors are perturbed copies of stored chunks and
+    keyword queries reuse their terms. Stages that need an unavailable DuckDB
+    extension are left out of the report.
+    """
+    reports = []
+    for run in range(1, config.repeat + 1):
+
+        def stage(name: str, run: int = run) -> None:
+            if on_stage is not None:
+                on_stage(f"{name} (run {run}/{config.repeat})")
+
+        reports.append(_run_once(config, stage))
+    return median_report(reports)
+
+
+def _run_once(config: BenchConfig, stage: Callable[[str], None]) -> BenchReport:
+    """Run every benchmark stage once on a fresh temporary database."""
+    report = BenchReport(
+        config=asdict(config),
+        environment={
+            "python": platform.python_version(),
+            "duckdb": duckdb.__version__,
+            "platform": platform.platform(),
+        },
+    )
+
+    stage("CLI startup")
+    report.timings["cli_import"] = cli_import_time()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dossiers_path = Path(tmp) / "dossiers.jsonl"
+        write_jsonl(dossiers_path, synthetic_dossiers(config))
+
+        with duckdb.connect(str(Path(tmp) / "bench.db")) as con:
+            stage("ingest dossiers")
+            report.timings["ingest_dossiers"] = _timed(
+                lambda: ingest_dossiers(con, dossiers_path)
+            )
+            stage("load chunks")
+            report.timings["load_chunks"] = _timed(
+                lambda: load_synthetic_chunks(con, config)
+            )
+            stage("insert vectors")
+            report.timings["insert_vectors"] = time_vector_insert(con, INSERT_SAMPLE)
+            stage("quantize chunks")
+            report.timings["quantize"] = _timed(
+                lambda: quantize_chunk_embeddings(con, 1536)
+            )
+            stage("build HNSW index")
+            with contextlib.suppress(duckdb.Error):
+                report.timings["hnsw_build"] = _timed(lambda: create_hnsw_index(con))
+            stage("build full-text index")
+
+            def build_fts() -> None:
+                create_fts_index(con, "chunk_embeddings", "chunk_id", "content")
+                create_fts_index(con, "dossiers", "id", "id", "titel")
+
+            with contextlib.suppress(duckdb.Error):
+                report.timings["fts_build"] = _timed(build_fts)
+
+            queries = con.execute(
+                f"""
+                SELECT
+                    content,
+                    list_transform(
+                        embedding, (x, j) -> x + 0.05 * {_unit("rowid", "j")}
+                    )
+                FROM chunk_embeddings
+                USING SAMPLE reservoir({int(config.queries)} ROWS)
+                REPEATABLE ({int(config.seed)})
+                """  # noqa: S608
+            ).fetchall()
+
+            runs: dict[str, Callable[[str, list[float]], object]] = {
+                "exact": lambda _, v: retrieve(con, "", v, config.top_k, exact=True),
+                "int8": lambda _, v: retrieve(
+                    con, "", v, config.top_k, quantization="int8"
+                ),
+                "binary": lambda _, v: retrieve(
+                    con, "", v, config.top_k, quantization="binary"
+                ),
+            }
+            if "hnsw_build" in report.timings:
+                runs["hnsw"] = lambda _, v: retrieve(con, "", v, config.top_k)
+            if "fts_build" in report.timings:
+                runs["keyword"] = lambda text, _: retrieve(
+                    con, " ".join(text.split()[:3]), None, config.top_k, mode="keyword"
+                )
+            for name, run in runs.items():
+                stage(f"{name} queries")
+                report.latency[f"query_{name}"] = percentiles(
+                    [_timed(partial(run, text, v)) for text, v in queries]
+                )
+
+            stage("batch queries")
+            vectors = [v for _, v in queries]
+            samples: list[float] = []
+            for i in range(0, len(vectors), config.batch_size):
+                batch = vectors[i : i + config.batch_size]
+                elapsed = _timed(partial(nearest_chunk_ids, con, batch, config.top_k))
+                samples.extend([elapsed / len(batch)] * len(batch))
+            report.latency["query_batch_per_query"] = percentiles(samples)
+
+            row = con.execute(
+                "SELECT sum(memory_usage_bytes) FROM duckdb_memory()"
+            ).fetchone()
+            report.memory["duckdb_bytes"] = int(row[0] or 0) if row else 0
+
+    report.memory["peak_rss_bytes"] = _peak_rss()
+    return report
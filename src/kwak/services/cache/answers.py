@@ -0,0 +1,43 @@
+from datetime import timedelta
+from pathlib import Path
+
+from kwak.services.cache.base import DEFAULT_CACHE_PATH, DuckDBCache, cache_key
+from kwak.services.cache.embeddings import normalize_query
+from kwak.services.completions.base import SYSTEM_PROMPT, AbstractCompletion
+from kwak.services.rag.prompt import PROMPT_VERSION
+
+
+class AnswerCache(DuckDBCache):
+    """Cache of LLM answers keyed by model, prompts, query and context.
+
+    The assembled context is part of the key, so an answer is only reused while
+    retrieval and context assembly yield the same context for the question.
+    """
+
+    table = "answers"
+    value_type = "VARCHAR"
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        max_entries: int = 1_000,
+        ttl: timedelta = timedelta(days=7),
+    ) -> None:
+        """Open the answer cache; answers expire sooner than embeddings."""
+        super().__init__(path, max_entries, ttl)
+
+    def key_for(
+        self,
+        completion: AbstractCompletion,
+        query: str,
+        context: str,
+    ) -> str:
+        """Build the cache key for answering query from a context with a model."""
+        return cache_key(
+            completion.name,
+            completion.model_name,
+            SYSTEM_PROMPT,
+            PROMPT_VERSION,
+            normalize_query(query),
+            context,
+        )
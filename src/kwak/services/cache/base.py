@@ -0,0 +1,159 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, ClassVar, Self
+
+import duckdb
+
+DEFAULT_CACHE_PATH = Path("data/cache.db")
+
+
+def cache_key(*parts: str) -> str:
+    """Hash the given key parts into a single stable cache key."""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """Size and hit/miss counters of a single cache table."""
+
+    name: str
+    entries: int
+    hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups that were served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class DuckDBCache:
+    """Persistent key/value cache stored as a table in a DuckDB file.
+
+    Entries older than `ttl` are never returned, and once the table holds more
+    than `max_entries` rows the least recently used ones are evicted. Hits and
+    misses are counted per table in the shared `cache_stats` table. Lookups and
+    writes take a lock, so one open cache can serve several threads.
+    """
+
+    table: ClassVar[str]
+    value_type: ClassVar[str]
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        max_entries: int = 10_000,
+        ttl: timedelta = timedelta(days=30),
+    ) -> None:
+        """Open (and create if needed) the cache table in the given DuckDB file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = duckdb.connect(str(path))
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self.con.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                key VARCHAR PRIMARY KEY,
+                value {self.value_type},
+                created_at TIMESTAMP DEFAULT current_timestamp,
+                accessed_at TIMESTAMP DEFAULT current_timestamp
+            )
+            """
+        )
+        self.con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_stats (
+                name VARCHAR PRIMARY KEY,
+                hits BIGINT DEFAULT 0,
+                misses BIGINT DEFAULT 0
+            )
+            """
+        )
+        self.con.execute(
+            "INSERT OR IGNORE INTO cache_stats (name) VALUES (?)", [self.table]
+        )
+
+    def __enter__(self) -> Self:
+        """Use the cache as a context manager that closes its connection."""
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Close the underlying DuckDB connection."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying DuckDB connection."""
+        self.con.close()
+
+    def get(self, key: str) -> Any | None:  # noqa: ANN401
+        """Return the cached value for key, or None if missing or expired."""
+        with self.lock:
+            row = self.con.execute(
+                f"""
+                UPDATE {self.table} SET accessed_at = current_timestamp
+                WHERE key = $key AND created_at > current_timestamp - $ttl
+                RETURNING value
+                """,  # noqa: S608
+                {"key": key, "ttl": self.ttl},
+            ).fetchone()
+
+            counter = "misses" if row is None else "hits"
+            self.con.execute(
+                f"UPDATE cache_stats SET {counter} = {counter} + 1 WHERE name = ?",  # noqa: S608
+                [self.table],
+            )
+        return None if row is None else row[0]
+
+    def put(self, key: str, value: Any) -> None:  # noqa: ANN401
+        """Store a value under key and evict stale or surplus entries."""
+        with self.lock:
+            self.con.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",  # noqa: S608
+                [key, value],
+            )
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop expired entries and trim the table to the most recently used."""
+        self.con.execute(
+            f"DELETE FROM {self.table} WHERE created_at <= current_timestamp - ?",  # noqa: S608
+            [self.ttl],
+        )
+        row = self.con.execute(f"SELECT count(*) FROM {self.table}").fetchone()  # noqa: S608
+        if row is None or row[0] <= self.max_entries:
+            return
+        self.con.execute(
+            f"""
+            DELETE FROM {self.table} WHERE key NOT IN (
+                SELECT key FROM {self.table}
+                ORDER BY accessed_at DESC
+                LIMIT {int(self.max_entries)}
+            )
+            """  # noqa: S608
+        )
+
+    def clear(self) -> None:
+        """Remove all entries and reset the hit/miss counters."""
+        self.con.execute(f"DELETE FROM {self.table}")  # noqa: S608
+        self.con.execute(
+            "UPDATE cache_stats SET hits = 0, misses = 0 WHERE name = ?",
+            [self.table],
+        )
+
+    def stats(self) -> CacheStats:
+        """Return the current size and hit/miss counters of this cache."""
+        row = self.con.execute(
+            f"""
+            SELECT (SELECT count(*) FROM {self.table}), hits, misses
+            FROM cache_stats WHERE name = ?
+            """,  # noqa: S608
+            [self.table],
+        ).fetchone()
+        entries, hits, misses = row if row is not None else (0, 0, 0)
+        return CacheStats(self.table, entries, hits, misses)
@@ -0,0 +1,12 @@
+from kwak.services.cache.base import DuckDBCache, cache_key
+
+
+class SemanticChunkCache(DuckDBCache):
+    """Cache of LLM chunking results keyed by model, prompt version and text."""
+
+    table = "semantic_chunks"
+    value_type = "VARCHAR[]"
+
+    def key_for(self, model: str, prompt_version: str, text: str) -> str:
+        """Build the cache key for chunking text with the given model and prompt."""
+        return cache_key(model, prompt_version, text)
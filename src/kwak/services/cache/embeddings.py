@@ -0,0 +1,42 @@
+import asyncio
+import re
+import unicodedata
+
+from kwak.services.cache.base import DuckDBCache
+from kwak.services.embedding.base import AbstractEmbeddingProvider
+from kwak.services.rag.vectors import vector_literal
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class QueryEmbeddingCache(DuckDBCache):
+    """Cache of query embeddings keyed by provider, model, dimension and text."""
+
+    table = "query_embeddings"
+    value_type = "FLOAT[]"
+
+    def key_for(self, embedder: AbstractEmbeddingProvider, text: str) -> str:
+        """Build the cache key for embedding text with the given provider."""
+        return embedder.fingerprint(normalize_query(text))
+
+    async def embed(
+        self, embedder: AbstractEmbeddingProvider, text: str
+    ) -> list[float]:
+        """Return the cached embedding for text, embedding it on a miss.
+
+        The cache is read and written in a worker thread, so a server's event
+        loop does not wait on DuckDB.
+        """
+        key = self.key_for(embedder, text)
+        cached: list[float] | None = await asyncio.to_thread(self.get, key)
+        if cached is not None:
+            return cached
+
+        embedding: list[float] = (await embedder.embed([text]))[0].tolist()
+        # Bound as a literal, which DuckDB casts to FLOAT[] far faster than a list
+        await asyncio.to_thread(self.put, key, vector_literal(embedding))
+        return embedding
@@ -1,13 +1,47 @@
 from abc import ABC, abstractmethod
-from collections.abc import Iterable
+from collections.abc import AsyncIterator, Iterable, Iterator
 
-from kwak.schemas.dossier import DossierChunk, SubsidieDossier
+from kwak.schemas.dossier import ChunkRecord, SubsidieDossier
 
 
 class AbstractChunker(ABC):
     """Abstract base class for chunkers that split dossiers into semantic chunks."""
 
     @abstractmethod
-    def chunk(self, dossier: SubsidieDossier) -> Iterable[DossierChunk]:
+    def chunk(self, dossier: SubsidieDossier) -> Iterable[ChunkRecord]:
         """Chunk the text of a SourceDossier into semantic units."""
         ...
+
+    async def chunk_many(
+        self, dossiers: Iterable[SubsidieDossier]
+    ) -> AsyncIterator[list[ChunkRecord]]:
+        """Yield the chunks of each dossier, in the order the dossiers are given."""
+        for dossier in dossiers:
+            yield list(self.chunk(dossier))
+
+
+def chunk_records(
+    dossier: SubsidieDossier,
+    origin: str,
+    chunks: Iterable[str],
+) -> Iterator[ChunkRecord]:
+    """Wrap the text chunks of one dossier field into ChunkRecords.
+
+    Each chunk is looked up in the field after the previous one, so repeated
+    passages get the offsets of their own occurrence.
+    """
+    text = getattr(dossier, origin)
+    cursor = 0
+    for index, chunk in enumerate(chunks):
+        start = text.find(chunk, cursor)
+        found = start != -1
+        if found:
+            cursor = start + len(chunk)
+        yield ChunkRecord(
+            dossier_id=dossier.id,
+            origin=origin,  # type: ignore[arg-type]
+            index=index,
+            start=start if found else None,
+            end=cursor if found else None,
+            content=chunk,
+        )
@@ -1,13 +1,30 @@
+import asyncio
 import os
-from collections.abc import Iterable
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+from typing import Any
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from openai.types.chat import ParsedChatCompletion
 from pydantic import BaseModel
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openai import OpenAIProvider
 
-from kwak.schemas.dossier import DossierChunk, SubsidieDossier
-from kwak.services.chunkers.base import AbstractChunker
+from kwak.schemas.dossier import ChunkRecord, SubsidieDossier
+from kwak.services.cache.chunks import SemanticChunkCache
+from kwak.services.chunkers.base import AbstractChunker, chunk_records
+from kwak.utils.tracing import TRACER
+
+# Bump whenever SYSTEM_PROMPT changes, so cached chunkings are not reused.
+PROMPT_VERSION = "1"
+SYSTEM_PROMPT = (
+    "Split the provided text into coherent and meaningful sections "
+    "(semantic chunks). Each chunk should be a short, self-contained "
+    "unit of meaning (between 50 and 300 words), suitable for "
+    "embedding and semantic search. "
+    "Return ONLY valid JSON matching this schema:\n\nList[str]"
+)
+ORIGINS = ("omschrijving", "advies")
 
 
 class ChunkResponse(BaseModel):
@@ -16,72 +33,134 @@ class ChunkResponse(BaseModel):
     chunks: list[str]
 
 
-client = OpenAI(api_key="ollama", base_url=os.getenv("OLLAMA_API_URL"))
-
-
 class SemanticChunker(AbstractChunker):
     """Chunker that uses an LLM (via OpenAI-compatible API) to
     split text into semantic chunks.
     """
 
-    def __init__(self, model_name: str = "deepseek-r1") -> None:
-        """Initialize the chunker with an OpenAI-compatible model."""
-        self.client = OpenAI(api_key="ollama", base_url=os.getenv("OLLAMA_API_URL"))
-        provider = OpenAIProvider(base_url=os.getenv("OLLAMA_API_URL"))
+    def __init__(
+        self,
+        model_name: str = "deepseek-r1",
+        max_concurrency: int = 8,
+        cache: SemanticChunkCache | None = None,
+    ) -> None:
+        """Initialize the chunker with an OpenAI-compatible model.
+
+        Up to max_concurrency LLM requests run at once in chunk_many. When a
+        cache is given, texts chunked before by the same model and prompt
+        version are served from it without calling the LLM.
+        """
+        base_url = os.getenv("OLLAMA_API_URL")
+        self.client = OpenAI(api_key="ollama", base_url=base_url)
+        self.async_client = AsyncOpenAI(api_key="ollama", base_url=base_url)
+        provider = OpenAIProvider(base_url=base_url)
         self.model = OpenAIModel(model_name, provider=provider)
         self.model_name = model_name
-
-    def chunk(self, dossier: SubsidieDossier) -> Iterable[DossierChunk]:
-        """Chunk the text of a SubsidieDossier into semantic units,
-        embedding structured context.
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+
+    def chunk(self, dossier: SubsidieDossier) -> Iterable[ChunkRecord]:
+        """Chunk the text of a SubsidieDossier into semantic units."""
+        for origin in ORIGINS:
+            yield from chunk_records(
+                dossier, origin, self._chunk_text(getattr(dossier, origin))
+            )
+
+    async def chunk_many(
+        self, dossiers: Iterable[SubsidieDossier]
+    ) -> AsyncIterator[list[ChunkRecord]]:
+        """Chunk dossiers concurrently, yielding their chunks in input order.
+
+        Only a bounded window of dossiers is in flight at any time, so dossiers
+        can be streamed from disk without holding the whole corpus in memory.
         """
-        for origin in ["omschrijving", "advies"]:
-            raw_text = getattr(dossier, origin)
-            chunks = self._chunk_text(raw_text)
-
-            for chunk in chunks:
-                yield DossierChunk(
-                    dossier_id=dossier.id,
-                    type=dossier.type,
-                    title=dossier.titel,
-                    startdatum=dossier.startdatum,
-                    einddatum=dossier.einddatum,
-                    goedgekeurd_budget=dossier.goedgekeurd_budget,
-                    content=self._build_context(dossier, chunk),
-                    origin=origin,  # type: ignore[arg-type]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        pending: deque[asyncio.Task[list[ChunkRecord]]] = deque()
+        try:
+            for dossier in dossiers:
+                pending.append(
+                    asyncio.create_task(self._chunk_dossier(dossier, semaphore))
                 )
+                if len(pending) >= 2 * self.max_concurrency:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _chunk_dossier(
+        self, dossier: SubsidieDossier, semaphore: asyncio.Semaphore
+    ) -> list[ChunkRecord]:
+        """Chunk both text fields of a dossier concurrently."""
+
+        async def chunk_origin(origin: str) -> list[str]:
+            async with semaphore:
+                return await self._achunk_text(getattr(dossier, origin))
+
+        texts = await asyncio.gather(*(chunk_origin(origin) for origin in ORIGINS))
+        return [
+            chunk
+            for origin, chunks in zip(ORIGINS, texts, strict=True)
+            for chunk in chunk_records(dossier, origin, chunks)
+        ]
 
     def _chunk_text(self, text: str) -> list[str]:
         """Use Ollama via OpenAI-compatible API to split text into semantic chunks."""
-        system_prompt = (
-            "Split the provided text into coherent and meaningful sections "
-            "(semantic chunks). Each chunk should be a short, self-contained "
-            "unit of meaning (between 50 and 300 words), suitable for "
-            "embedding and semantic search. "
-            "Return ONLY valid JSON matching this schema:\n\nList[str]"
-        )
-
-        completion = client.beta.chat.completions.parse(
-            model=self.model_name,
-            messages=[
-                {"role": "system", "content": system_prompt},
+        cached = self._cached(text)
+        if cached is not None:
+            return cached
+
+        with TRACER.span("chunk.llm", model=self.model_name):
+            completion = self.client.beta.chat.completions.parse(
+                **self._request(text), response_format=ChunkResponse
+            )
+            return self._store(text, self._parse(completion))
+
+    async def _achunk_text(self, text: str) -> list[str]:
+        """Split text into semantic chunks without blocking the event loop."""
+        cached = self._cached(text)
+        if cached is not None:
+            return cached
+
+        with TRACER.span("chunk.llm", model=self.model_name):
+            completion = await self.async_client.beta.chat.completions.parse(
+                **self._request(text), response_format=ChunkResponse
+            )
+            return self._store(text, self._parse(completion))
+
+    def _request(self, text: str) -> dict[str, Any]:
+        """Build the model and messages of a chat completion chunking text."""
+        return {
+            "model": self.model_name,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": text},
             ],
-            response_format=ChunkResponse,
-        )
-
+        }
+
+    def _parse(self, completion: ParsedChatCompletion[ChunkResponse]) -> list[str]:
+        """Extract the chunks from a parsed chat completion."""
+        if completion.usage is not None:
+            TRACER.annotate(
+                prompt_tokens=completion.usage.prompt_tokens,
+                completion_tokens=completion.usage.completion_tokens,
+            )
         parsed = completion.choices[0].message.parsed
         if parsed is None:
             raise ValueError("LLM failed to return valid JSON list of chunks.")  # noqa: TRY003
 
         return parsed.chunks
 
-    def _build_context(self, dossier: SubsidieDossier, chunk: str) -> str:
-        """Add structured dossier metadata to the chunk for better embeddings."""
-        return (
-            f"Dossier: {dossier.titel}\n"
-            f"Type: {dossier.type}\n"
-            f"Periode: {dossier.startdatum} tot {dossier.einddatum}\n"
-            f"Goedgekeurd budget: €{dossier.goedgekeurd_budget:,.2f}\n\n"
-            f"{chunk}"
-        )
+    def _cached(self, text: str) -> list[str] | None:
+        """Return the cached chunking of text, if any."""
+        if self.cache is None:
+            return None
+        return self.cache.get(self.cache.key_for(self.model_name, PROMPT_VERSION, text))
+
+    def _store(self, text: str, chunks: list[str]) -> list[str]:
+        """Remember the chunking of text and return it."""
+        if self.cache is not None:
+            key = self.cache.key_for(self.model_name, PROMPT_VERSION, text)
+            self.cache.put(key, chunks)
+        return chunks
@@ -0,0 +1,193 @@
+import asyncio
+import math
+import os
+import re
+from collections import deque
+from collections.abc import AsyncIterator, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import batched
+
+from kwak.schemas.dossier import ChunkRecord, SubsidieDossier
+from kwak.services.chunkers.base import AbstractChunker
+from kwak.utils.tokens import CHARS_PER_TOKEN
+
+ORIGINS = ("omschrijving", "advies")
+# A sentence ends at ., ! or ? (plus closing quotes or brackets) followed by
+# whitespace and a capital, or at a blank line; "bv. de" does not end one.
+SENTENCE_END = re.compile(
+    r"[.!?…]+[\"'\u201d\u2019)\]]*\s+(?=[A-ZÀ-Ý\"'\u201c\u2018(])|\n\s*\n"
+)
+WHITESPACE = re.compile(r"\s+")
+# Dossiers sent to a worker process at once, to amortize the pickling overhead.
+DOSSIERS_PER_TASK = 256
+
+Span = tuple[int, int]
+
+
+def _tokens(start: int, end: int) -> int:
+    """Estimate the tokens of the text between two offsets, like estimate_tokens."""
+    return math.ceil((end - start) / CHARS_PER_TOKEN)
+
+
+def sentence_spans(text: str, max_tokens: int) -> list[Span]:
+    """Return the offsets of the sentences of text.
+
+    Sentences longer than max_tokens are cut at the last whitespace that keeps
+    every piece within the limit, or mid-word if there is none.
+    """
+    spans: list[Span] = []
+    max_chars = max(int(max_tokens * CHARS_PER_TOKEN), 1)
+    leading = WHITESPACE.match(text)
+    start = leading.end() if leading else 0
+    for boundary in [m.end() for m in SENTENCE_END.finditer(text)] + [len(text)]:
+        end = start + len(text[start:boundary].rstrip())
+        while end - start > max_chars:
+            cut = max(
+                (
+                    m.start()
+                    for m in WHITESPACE.finditer(text, start + 1, start + max_chars + 1)
+                ),
+                default=start + max_chars,
+            )
+            spans.append((start, cut))
+            space = WHITESPACE.match(text, cut)
+            start = space.end() if space else cut
+        if end > start:
+            spans.append((start, end))
+        start = boundary
+    return spans
+
+
+def split_text(text: str, max_tokens: int, overlap: int) -> list[Span]:
+    """Pack the sentences of text into chunks of at most max_tokens tokens.
+
+    Consecutive chunks share their boundary sentences, up to overlap tokens,
+    so a passage cut at a chunk boundary is still found whole in one chunk.
+    """
+    sentences = sentence_spans(text, max_tokens)
+    chunks: list[Span] = []
+    i = 0
+    while i < len(sentences):
+        j = i + 1
+        while (
+            j < len(sentences)
+            and _tokens(sentences[i][0], sentences[j][1]) <= max_tokens
+        ):
+            j += 1
+        chunks.append((sentences[i][0], sentences[j - 1][1]))
+        if j == len(sentences):
+            break
+        # Step back over the overlap, as far as the next chunk still gains j
+        k = j
+        while (
+            k - 1 > i
+            and _tokens(sentences[k - 1][0], sentences[j - 1][1]) <= overlap
+            and _tokens(sentences[k - 1][0], sentences[j][1]) <= max_tokens
+        ):
+            k -= 1
+        i = k
+    return chunks
+
+
+def split_dossiers(
+    texts: list[tuple[str, ...]], max_tokens: int, overlap: int
+) -> list[list[list[Span]]]:
+    """Split the text fields of several dossiers; picklable for process pools.
+
+    Only offsets travel back to the parent process, which slices the texts it
+    already holds.
+    """
+    return [[split_text(text, max_tokens, overlap) for text in row] for row in texts]
+
+
+class SentenceChunker(AbstractChunker):
+    """Deterministic chunker packing whole sentences up to a token budget.
+
+    Chunks are measured with the token estimate used for embedding requests, so
+    with room for the dossier header prefixed at embed time they stay within the
+    embedding model's input limit. chunk_many fans dossiers out over a pool of
+    worker processes, which makes large corpora scale with the number of cores.
+    """
+
+    def __init__(
+        self, max_tokens: int = 256, overlap: int = 32, workers: int | None = None
+    ) -> None:
+        """Initialize the chunker; workers defaults to the number of CPU cores."""
+        if not 0 <= overlap < max_tokens:
+            msg = "overlap must be at least 0 and smaller than max_tokens"
+            raise ValueError(msg)
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.workers = workers or os.cpu_count() or 1
+
+    def chunk(self, dossier: SubsidieDossier) -> Iterable[ChunkRecord]:
+        """Split both text fields of a dossier into sentence-aligned chunks."""
+        texts = tuple(getattr(dossier, origin) for origin in ORIGINS)
+        spans = split_dossiers([texts], self.max_tokens, self.overlap)[0]
+        return self._records(dossier, spans)
+
+    async def chunk_many(
+        self, dossiers: Iterable[SubsidieDossier]
+    ) -> AsyncIterator[list[ChunkRecord]]:
+        """Chunk dossiers in worker processes, yielding chunks in input order.
+
+        Only a bounded window of batches is in flight at any time, so dossiers
+        are streamed from disk and chunks to disk without holding the corpus.
+        """
+        if self.workers <= 1:
+            async for chunks in super().chunk_many(dossiers):
+                yield chunks
+            return
+
+        loop = asyncio.get_running_loop()
+        split = partial(
+            split_dossiers, max_tokens=self.max_tokens, overlap=self.overlap
+        )
+        pending: deque[
+            tuple[tuple[SubsidieDossier, ...], asyncio.Future[list[list[list[Span]]]]]
+        ] = deque()
+        with ProcessPoolExecutor(self.workers) as pool:
+            try:
+                for batch in batched(dossiers, DOSSIERS_PER_TASK):
+                    texts = [
+                        tuple(getattr(dossier, origin) for origin in ORIGINS)
+                        for dossier in batch
+                    ]
+                    pending.append((batch, loop.run_in_executor(pool, split, texts)))
+                    if len(pending) >= 2 * self.workers:
+                        for records in await self._collect(*pending.popleft()):
+                            yield records
+                while pending:
+                    for records in await self._collect(*pending.popleft()):
+                        yield records
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    async def _collect(
+        self,
+        batch: tuple[SubsidieDossier, ...],
+        future: asyncio.Future[list[list[list[Span]]]],
+    ) -> list[list[ChunkRecord]]:
+        """Wait for a batch split in a worker and turn it into ChunkRecords."""
+        return [
+            list(self._records(dossier, spans))
+            for dossier, spans in zip(batch, await future, strict=True)
+        ]
+
+    def _records(
+        self, dossier: SubsidieDossier, spans: list[list[Span]]
+    ) -> Iterator[ChunkRecord]:
+        """Slice the chunks of a dossier's text fields at the given offsets."""
+        for origin, field_spans in zip(ORIGINS, spans, strict=True):
+            text = getattr(dossier, origin)
+            for index, (start, end) in enumerate(field_spans):
+                yield ChunkRecord(
+                    dossier_id=dossier.id,
+                    origin=origin,  # type: ignore[arg-type]
+                    index=index,
+                    start=start,
+                    end=end,
+                    content=text[start:end],
+                )
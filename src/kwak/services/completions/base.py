@@ -1,10 +1,33 @@
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletionMessageParam
+
+SYSTEM_PROMPT = "Je bent een behulpzame expert in subsidiedossiers."
+
+
+def chat_messages(prompt: str) -> list["ChatCompletionMessageParam"]:
+    """Build the chat messages sending prompt to a completion model."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
 
 
 class AbstractCompletion(ABC):
     """Abstract base class for LLM completion."""
 
+    name: str
+    model_name: str
+
     @abstractmethod
     def complete(self, prompt: str) -> str:
         """Generate a completion for the given prompt."""
         ...
+
+    @abstractmethod
+    def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Generate a completion for the given prompt, yielding text as it arrives."""
+        ...
@@ -1,34 +1,58 @@
 import os
+from collections.abc import AsyncIterator
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openai import OpenAIProvider
 
-from kwak.services.completions.base import AbstractCompletion
+from kwak.services.completions.base import AbstractCompletion, chat_messages
+from kwak.utils.tracing import TRACER
 
 
 class OllamaCompletion(AbstractCompletion):
     """Ollama completion service using a locally running Ollama instance."""
 
+    name = "ollama"
+
     def __init__(self, model_name: str = "deepseek-r1") -> None:
         """Initialize the OllamaDossierGenerator with a specific model."""
         provider = OpenAIProvider(base_url=os.getenv("OLLAMA_API_URL"))
         self.model = OpenAIModel(model_name, provider=provider)
         self.client = OpenAI(api_key="ollama", base_url=os.getenv("OLLAMA_API_URL"))
+        self.async_client = AsyncOpenAI(
+            api_key="ollama", base_url=os.getenv("OLLAMA_API_URL")
+        )
         self.model_name = model_name
 
     def complete(self, prompt: str) -> str:
         """Generate a completion for the given prompt using OpenAI API."""
-        completion = self.client.beta.chat.completions.parse(
-            model=self.model_name,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Je bent een behulpzame expert in subsidiedossiers.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.4,
-        )
+        # Free text needs the plain endpoint, not structured-output parsing
+        with TRACER.span("completion", model=self.model_name) as attributes:
+            completion = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=chat_messages(prompt),
+                temperature=0.4,
+            )
+            if completion.usage is not None:
+                attributes["prompt_tokens"] = completion.usage.prompt_tokens
+                attributes["completion_tokens"] = completion.usage.completion_tokens
+
+        return completion.choices[0].message.content or ""
 
-        return completion.choices[0].message.parsed or ""
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Stream a completion for the given prompt from Ollama."""
+        with TRACER.span("completion", model=self.model_name) as attributes:
+            response = await self.async_client.chat.completions.create(
+                model=self.model_name,
+                messages=chat_messages(prompt),
+                temperature=0.4,
+                stream=True,
+                # The final chunk then reports token usage, without choices
+                stream_options={"include_usage": True},
+            )
+            async for chunk in response:
+                if chunk.usage is not None:
+                    attributes["prompt_tokens"] = chunk.usage.prompt_tokens
+                    attributes["completion_tokens"] = chunk.usage.completion_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
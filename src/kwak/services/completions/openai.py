@@ -1,27 +1,49 @@
-from openai import OpenAI
+from collections.abc import AsyncIterator
 
-from kwak.services.completions.base import AbstractCompletion
+from openai import AsyncOpenAI, OpenAI
+
+from kwak.services.completions.base import AbstractCompletion, chat_messages
+from kwak.utils.tracing import TRACER
 
 
 class OpenAICompletion(AbstractCompletion):
     """OpenAI completion service using the OpenAI API."""
 
+    name = "openai"
+
     def __init__(self, model: str = "gpt-4") -> None:
         """Initialize the OpenAI completion service."""
         self.client = OpenAI()
-        self.model = model
+        self.async_client = AsyncOpenAI()
+        self.model_name = model
 
     def complete(self, prompt: str) -> str:
         """Generate a completion for the given prompt using OpenAI API."""
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Je bent een behulpzame expert in subsidiedossiers.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.4,
-        )
+        with TRACER.span("completion", model=self.model_name) as attributes:
+            response = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=chat_messages(prompt),
+                temperature=0.4,
+            )
+            if response.usage is not None:
+                attributes["prompt_tokens"] = response.usage.prompt_tokens
+                attributes["completion_tokens"] = response.usage.completion_tokens
         return response.choices[0].message.content or ""
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Stream a completion for the given prompt using OpenAI API."""
+        with TRACER.span("completion", model=self.model_name) as attributes:
+            response = await self.async_client.chat.completions.create(
+                model=self.model_name,
+                messages=chat_messages(prompt),
+                temperature=0.4,
+                stream=True,
+                # The final chunk then reports token usage, without choices
+                stream_options={"include_usage": True},
+            )
+            async for chunk in response:
+                if chunk.usage is not None:
+                    attributes["prompt_tokens"] = chunk.usage.prompt_tokens
+                    attributes["completion_tokens"] = chunk.usage.completion_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
@@ -0,0 +1,234 @@
+import contextlib
+import fcntl
+import os
+import shutil
+import threading
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import duckdb
+
+from kwak.services.rag.index import load_vss
+
+DEFAULT_DB_PATH = Path("data/kwak.db")
+# Seconds to wait for another process to release the database file
+LOCK_TIMEOUT = 60.0
+LOCK_POLL_INTERVAL = 0.1
+
+
+@dataclass(frozen=True)
+class DatabaseSettings:
+    """Where the kwak database lives and the DuckDB settings it is opened with.
+
+    threads, memory_limit (e.g. "4GB") and temp_directory, where DuckDB spills
+    work that does not fit in memory, keep DuckDB's defaults when None.
+    """
+
+    path: Path = DEFAULT_DB_PATH
+    threads: int | None = None
+    memory_limit: str | None = None
+    temp_directory: Path | None = None
+
+    def config(self) -> dict[str, Any]:
+        """Return the DuckDB configuration passed to every connection."""
+        config: dict[str, Any] = {}
+        if self.threads is not None:
+            config["threads"] = self.threads
+        if self.memory_limit is not None:
+            config["memory_limit"] = self.memory_limit
+        if self.temp_directory is not None:
+            config["temp_directory"] = str(self.temp_directory)
+        return config
+
+
+def _wal(path: Path) -> Path:
+    """Return the path of the write-ahead log of a DuckDB file."""
+    return path.with_name(path.name + ".wal")
+
+
+def _copy_in_kernel(source: Path, target: Path) -> bool:
+    """Copy a file with copy_file_range; returns False if it could not."""
+    if not hasattr(os, "copy_file_range"):
+        return False
+    try:
+        with source.open("rb") as src, target.open("wb") as dst:
+            remaining = os.fstat(src.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                if copied == 0:
+                    return False
+                remaining -= copied
+    except OSError:
+        # Not supported between these files, e.g. across filesystems
+        return False
+    return True
+
+
+def _copy(source: Path, target: Path) -> None:
+    """Copy a file inside the kernel, sharing its blocks where the filesystem can.
+
+    copy_file_range clones the file on filesystems such as Btrfs and XFS, which
+    takes no time whatever its size; elsewhere it still copies without passing
+    the data through Python.
+    """
+    if not _copy_in_kernel(source, target):
+        shutil.copyfile(source, target)
+
+
+@contextlib.contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on path, waiting while another process holds it."""
+    with path.open("a") as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def _wait_for_file[T](open_: Callable[[], T]) -> T:
+    """Open a database file, retrying while another process has it locked.
+
+    DuckDB lets one process write a file or any number read it; the others
+    fail to open it rather than wait.
+    """
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        try:
+            return open_()
+        except duckdb.IOException as e:
+            if "Could not set lock" not in str(e) or time.monotonic() > deadline:
+                raise
+        time.sleep(LOCK_POLL_INTERVAL)
+
+
+class Database:
+    """Connections to the kwak database, shared by everything in a process.
+
+    Queries run on read-only connections, which any number of processes can
+    hold at once, and their cursors are pooled so repeated queries skip opening
+    the file. Writes go to a copy of the file that replaces it once complete:
+    readers and writers never wait for each other, and a failed write leaves
+    the database untouched.
+    """
+
+    def __init__(self, settings: DatabaseSettings | None = None) -> None:
+        """Create a database handle; connections are opened on first use."""
+        self.settings = settings or DatabaseSettings()
+        self._lock = threading.Lock()
+        self._reader: duckdb.DuckDBPyConnection | None = None
+        self._cursors: list[duckdb.DuckDBPyConnection] = []
+
+    def configure(self, settings: DatabaseSettings) -> None:
+        """Switch to new settings, closing connections opened with the old ones."""
+        self.close()
+        self.settings = settings
+
+    @contextlib.contextmanager
+    def reader(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """Lend a read-only cursor from the pool for the enclosed block.
+
+        The pool keeps reading the database file it opened, even once a writer
+        replaced it, until `close`; writers of this process close it for their
+        changes to be seen. A cursor whose block raised is closed instead of
+        returned, so no failed transaction is handed out.
+        """
+        with self._lock:
+            if self._reader is None:
+                self._reader = _wait_for_file(
+                    lambda: duckdb.connect(
+                        str(self.settings.path),
+                        read_only=True,
+                        config=self.settings.config(),
+                    )
+                )
+            reader = self._reader
+            cursor = self._cursors.pop() if self._cursors else reader.cursor()
+
+        try:
+            yield cursor
+        except BaseException:
+            cursor.close()
+            raise
+        with self._lock:
+            # Unless the pool was closed meanwhile, the cursor goes back into it
+            if self._reader is reader:
+                self._cursors.append(cursor)
+                return
+        cursor.close()
+
+    @contextlib.contextmanager
+    def writer(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """Open a read-write connection to a staging copy of the database file.
+
+        The block runs on a copy next to the database file, which replaces the
+        file when the block completes. Processes reading the file meanwhile keep
+        the version they opened, so the swap never waits for them, nor they for
+        the write; they see the changes once they reopen the file. DuckDB shares
+        an open file between the connections of a process, so this one's pool is
+        closed afterwards, and other handles must close theirs. When the block
+        raises, the copy is discarded.
+
+        Writers take turns through a lock file, so concurrent ingests apply one
+        after the other rather than overwriting each other.
+        """
+        path = self.settings.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = path.with_name(path.name + ".staging")
+
+        with _file_lock(path.with_name(path.name + ".lock")):
+            for file in (staging, _wal(staging)):
+                file.unlink(missing_ok=True)
+            if _wal(path).exists():
+                self._checkpoint()
+            if path.exists():
+                _copy(path, staging)
+            try:
+                con = duckdb.connect(str(staging), config=self.settings.config())
+                try:
+                    # Writing to a table with an HNSW index requires VSS
+                    with contextlib.suppress(duckdb.Error):
+                        load_vss(con)
+                    yield con
+                    con.execute("CHECKPOINT")
+                finally:
+                    con.close()
+                staging.replace(path)
+            finally:
+                for file in (staging, _wal(staging)):
+                    file.unlink(missing_ok=True)
+            # The pool of this process would keep reading the replaced file
+            self.close()
+
+    def _checkpoint(self) -> None:
+        """Apply the write-ahead log an interrupted write left to the database file.
+
+        Copying the file alone would lose the log, and a log left next to the
+        file replacing it would be applied to that file.
+        """
+        self.close()
+        con = _wait_for_file(
+            lambda: duckdb.connect(
+                str(self.settings.path), config=self.settings.config()
+            )
+        )
+        try:
+            con.execute("CHECKPOINT")
+        finally:
+            con.close()
+
+    def close(self) -> None:
+        """Close the pooled read-only connection and its cursors."""
+        with self._lock:
+            reader, self._reader = self._reader, None
+            cursors, self._cursors = self._cursors, []
+        for cursor in cursors:
+            cursor.close()
+        if reader is not None:
+            reader.close()
+
+
+DATABASE = Database()
@@ -1,10 +1,177 @@
+import asyncio
+import hashlib
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from kwak.utils.aio import retry_async
+from kwak.utils.tokens import estimate_tokens
+from kwak.utils.tracing import TRACER
+
+if TYPE_CHECKING:
+    import numpy as np
+    import numpy.typing as npt
+
+# Embeddings as the rows of a float32 matrix
+type Vectors = npt.NDArray[np.float32]
+# Estimated tokens per embedding request: 90% of the 300,000 the OpenAI API
+# accepts, as estimate_tokens can undercount texts that tokenize poorly
+MAX_REQUEST_TOKENS = 270_000
+
+
+@dataclass(frozen=True)
+class BatchPolicy:
+    """How embedding requests are split, parallelised and retried."""
+
+    max_items: int = 2048
+    max_tokens: int = MAX_REQUEST_TOKENS
+    max_concurrency: int = 4
+    max_retries: int = 5
+    backoff: float = 1.0
+
+
+def iter_batches[K](
+    items: Iterable[tuple[K, str]], policy: BatchPolicy
+) -> Iterator[list[tuple[K, str]]]:
+    """Cut (key, text) pairs into consecutive batches within the policy's limits.
+
+    Batches are cut as they are consumed, so items can be a lazy stream. A
+    single text exceeding max_tokens still gets a batch of its own, so the
+    provider can report it instead of the text being silently dropped.
+    """
+    batch: list[tuple[K, str]] = []
+    tokens = 0
+    for key, text in items:
+        text_tokens = estimate_tokens(text)
+        if batch and (
+            len(batch) >= policy.max_items or tokens + text_tokens > policy.max_tokens
+        ):
+            yield batch
+            batch, tokens = [], 0
+        batch.append((key, text))
+        tokens += text_tokens
+    if batch:
+        yield batch
 
 
 class AbstractEmbeddingProvider(ABC):
-    """Abstract base class for dossier generators."""
+    """Abstract base class for embedding providers."""
+
+    name: str
+    model: str
+    dimension: int
+    # Whether the provider can return vectors shortened to fewer dimensions
+    truncatable: bool = False
+    # Longest text, in tokens, the model embeds without truncating or failing
+    max_input_tokens: int = 8191
+
+    def __init__(
+        self, policy: BatchPolicy | None = None, dimensions: int | None = None
+    ) -> None:
+        """Initialize the provider with a batching policy.
+
+        dimensions shortens the vectors of providers that support it, such as
+        Matryoshka-trained models; other providers only accept their own size.
+        """
+        self.policy = policy or BatchPolicy()
+        if dimensions is not None and dimensions != self.dimension:
+            if not self.truncatable or not 0 < dimensions < self.dimension:
+                msg = f"{self.name} cannot embed into {dimensions} dimensions"
+                raise ValueError(msg)
+            self.dimension = dimensions
+
+    def fingerprint(self, text: str) -> str:
+        """Hash text together with the provider, model and dimension.
+
+        Two texts with the same fingerprint are guaranteed to embed to the same
+        vector, so the fingerprint can key stored and cached embeddings.
+        """
+        key = "\x1f".join((self.name, self.model, str(self.dimension), text))
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    async def embed(
+        self,
+        texts: list[str],
+        on_batch: Callable[[int], None] | None = None,
+    ) -> Vectors:
+        """Embed a list of texts into the rows of a float32 matrix.
+
+        Texts are embedded as by `embed_each`. The row order matches the input
+        order; on_batch is called with the size of each finished batch.
+        """
+        # Imported on first use, as it adds noticeably to the startup of every command
+        import numpy as np
+
+        matrix = np.empty((len(texts), self.dimension), dtype=np.float32)
+
+        def store(rows: list[int], vectors: Vectors) -> None:
+            matrix[rows] = vectors
+            if on_batch is not None:
+                on_batch(len(rows))
+
+        await self.embed_each(enumerate(texts), store)
+        return matrix
+
+    async def embed_each[K](
+        self,
+        items: Iterable[tuple[K, str]],
+        on_batch: Callable[[list[K], Vectors], None],
+    ) -> None:
+        """Embed the texts of (key, text) pairs, handing over each batch's vectors.
+
+        Texts are split into batches according to the policy, which are sent
+        concurrently and retried on transient errors. on_batch is called with
+        the keys of each finished batch and their vectors, in the order batches
+        finish. Batches are only cut from items while fewer than max_concurrency
+        requests are in flight, so neither the texts nor the vectors of a large
+        input are ever held at once. The first failed batch cancels the others.
+        """
+        pending: set[asyncio.Task[None]] = set()
+
+        async def run(batch: list[tuple[K, str]]) -> None:
+            texts = [text for _, text in batch]
+            with TRACER.span(
+                "embed.batch",
+                provider=self.name,
+                items=len(texts),
+                tokens=sum(estimate_tokens(text) for text in texts),
+            ):
+                vectors = await retry_async(
+                    lambda: self._embed_batch(texts),
+                    retries=self.policy.max_retries,
+                    backoff=self.policy.backoff,
+                    should_retry=self._is_retryable,
+                )
+            on_batch([key for key, _ in batch], vectors)
+
+        async def settle(limit: int) -> None:
+            """Wait until at most limit batches are in flight."""
+            nonlocal pending
+            while len(pending) > limit:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    task.result()
+
+        try:
+            for batch in iter_batches(items, self.policy):
+                await settle(self.policy.max_concurrency - 1)
+                pending.add(asyncio.create_task(run(batch)))
+            await settle(0)
+        finally:
+            for task in pending:
+                task.cancel()
 
     @abstractmethod
-    async def embed(self, texts: list[str]) -> list[list[float]]:
-        """Embed a list of texts into vector representations."""
+    async def _embed_batch(self, texts: list[str]) -> Vectors:
+        """Embed a single batch of texts in one provider request.
+
+        Returns a float32 matrix with a row per text.
+        """
         ...
+
+    def _is_retryable(self, error: Exception) -> bool:  # noqa: ARG002
+        """Return True if a failed request may succeed when retried."""
+        return False
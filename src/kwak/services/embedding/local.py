@@ -0,0 +1,218 @@
+import asyncio
+import os
+import re
+import unicodedata
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+import numpy as np
+import numpy.typing as npt
+
+from kwak.services.embedding.base import (
+    AbstractEmbeddingProvider,
+    BatchPolicy,
+    Vectors,
+)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# Character n-grams let Dutch compounds and inflections share features.
+CHAR_NGRAM = 3
+CHAR_NGRAM_WEIGHT = 0.5
+# Distinct tokens a worker process keeps hashed features of before starting over.
+VOCABULARY_SIZE = 1 << 20
+
+Codes = npt.NDArray[np.uint64]
+
+
+def _hash(feature: str) -> int:
+    """Hash a feature to 32 bits; the top bit is its sign, the rest its bucket."""
+    return zlib.crc32(feature.encode())
+
+
+def _mix(a: Codes, b: Codes) -> Codes:
+    """Hash pairs of 32-bit feature hashes into one, for word bigrams."""
+    x = (a * np.uint64(0x9E3779B97F4A7C15)) ^ b
+    x ^= x >> np.uint64(29)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(32)
+    return x & np.uint64(0xFFFFFFFF)
+
+
+class Vocabulary(dict[str, int]):
+    """Ids of the tokens seen by this process, with their hashed features.
+
+    Hashing a token and its character trigrams is done once per distinct
+    token; texts are then turned into features by array lookups.
+    """
+
+    def __init__(self) -> None:
+        """Start with an empty vocabulary."""
+        super().__init__()
+        self.clear()
+
+    def clear(self) -> None:
+        """Forget every token, e.g. when the vocabulary grew too large."""
+        super().clear()
+        self.codes: Codes = np.empty(0, dtype=np.uint64)
+        # Trigram hashes of token i are trigrams[offsets[i]:offsets[i + 1]]
+        self.trigrams: Codes = np.empty(0, dtype=np.uint64)
+        self.offsets = np.zeros(1, dtype=np.intp)
+        self._new: list[str] = []
+
+    def __missing__(self, token: str) -> int:
+        """Give a token seen for the first time the next id."""
+        self._new.append(token)
+        self[token] = id_ = len(self)
+        return id_
+
+    def lookup(self, tokens: list[str]) -> npt.NDArray[np.intp]:
+        """Return the ids of tokens, hashing the features of new ones."""
+        if len(self) + len(tokens) > VOCABULARY_SIZE:
+            self.clear()
+        ids = np.fromiter(map(self.__getitem__, tokens), np.intp, len(tokens))
+        if self._new:
+            padded = [f"<{token}>" for token in self._new]
+            trigrams = [
+                [
+                    _hash("#" + p[j : j + CHAR_NGRAM])
+                    for j in range(len(p) - CHAR_NGRAM + 1)
+                ]
+                for p in padded
+            ]
+            self.codes = np.concatenate(
+                [self.codes, np.fromiter(map(_hash, self._new), np.uint64)]
+            )
+            self.trigrams = np.concatenate(
+                [self.trigrams, np.fromiter(chain.from_iterable(trigrams), np.uint64)]
+            )
+            sizes = np.fromiter(map(len, trigrams), np.intp, len(trigrams))
+            self.offsets = np.concatenate(
+                [self.offsets, self.offsets[-1] + np.cumsum(sizes)]
+            )
+            self._new = []
+        return ids
+
+
+VOCABULARY = Vocabulary()
+
+
+def hashed_features(
+    texts: list[str],
+) -> tuple[Codes, Codes, npt.NDArray[np.float64]]:
+    """Hash the word unigrams, word bigrams and character trigrams of texts.
+
+    Returns the nonzeros of the sparse text-by-feature count matrix as text
+    rows, 32-bit feature hashes and counts. Character trigrams are counted per
+    distinct token, weighted by its frequency.
+    """
+    tokens = [
+        TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).casefold())
+        for text in texts
+    ]
+    lengths = np.fromiter(map(len, tokens), np.intp, len(tokens))
+    ids = VOCABULARY.lookup(list(chain.from_iterable(tokens)))
+    rows = np.repeat(np.arange(len(texts), dtype=np.uint64), lengths)
+
+    # Word bigrams never span two texts
+    within = rows[1:] == rows[:-1]
+    codes = VOCABULARY.codes
+    bigram_rows = rows[1:][within]
+    bigrams = _mix(codes[ids[:-1][within]], codes[ids[1:][within]])
+
+    pairs, counts = np.unique(
+        (rows << np.uint64(32)) | ids.astype(np.uint64), return_counts=True
+    )
+    token_rows, token_ids = pairs >> np.uint64(32), (pairs & 0xFFFFFFFF).astype(np.intp)
+    starts = VOCABULARY.offsets[token_ids]
+    sizes = VOCABULARY.offsets[token_ids + 1] - starts
+    # Positions of the trigrams of every (text, token) pair, laid end to end
+    first = np.cumsum(sizes) - sizes
+    positions = np.repeat(starts - first, sizes) + np.arange(sizes.sum())
+
+    rows = np.concatenate([token_rows, bigram_rows, np.repeat(token_rows, sizes)])
+    hashes = np.concatenate([codes[token_ids], bigrams, VOCABULARY.trigrams[positions]])
+    weights = np.concatenate(
+        [
+            counts.astype(np.float64),
+            np.ones(len(bigrams)),
+            np.repeat(counts * CHAR_NGRAM_WEIGHT, sizes),
+        ]
+    )
+    # Add up features that occur more than once in a text
+    keys, inverse = np.unique((rows << np.uint64(32)) | hashes, return_inverse=True)
+    totals = np.bincount(inverse, weights=weights, minlength=len(keys))
+    return keys >> np.uint64(32), keys & np.uint64(0xFFFFFFFF), totals
+
+
+def hash_embed_many(texts: list[str], dimension: int) -> Vectors:
+    """Embed texts by feature hashing into unit vectors of the given dimension.
+
+    The sparse feature counts of the batch are damped logarithmically and
+    projected onto dimension buckets by a random-sign projection: every
+    feature adds to one bucket with a sign taken from its hash, so collisions
+    cancel out instead of piling up. After L2 normalization, cosine similarity
+    behaves like TF-weighted overlap. Returns a float32 matrix with a row per
+    text, which worker processes hand back as one buffer. Picklable for process
+    pools.
+    """
+    if not texts:
+        return np.empty((0, dimension), dtype=np.float32)
+    rows, hashes, counts = hashed_features(texts)
+    signs = np.where(hashes & np.uint64(0x80000000), 1.0, -1.0)
+    buckets = (hashes & np.uint64(0x7FFFFFFF)) % np.uint64(dimension)
+    matrix = np.bincount(
+        (rows * np.uint64(dimension) + buckets).astype(np.intp),
+        weights=signs * (1.0 + np.log(counts)),
+        minlength=len(texts) * dimension,
+    ).reshape(len(texts), dimension)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix.astype(np.float32)
+
+
+class LocalEmbeddingProvider(AbstractEmbeddingProvider):
+    """Offline embedding provider based on hashed word and character n-grams.
+
+    It needs no model, network or service and is deterministic, which makes it
+    suited to development, CI and cheap first-stage retrieval; its vectors
+    capture lexical rather than semantic similarity. Large batches are spread
+    over worker processes, so throughput scales with the number of CPU cores.
+    """
+
+    name = "local"
+    model = "hashed-ngrams-v2"
+    dimension = 1536
+    # The dimension is just the number of hash buckets
+    truncatable = True
+
+    # Batches smaller than this are embedded inline, e.g. single queries.
+    min_pool_batch = 64
+
+    def __init__(
+        self, policy: BatchPolicy | None = None, dimensions: int | None = None
+    ) -> None:
+        """Initialize the provider; worker processes start on first use."""
+        super().__init__(
+            policy or BatchPolicy(max_items=512, max_concurrency=os.cpu_count() or 1),
+            dimensions,
+        )
+        self._pool: ProcessPoolExecutor | None = None
+
+    def __del__(self) -> None:
+        """Shut down the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _embed_batch(self, texts: list[str]) -> Vectors:
+        """Embed a batch of texts locally, in a worker process if it is large."""
+        if len(texts) < self.min_pool_batch:
+            return hash_embed_many(texts, self.dimension)
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.policy.max_concurrency)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool, hash_embed_many, texts, self.dimension
+        )
@@ -1,9 +1,15 @@
-from kwak.services.embedding.base import AbstractEmbeddingProvider
+from kwak.services.embedding.base import AbstractEmbeddingProvider, Vectors
 
 
 class OllamaEmbeddingProvider(AbstractEmbeddingProvider):
     """Placeholder for future Ollama embedding support."""
 
-    async def embed(self, texts: list[str]) -> list[list[float]]:
-        """Embed a list of texts into vector representations using Ollama."""
+    name = "ollama"
+    model = "nomic-embed-text"
+    dimension = 768
+    # Ollama's default context window, smaller than the model's 8192 tokens
+    max_input_tokens = 2048
+
+    async def _embed_batch(self, texts: list[str]) -> Vectors:
+        """Embed a batch of texts into vector representations using Ollama."""
         raise NotImplementedError("Ollama embedding not yet implemented")
@@ -1,19 +1,50 @@
+import numpy as np
 import openai
 
-from kwak.services.embedding.base import AbstractEmbeddingProvider
+from kwak.services.embedding.base import (
+    AbstractEmbeddingProvider,
+    BatchPolicy,
+    Vectors,
+)
 
 
 class OpenAIEmbeddingProvider(AbstractEmbeddingProvider):
     """OpenAI embedding provider using the OpenAI API."""
 
-    def __init__(self) -> None:
+    name = "openai"
+    dimension = 1536
+    # text-embedding-3 models are Matryoshka-trained and accept `dimensions`
+    truncatable = True
+
+    def __init__(
+        self,
+        model: str = "text-embedding-3-small",
+        policy: BatchPolicy | None = None,
+        dimensions: int | None = None,
+    ) -> None:
         """Initialize the OpenAI embedding provider."""
-        self.client = openai.OpenAI()
+        super().__init__(policy, dimensions)
+        # Retries are handled by the batching policy, not by the client.
+        self.client = openai.AsyncOpenAI(max_retries=0)
+        self.model = model
+
+    async def _embed_batch(self, texts: list[str]) -> Vectors:
+        """Embed a single batch of texts in one API request."""
+        # Only ask for shortened vectors, older models reject `dimensions`
+        truncated = self.dimension != type(self).dimension
+        response = await self.client.embeddings.create(
+            input=texts,
+            model=self.model,
+            dimensions=self.dimension if truncated else openai.NOT_GIVEN,
+        )
 
-    async def embed(self, texts: list[str]) -> list[list[float]]:
-        """Embed a list of texts into vector representations."""
-        response = self.client.embeddings.create(
-            input=texts, model="text-embedding-3-small"
+        return np.array(
+            [embedding.embedding for embedding in response.data], dtype=np.float32
         )
 
-        return [embedding.embedding for embedding in response.data]
+    def _is_retryable(self, error: Exception) -> bool:
+        """Retry rate limits (429) and transient server-side failures."""
+        return isinstance(
+            error,
+            openai.RateLimitError | openai.InternalServerError | openai.APITimeoutError,
+        )
@@ -1,24 +1,73 @@
-from collections.abc import Callable
-
-from kwak.services.completions.ollama import OllamaCompletion
-from kwak.services.completions.openai import OpenAICompletion
-from kwak.services.embedding.base import AbstractEmbeddingProvider
-from kwak.services.embedding.ollama import OllamaEmbeddingProvider
-from kwak.services.embedding.openai import OpenAIEmbeddingProvider
-from kwak.services.generators.base import AbstractDossierGenerator
-from kwak.services.generators.ollama import OllamaDossierGenerator
-from kwak.services.generators.openai import OpenAIDossierGenerator
-
-COMPLETION_REGISTRY = {
-    "openai": OpenAICompletion,
-    "ollama": OllamaCompletion,
-}
-GENERATOR_REGISTRY: dict[str, Callable[[], AbstractDossierGenerator]] = {
-    "gpt-4": lambda: OpenAIDossierGenerator("gpt-4"),
-    "deepseek-r1": lambda: OllamaDossierGenerator(),
-}
-
-EMBEDDING_REGISTRY: dict[str, Callable[[], AbstractEmbeddingProvider]] = {
-    "openai": lambda: OpenAIEmbeddingProvider(),
-    "ollama": lambda: OllamaEmbeddingProvider(),
-}
+import importlib
+from collections.abc import Iterator, Mapping
+from typing import TYPE_CHECKING, cast
+
+if TYPE_CHECKING:
+    from kwak.services.completions.base import AbstractCompletion
+    from kwak.services.embedding.base import AbstractEmbeddingProvider
+    from kwak.services.generators.base import AbstractDossierGenerator
+    from kwak.services.vectorstores.base import AbstractVectorStore
+
+
+class LazyRegistry[T](Mapping[str, T]):
+    """Registry of providers referenced as "module:attribute" strings.
+
+    A provider's module, with its SDK, is only imported when the provider is
+    looked up, so checking a name or listing the registry stays cheap and a
+    command pays only for the providers it uses.
+    """
+
+    def __init__(self, targets: Mapping[str, str]) -> None:
+        """Initialize the registry from names mapped to import paths."""
+        self.targets = dict(targets)
+
+    def __getitem__(self, name: str) -> T:
+        """Import and return the provider registered under name."""
+        module, _, attribute = self.targets[name].partition(":")
+        return cast("T", getattr(importlib.import_module(module), attribute))
+
+    def __contains__(self, name: object) -> bool:
+        """Check whether name is registered without importing its provider."""
+        return name in self.targets
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the registered names without importing anything."""
+        return iter(self.targets)
+
+    def __len__(self) -> int:
+        """Return the number of registered providers."""
+        return len(self.targets)
+
+    def __repr__(self) -> str:
+        """Show the registered names and import paths."""
+        return f"{type(self).__name__}({self.targets!r})"
+
+
+COMPLETION_REGISTRY: LazyRegistry[type["AbstractCompletion"]] = LazyRegistry(
+    {
+        "openai": "kwak.services.completions.openai:OpenAICompletion",
+        "ollama": "kwak.services.completions.ollama:OllamaCompletion",
+    }
+)
+# Generators are registered under a model name and built with its default model
+GENERATOR_REGISTRY: LazyRegistry[type["AbstractDossierGenerator"]] = LazyRegistry(
+    {
+        "gpt-4": "kwak.services.generators.openai:OpenAIDossierGenerator",
+        "deepseek-r1": "kwak.services.generators.ollama:OllamaDossierGenerator",
+    }
+)
+
+EMBEDDING_REGISTRY: LazyRegistry[type["AbstractEmbeddingProvider"]] = LazyRegistry(
+    {
+        "openai": "kwak.services.embedding.openai:OpenAIEmbeddingProvider",
+        "ollama": "kwak.services.embedding.ollama:OllamaEmbeddingProvider",
+        "local": "kwak.services.embedding.local:LocalEmbeddingProvider",
+    }
+)
+
+VECTOR_STORE_REGISTRY: LazyRegistry[type["AbstractVectorStore"]] = LazyRegistry(
+    {
+        "duckdb": "kwak.services.vectorstores.duckdb:DuckDBVectorStore",
+        "numpy": "kwak.services.vectorstores.numpy:NumpyVectorStore",
+    }
+)
@@ -1,14 +1,80 @@
+import asyncio
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
 
 from kwak.schemas.dossier import SubsidieDossier
+from kwak.utils.aio import retry_async
+from kwak.utils.tracing import TRACER
+
+
+@dataclass(frozen=True)
+class GenerationPolicy:
+    """How many dossiers are generated at once and how failures are retried."""
+
+    max_concurrency: int = 4
+    timeout: float = 300.0
+    max_retries: int = 3
+    backoff: float = 2.0
 
 
 class AbstractDossierGenerator(ABC):
     """Abstract base class for dossier generators."""
 
+    def __init__(self, policy: GenerationPolicy | None = None) -> None:
+        """Initialize the generator with a concurrency and retry policy."""
+        self.policy = policy or GenerationPolicy()
+
+    async def generate_many(
+        self,
+        count: int,
+        dossier_type: str,
+        start_year: int,
+        end_year: int,
+        on_error: Callable[[Exception], None] | None = None,
+    ) -> AsyncIterator[SubsidieDossier]:
+        """Generate count dossiers concurrently, yielding each as it completes.
+
+        At most max_concurrency requests are in flight; each attempt is bounded by
+        the policy timeout and retried on transient errors. A generation that
+        still fails is passed to on_error, or raised if no handler is given.
+        """
+        semaphore = asyncio.Semaphore(self.policy.max_concurrency)
+
+        async def attempt() -> SubsidieDossier:
+            with TRACER.span("generate", type=dossier_type):
+                async with asyncio.timeout(self.policy.timeout):
+                    return await self.generate(dossier_type, start_year, end_year)
+
+        async def run() -> SubsidieDossier:
+            async with semaphore:
+                return await retry_async(
+                    attempt,
+                    retries=self.policy.max_retries,
+                    backoff=self.policy.backoff,
+                    should_retry=self._is_retryable,
+                )
+
+        tasks = [asyncio.create_task(run()) for _ in range(count)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    yield await next_done
+                except Exception as e:
+                    if on_error is None:
+                        raise
+                    on_error(e)
+        finally:
+            for task in tasks:
+                task.cancel()
+
     @abstractmethod
     async def generate(
         self, dossier_type: str, start_year: int, end_year: int
     ) -> SubsidieDossier:
         """Generate a SubsidieDossier for the given dossier type and year range."""
         ...
+
+    def _is_retryable(self, error: Exception) -> bool:
+        """Return True if a failed generation may succeed when retried."""
+        return isinstance(error, TimeoutError)
@@ -2,24 +2,31 @@ import os
 import random
 from datetime import date, timedelta
 
-from openai import OpenAI
+import openai
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openai import OpenAIProvider
 
 from kwak.schemas.dossier import SubsidieDossier
-from kwak.services.generators.base import AbstractDossierGenerator
+from kwak.services.generators.base import AbstractDossierGenerator, GenerationPolicy
 from kwak.utils import idgen
+from kwak.utils.tracing import TRACER
 
 
 class OllamaDossierGenerator(AbstractDossierGenerator):
     """Generates subsidy dossiers using a Ollama supported model."""
 
-    def __init__(self, model_name: str = "deepseek-r1") -> None:
+    def __init__(
+        self, model_name: str = "deepseek-r1", policy: GenerationPolicy | None = None
+    ) -> None:
         """Initialize the OllamaDossierGenerator with a specific model."""
+        super().__init__(policy)
         provider = OpenAIProvider(base_url=os.getenv("OLLAMA_API_URL"))
         self.model = OpenAIModel(model_name, provider=provider)
         self.model_name = model_name
-        self.client = OpenAI(api_key="ollama", base_url=os.getenv("OLLAMA_API_URL"))
+        # Timeouts and retries are handled by the generation policy.
+        self.client = openai.AsyncOpenAI(
+            api_key="ollama", base_url=os.getenv("OLLAMA_API_URL"), max_retries=0
+        )
 
     async def generate(
         self, dossier_type: str, start_year: int, end_year: int
@@ -46,7 +53,7 @@ subsidieaanvraag met volgende eigenschappen:
 minstens 1000 en maximaal 10000 tekens
 - advies: een gemotiveerd advies van minstens 1000 en maximaal 2000 tekens
 """
-        completion = self.client.beta.chat.completions.parse(
+        completion = await self.client.beta.chat.completions.parse(
             model=self.model_name,
             messages=[
                 {
@@ -60,7 +67,22 @@ minstens 1000 en maximaal 10000 tekens
             response_format=SubsidieDossier,
         )
 
+        if completion.usage is not None:
+            TRACER.annotate(
+                prompt_tokens=completion.usage.prompt_tokens,
+                completion_tokens=completion.usage.completion_tokens,
+            )
         parsed = completion.choices[0].message.parsed
         if parsed is None:
             raise ValueError("Failed to parse SubsidieDossier from Ollama response.")  # noqa: TRY003
         return parsed
+
+    def _is_retryable(self, error: Exception) -> bool:
+        """Retry timeouts, rate limits and transient server-side failures."""
+        return super()._is_retryable(error) or isinstance(
+            error,
+            openai.RateLimitError
+            | openai.InternalServerError
+            | openai.APITimeoutError
+            | openai.APIConnectionError,
+        )
@@ -2,19 +2,24 @@ import random
 from datetime import date, timedelta
 
 from pydantic_ai import Agent
+from pydantic_ai.exceptions import ModelHTTPError
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openai import OpenAIProvider
 
 from kwak.schemas.dossier import SubsidieDossier
-from kwak.services.generators.base import AbstractDossierGenerator
+from kwak.services.generators.base import AbstractDossierGenerator, GenerationPolicy
 from kwak.utils import idgen
+from kwak.utils.tracing import TRACER
 
 
 class OpenAIDossierGenerator(AbstractDossierGenerator):
     """Generates subsidy dossiers using OpenAI's GPT model."""
 
-    def __init__(self, model_name: str = "gpt-4") -> None:
+    def __init__(
+        self, model_name: str = "gpt-4", policy: GenerationPolicy | None = None
+    ) -> None:
         """Initialize the OpenAIDossierGenerator with a specific model."""
+        super().__init__(policy)
         provider = OpenAIProvider()
         model = OpenAIModel(model_name, provider=provider)
         self.agent = Agent(model, output_type=SubsidieDossier)
@@ -45,4 +50,16 @@ volgende eigenschappen:
 - advies: een gemotiveerd advies van minstens 1000 en maximaal 2000 tekens
 """
         result = await self.agent.run(prompt)
+        usage = result.usage()
+        TRACER.annotate(
+            prompt_tokens=usage.request_tokens or 0,
+            completion_tokens=usage.response_tokens or 0,
+        )
         return result.output
+
+    def _is_retryable(self, error: Exception) -> bool:
+        """Retry timeouts, rate limits (429) and transient server-side failures."""
+        return super()._is_retryable(error) or (
+            isinstance(error, ModelHTTPError)
+            and (error.status_code == 429 or error.status_code >= 500)  # noqa: PLR2004
+        )
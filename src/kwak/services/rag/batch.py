@@ -0,0 +1,63 @@
+import asyncio
+from collections.abc import AsyncIterator, Callable
+
+import duckdb
+
+from kwak.schemas.questions import Answer, Question
+from kwak.services.completions.base import AbstractCompletion
+from kwak.services.embedding.base import AbstractEmbeddingProvider
+from kwak.services.rag.prompt import build_prompt
+from kwak.services.rag.retrieval import fetch_chunks, nearest_chunk_ids
+
+
+async def answer_batch(  # noqa: PLR0913
+    con: duckdb.DuckDBPyConnection,
+    questions: list[Question],
+    embedder: AbstractEmbeddingProvider,
+    completion: AbstractCompletion,
+    top_k: int = 5,
+    max_concurrency: int = 8,
+    on_retrieved: Callable[[], None] | None = None,
+) -> AsyncIterator[Answer]:
+    """Answer many questions at once, yielding answers as they complete.
+
+    Questions are embedded in batched provider calls, retrieved with a single
+    matrix query, and completed concurrently with at most max_concurrency
+    requests in flight. A failed completion yields an answer carrying the error.
+    """
+    embeddings = await embedder.embed([q.question for q in questions])
+    rankings = nearest_chunk_ids(con, embeddings, top_k)
+    chunks = fetch_chunks(con, list({id_ for ranking in rankings for id_ in ranking}))
+    if on_retrieved is not None:
+        on_retrieved()
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def answer(question: Question, ranking: list[str]) -> Answer:
+        # Chunks of dossiers that are no longer in the database are left out
+        ranking = [id_ for id_ in ranking if id_ in chunks]
+        result = Answer(
+            id=question.id, question=question.question, answer=None, chunk_ids=ranking
+        )
+        if not ranking:
+            result.error = "No results found"
+            return result
+
+        prompt = build_prompt(question.question, (chunks[id_] for id_ in ranking))
+        async with semaphore:
+            try:
+                result.answer = await asyncio.to_thread(completion.complete, prompt)
+            except Exception as e:  # noqa: BLE001
+                result.error = str(e)
+        return result
+
+    tasks = [
+        asyncio.create_task(answer(question, ranking))
+        for question, ranking in zip(questions, rankings, strict=True)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,146 @@
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from kwak.schemas.dossier import DossierChunk
+from kwak.utils.tokens import estimate_tokens
+
+WORD_PATTERN = re.compile(r"\w+")
+# Chunks are compared on overlapping runs of this many words.
+SHINGLE_SIZE = 3
+
+
+@dataclass(frozen=True)
+class ContextPolicy:
+    """How retrieved chunks are condensed into the context of a prompt.
+
+    Chunks are added in rank order until max_tokens is reached. A chunk whose
+    word shingles overlap an already chosen chunk of the same dossier by at
+    least duplicate_overlap is dropped. With mmr set, chunks are reordered by
+    maximal marginal relevance first: 1 keeps the ranking, lower values favour
+    chunks unlike the ones chosen before.
+    """
+
+    max_tokens: int = 3_000
+    duplicate_overlap: float = 0.8
+    mmr: float | None = None
+
+
+@dataclass(frozen=True)
+class Context:
+    """The assembled context text with what it took from the retrieved chunks."""
+
+    text: str
+    chunks: int
+    used: int
+    duplicates: int
+    tokens: int
+    tokens_saved: int
+
+
+def dossier_header(chunk: DossierChunk) -> str:
+    """Format the metadata of the dossier a chunk belongs to."""
+    return (
+        f"Dossier: {chunk.title} ({chunk.dossier_id})\n"
+        f"Type: {chunk.type}\n"
+        f"Periode: {chunk.startdatum} tot {chunk.einddatum}\n"
+        f"Goedgekeurd budget: €{chunk.goedgekeurd_budget:,.2f}"
+    )
+
+
+def _shingles(text: str) -> frozenset[tuple[str, ...]]:
+    """Return the overlapping word n-grams of text, or its words if it is short."""
+    words = WORD_PATTERN.findall(text.casefold())
+    if len(words) <= SHINGLE_SIZE:
+        return frozenset((word,) for word in words)
+    return frozenset(
+        tuple(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)
+    )
+
+
+def _overlap(a: frozenset[tuple[str, ...]], b: frozenset[tuple[str, ...]]) -> float:
+    """Share of the smaller shingle set that also occurs in the other.
+
+    Unlike Jaccard similarity this flags a chunk contained in a longer,
+    overlapping chunk as a duplicate.
+    """
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def _mmr_order(shingles: list[frozenset[tuple[str, ...]]], weight: float) -> list[int]:
+    """Reorder ranked chunks by maximal marginal relevance.
+
+    Relevance falls linearly with the retrieval rank and similarity is the
+    lexical overlap, so no embeddings are needed.
+    """
+    remaining = list(range(len(shingles)))
+    order: list[int] = []
+    while remaining:
+        scores = {
+            i: weight * (1 - i / len(shingles))
+            - (1 - weight)
+            * max((_overlap(shingles[i], shingles[j]) for j in order), default=0.0)
+            for i in remaining
+        }
+        best = max(remaining, key=scores.__getitem__)
+        remaining.remove(best)
+        order.append(best)
+    return order
+
+
+def assemble_context(
+    chunks: Iterable[DossierChunk], policy: ContextPolicy | None = None
+) -> Context:
+    """Condense ranked chunks into a prompt context within a token budget.
+
+    Chunks are grouped per dossier, in the order of each dossier's best chunk,
+    and every dossier's metadata is written once instead of with every chunk.
+    Near-duplicate chunks and chunks that no longer fit the budget are left out;
+    tokens_saved compares the result with giving every chunk its own header.
+    """
+    policy = policy or ContextPolicy()
+    ranked = list(chunks)
+    bodies = [c.content.strip() for c in ranked]
+    shingles = [_shingles(body) for body in bodies]
+    order = (
+        _mmr_order(shingles, policy.mmr)
+        if policy.mmr is not None
+        else range(len(ranked))
+    )
+
+    groups: dict[str, list[int]] = {}
+    tokens = duplicates = 0
+    for i in order:
+        group = groups.get(ranked[i].dossier_id, [])
+        if any(
+            _overlap(shingles[i], shingles[j]) >= policy.duplicate_overlap
+            for j in group
+        ):
+            duplicates += 1
+            continue
+
+        cost = estimate_tokens(bodies[i]) + (
+            0 if group else estimate_tokens(dossier_header(ranked[i]))
+        )
+        if tokens + cost > policy.max_tokens:
+            continue
+        tokens += cost
+        groups.setdefault(ranked[i].dossier_id, []).append(i)
+
+    text = "\n\n".join(
+        "\n\n".join([dossier_header(ranked[group[0]]), *(bodies[i] for i in group)])
+        for group in groups.values()
+    )
+    naive = estimate_tokens(
+        "\n\n".join(f"{dossier_header(c)}\n\n{c.content}" for c in ranked)
+    )
+    return Context(
+        text=text,
+        chunks=len(ranked),
+        used=sum(len(group) for group in groups.values()),
+        duplicates=duplicates,
+        tokens=estimate_tokens(text),
+        tokens_saved=max(naive - estimate_tokens(text), 0),
+    )
@@ -0,0 +1,195 @@
+import duckdb
+
+from kwak.services.rag.quantize import Quantization, rescored_nearest
+from kwak.services.rag.vectors import vector_literal
+from kwak.utils.tracing import TRACER
+
+HNSW_INDEX_NAME = "chunk_embeddings_hnsw"
+CHUNK_ID_INDEX_NAME = "chunk_embeddings_chunk_id"
+
+
+def load_vss(con: duckdb.DuckDBPyConnection) -> None:
+    """Load the DuckDB VSS extension so HNSW indexes can be built and queried."""
+    con.execute("INSTALL vss")
+    con.execute("LOAD vss")
+    # HNSW indexes only live in memory unless persistence is explicitly enabled.
+    con.execute("SET hnsw_enable_experimental_persistence = true")
+
+
+def create_hnsw_index(
+    con: duckdb.DuckDBPyConnection,
+    m: int = 16,
+    ef_construction: int = 128,
+) -> None:
+    """(Re)build the HNSW index over chunk_embeddings.embedding."""
+    load_vss(con)
+    con.execute(f"DROP INDEX IF EXISTS {HNSW_INDEX_NAME}")
+    with TRACER.query(con, "index.hnsw"):
+        con.execute(
+            f"""
+            CREATE INDEX {HNSW_INDEX_NAME} ON chunk_embeddings
+            USING HNSW (embedding)
+            WITH (
+                metric = 'cosine',
+                M = {int(m)},
+                ef_construction = {int(ef_construction)}
+            )
+            """
+        )
+
+
+def create_chunk_id_index(con: duckdb.DuckDBPyConnection) -> None:
+    """Index chunk_embeddings.chunk_id, if not done yet.
+
+    DuckDB answers a filter on a short constant list of ids from the index
+    instead of scanning the table, which keeps fetching the vectors of a few
+    chunks from reading every vector.
+    """
+    con.execute(
+        f"CREATE INDEX IF NOT EXISTS {CHUNK_ID_INDEX_NAME} "
+        "ON chunk_embeddings (chunk_id)"
+    )
+
+
+def has_hnsw_index(con: duckdb.DuckDBPyConnection) -> bool:
+    """Return True if the chunk_embeddings table carries an HNSW index."""
+    row = con.execute(
+        "SELECT count(*) FROM duckdb_indexes() "
+        "WHERE index_name = ? AND database_name = current_database()",
+        [HNSW_INDEX_NAME],
+    ).fetchone()
+    return row is not None and row[0] > 0
+
+
+def load_fts(con: duckdb.DuckDBPyConnection) -> None:
+    """Load the DuckDB FTS extension used for BM25 keyword search."""
+    con.execute("INSTALL fts")
+    con.execute("LOAD fts")
+
+
+def create_fts_index(
+    con: duckdb.DuckDBPyConnection, table: str, id_column: str, *columns: str
+) -> None:
+    """(Re)build the BM25 full-text index over the given columns of a table.
+
+    Text is stemmed as Dutch, and digits are kept so dossier ids and numbers
+    remain searchable. The index is a snapshot: rebuild it after the table changes.
+    """
+    load_fts(con)
+    fields = ", ".join(f"'{column}'" for column in columns)
+    with TRACER.query(con, "index.fts", table=table):
+        con.execute(
+            f"""
+            PRAGMA create_fts_index(
+                '{table}', '{id_column}', {fields},
+                stemmer = 'dutch',
+                ignore = '(\\.|[^a-z0-9])+',
+                overwrite = 1
+            )
+            """
+        )
+
+
+def has_fts_index(con: duckdb.DuckDBPyConnection, table: str) -> bool:
+    """Return True if a full-text index has been built for the table."""
+    row = con.execute(
+        "SELECT count(*) FROM duckdb_schemas() "
+        "WHERE schema_name = ? AND database_name = current_database()",
+        [f"fts_main_{table}"],
+    ).fetchone()
+    return row is not None and row[0] > 0
+
+
+def similarity_order(
+    column: str, query: str, *, exact: bool, dimension: int = 1536
+) -> str:
+    """Build the ORDER BY expression ranking `column` by similarity to `query`.
+
+    Ordering by array_cosine_distance lets the VSS optimizer answer the query from
+    the HNSW index; ordering by similarity is never rewritten and therefore always
+    scans the full table.
+    """
+    vector = f"{query}::FLOAT[{int(dimension)}]"
+    if exact:
+        return f"array_cosine_similarity({column}, {vector}) DESC"
+    return f"array_cosine_distance({column}, {vector})"
+
+
+def nearest_sql(column: str, order: str, where: str = "TRUE") -> str:
+    """Build the query for a column of the $limit chunks first in order.
+
+    Vector search and the recall check share it, so recall is measured on the
+    query searches run. Without a filter, a query ordered by cosine distance is
+    answered from the HNSW index.
+    """
+    condition = "" if where == "TRUE" else f"WHERE {where}"
+    return f"""
+        SELECT {column} FROM chunk_embeddings
+        {condition}
+        ORDER BY {order}
+        LIMIT $limit
+    """  # noqa: S608
+
+
+def nearest_rowids(
+    con: duckdb.DuckDBPyConnection,
+    embedding: list[float],
+    top_k: int,
+    *,
+    exact: bool,
+) -> list[int]:
+    """Return the rowids of the top_k nearest chunks for a query vector."""
+    order = similarity_order(
+        "embedding", "$query", exact=exact, dimension=len(embedding)
+    )
+    rows = con.execute(
+        nearest_sql("rowid", order),
+        {"query": vector_literal(embedding), "limit": top_k},
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def measure_recall(
+    con: duckdb.DuckDBPyConnection,
+    sample_size: int = 100,
+    top_k: int = 10,
+    ef_search: int | None = None,
+    quantization: Quantization = "none",
+) -> float:
+    """Estimate recall@top_k of approximate search against a brute-force scan.
+
+    The approximate search is the HNSW index, or with a quantization the
+    rescored scan of the int8 or binary column. Stored chunk embeddings are
+    reused as queries, so no embedding provider is needed. Returns the mean
+    overlap between approximate and exact results.
+    """
+    if quantization == "none":
+        load_vss(con)
+        if not has_hnsw_index(con):
+            msg = "chunk_embeddings has no HNSW index; run `kwak embed-chunks` first"
+            raise ValueError(msg)
+        if ef_search is not None:
+            con.execute(f"SET hnsw_ef_search = {int(ef_search)}")
+
+    queries = con.execute(
+        f"""
+        SELECT embedding FROM chunk_embeddings
+        USING SAMPLE reservoir({int(sample_size)} ROWS)
+        """  # noqa: S608
+    ).fetchall()
+    if not queries:
+        msg = "chunk_embeddings is empty; nothing to measure"
+        raise ValueError(msg)
+
+    hits = expected = 0
+    for (embedding,) in queries:
+        approx = set(
+            nearest_rowids(con, embedding, top_k, exact=False)
+            if quantization == "none"
+            else rescored_nearest(con, embedding, top_k, quantization, column="rowid")
+        )
+        exact = set(nearest_rowids(con, embedding, top_k, exact=True))
+        hits += len(approx & exact)
+        expected += len(exact)
+
+    return hits / expected
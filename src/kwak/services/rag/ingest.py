@@ -0,0 +1,515 @@
+import re
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from itertools import batched
+from pathlib import Path
+
+import duckdb
+
+from kwak.schemas.dossier import ChunkRecord
+from kwak.services.embedding.base import AbstractEmbeddingProvider, Vectors
+from kwak.services.rag.index import (
+    HNSW_INDEX_NAME,
+    create_chunk_id_index,
+    has_hnsw_index,
+    load_vss,
+)
+from kwak.services.rag.quantize import quantize_chunk_embeddings
+from kwak.services.rag.vectors import insert_vectors
+from kwak.utils.tracing import TRACER
+
+# Number of chunk rows staged per executemany call.
+CHUNK_INSERT_BATCH = 10_000
+# Number of texts to embed fetched from the database at a time.
+EMBED_FETCH_BATCH = 10_000
+# Tokens to reserve for the dossier header prefixed to chunks at embed time.
+MAX_HEADER_TOKENS = 64
+
+# Columns moved by export_chunk_embeddings and import_chunk_embeddings.
+EXPORTED_CHUNK_COLUMNS = (
+    "chunk_id",
+    "dossier_id",
+    "origin",
+    "index",
+    "start_offset",
+    "end_offset",
+    "content",
+    "content_hash",
+    "embedding",
+)
+
+DOSSIER_COLUMNS = {
+    "id": "VARCHAR",
+    "titel": "VARCHAR",
+    "type": "VARCHAR",
+    "startdatum": "DATE",
+    "einddatum": "DATE",
+    "goedgekeurd_budget": "DOUBLE",
+    "omschrijving": "VARCHAR",
+    "advies": "VARCHAR",
+}
+
+
+@dataclass(frozen=True)
+class IngestReport:
+    """Outcome of loading a JSONL file of dossiers into the dossiers table."""
+
+    inserted: int
+    updated: int
+
+
+@dataclass(frozen=True)
+class SyncReport:
+    """Outcome of synchronising chunk_embeddings with a set of chunks."""
+
+    new: int
+    reused: int
+    removed: int
+    # Stored chunks missing from an incomplete input, which are not removed
+    kept: int
+    changed: bool
+
+
+def ingest_dossiers(
+    con: duckdb.DuckDBPyConnection, path: Path, table_name: str = "dossiers"
+) -> IngestReport:
+    """Upsert the dossiers in a JSONL file into table_name by id.
+
+    DuckDB reads the file straight into a staging table with an explicit schema,
+    so the records never pass through Python. Rows missing a required field or
+    with an end date before their start date abort the ingest; when an id occurs
+    more than once the last line wins. The table is rewritten with the old and
+    new rows sorted by type and period, so its zonemaps let filters on those
+    skip blocks; appended rows alone would leave earlier ones out of order.
+    The rewrite runs in a single transaction, so readers keep seeing the
+    previous contents until it commits.
+    """
+    with Path("queries/create_dossiers.sql").open() as f:
+        con.execute(f.read().replace("$table_name", table_name))
+
+    columns = ", ".join(f"{name}: '{type_}'" for name, type_ in DOSSIER_COLUMNS.items())
+    with TRACER.query(con, "ingest.read"):
+        con.execute(
+            f"""
+            CREATE OR REPLACE TEMP TABLE staged_dossiers AS
+            SELECT * EXCLUDE (line) FROM (
+                SELECT *, row_number() OVER () AS line
+                FROM read_json(
+                    $path, format = 'newline_delimited', columns = {{{columns}}}
+                )
+            )
+            QUALIFY row_number() OVER (PARTITION BY id ORDER BY line DESC) = 1
+            """,  # noqa: S608
+            {"path": str(path)},
+        )
+
+    required = " OR ".join(f"{name} IS NULL" for name in DOSSIER_COLUMNS)
+    row = con.execute(
+        f"""
+        SELECT
+            count(*) FILTER ({required}),
+            count(*) FILTER (einddatum < startdatum)
+        FROM staged_dossiers
+        """  # noqa: S608
+    ).fetchone()
+    incomplete, misdated = row if row is not None else (0, 0)
+    if incomplete or misdated:
+        msg = (
+            f"{path.name}: {incomplete} dossiers with missing fields, "
+            f"{misdated} ending before they start"
+        )
+        raise ValueError(msg)
+
+    row = con.execute(
+        f"""
+        SELECT count(*) FILTER (t.id IS NULL), count(t.id)
+        FROM staged_dossiers s LEFT JOIN {table_name} t USING (id)
+        """  # noqa: S608
+    ).fetchone()
+    inserted, updated = row if row is not None else (0, 0)
+
+    names = ", ".join(DOSSIER_COLUMNS)
+    con.execute("BEGIN TRANSACTION")
+    try:
+        with TRACER.query(con, "ingest.upsert", items=inserted + updated):
+            con.execute(
+                f"""
+                CREATE OR REPLACE TEMP TABLE merged_dossiers AS
+                SELECT {names} FROM {table_name}
+                WHERE id NOT IN (SELECT id FROM staged_dossiers)
+                UNION ALL
+                SELECT {names} FROM staged_dossiers
+                """  # noqa: S608
+            )
+            con.execute(f"DELETE FROM {table_name}")  # noqa: S608
+            con.execute(
+                f"INSERT INTO {table_name} ({names}) "  # noqa: S608
+                f"SELECT {names} FROM merged_dossiers "
+                "ORDER BY type, startdatum, einddatum"
+            )
+        con.execute("COMMIT")
+    except duckdb.Error:
+        con.execute("ROLLBACK")
+        raise
+    finally:
+        con.execute("DROP TABLE IF EXISTS staged_dossiers")
+        con.execute("DROP TABLE IF EXISTS merged_dossiers")
+
+    return IngestReport(inserted=inserted, updated=updated)
+
+
+def dossier_headers(
+    con: duckdb.DuckDBPyConnection, table_name: str = "dossiers"
+) -> dict[str, str]:
+    """Return the metadata header put in front of chunks, by dossier id."""
+    rows = con.execute(
+        "SELECT id, titel, type, startdatum, einddatum, goedgekeurd_budget "  # noqa: S608
+        f"FROM {table_name}"
+    ).fetchall()
+    return {
+        id_: (
+            f"Dossier: {titel}\n"
+            f"Type: {type_}\n"
+            f"Periode: {start} tot {end}\n"
+            f"Goedgekeurd budget: €{budget:,.2f}\n\n"
+        )
+        for id_, titel, type_, start, end, budget in rows
+    }
+
+
+def chunk_rows(
+    chunks: Iterable[ChunkRecord],
+    embedder: AbstractEmbeddingProvider,
+    headers: dict[str, str],
+) -> Iterator[tuple[str, str, str, int, int | None, int | None, str, str, str]]:
+    """Key each chunk by a stable chunk_id and the fingerprint of its embedding text.
+
+    The chunk_id combines the dossier, the origin field and the position of the
+    chunk within that field, so it stays the same across re-chunking runs. The
+    text sent to the embedder is the chunk prefixed with its dossier's header,
+    so a change to the dossier's metadata re-embeds its chunks.
+    """
+    for chunk in chunks:
+        text = headers.get(chunk.dossier_id, "") + chunk.content
+        yield (
+            f"{chunk.dossier_id}:{chunk.origin}:{chunk.index}",
+            chunk.dossier_id,
+            chunk.origin,
+            chunk.index,
+            chunk.start,
+            chunk.end,
+            chunk.content,
+            embedder.fingerprint(text),
+            text,
+        )
+
+
+def _chunk_columns(con: duckdb.DuckDBPyConnection) -> dict[str, str]:
+    """Return the column names and types of chunk_embeddings, if it exists."""
+    return dict(
+        con.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = 'chunk_embeddings' "
+            "AND table_catalog = current_database()"
+        ).fetchall()
+    )
+
+
+def stored_dimension(con: duckdb.DuckDBPyConnection) -> int | None:
+    """Return the embedding dimension of chunk_embeddings, or None without table."""
+    match = re.fullmatch(r"FLOAT\[(\d+)\]", _chunk_columns(con).get("embedding", ""))
+    return int(match[1]) if match else None
+
+
+def _drop_hnsw_index(con: duckdb.DuckDBPyConnection) -> None:
+    """Drop the HNSW index, which blocks writes unless VSS is loaded."""
+    if has_hnsw_index(con):
+        load_vss(con)
+        con.execute(f"DROP INDEX {HNSW_INDEX_NAME}")
+
+
+def ensure_chunk_table(con: duckdb.DuckDBPyConnection, dimension: int = 1536) -> None:
+    """Create chunk_embeddings for vectors of the given dimension.
+
+    A table from before content hashing, which cannot be matched to chunks, or
+    holding vectors of another dimension is replaced by an empty one.
+    """
+    columns = _chunk_columns(con)
+    if columns and (
+        "content_hash" not in columns
+        or columns["embedding"] != f"FLOAT[{int(dimension)}]"
+    ):
+        _drop_hnsw_index(con)
+        con.execute("DROP TABLE chunk_embeddings")
+
+    with Path("queries/create_chunk_embeddings.sql").open() as f:
+        con.execute(f.read().replace("$dimension", str(int(dimension))))
+    create_chunk_id_index(con)
+
+
+async def sync_chunk_embeddings(  # noqa: PLR0913
+    con: duckdb.DuckDBPyConnection,
+    chunks: Iterable[ChunkRecord],
+    embedder: AbstractEmbeddingProvider,
+    on_start: Callable[[int], None] | None = None,
+    on_batch: Callable[[int], None] | None = None,
+    complete: Callable[[], bool] | None = None,
+) -> SyncReport:
+    """Bring chunk_embeddings in line with chunks, embedding only unseen content.
+
+    Rows are content-addressed: a chunk whose fingerprint is already stored
+    reuses that vector, only new fingerprints are sent to the embedder, and rows
+    for chunks that changed are deleted. Rows for chunks that disappeared are
+    deleted too, unless no chunks were given or complete, called once all of
+    them were read, returns False, e.g. because malformed lines were skipped:
+    an incomplete input never wipes stored vectors. Dossier metadata is read
+    from the dossiers table to compose the embedding text, but only the chunk's
+    own text is stored.
+    """
+    ensure_chunk_table(con, embedder.dimension)
+    headers = dossier_headers(con)
+    con.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE current_chunks (
+            chunk_id VARCHAR, dossier_id VARCHAR, origin VARCHAR, index INTEGER,
+            start_offset INTEGER, end_offset INTEGER, content TEXT,
+            content_hash VARCHAR, embedding_text TEXT
+        )
+        """
+    )
+    with TRACER.span("sync.stage"):
+        rows = chunk_rows(chunks, embedder, headers)
+        for batch in batched(rows, CHUNK_INSERT_BATCH):
+            con.executemany(
+                "INSERT INTO current_chunks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+
+    # Chunks without an identical row yet, and the contents never embedded before
+    with TRACER.query(con, "sync.diff"):
+        con.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE pending AS
+            SELECT c.* FROM current_chunks c
+            ANTI JOIN chunk_embeddings e
+                ON c.chunk_id = e.chunk_id AND c.content_hash = e.content_hash
+            """
+        )
+        con.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE unembedded AS
+            SELECT row_number() OVER () AS n, content_hash, text FROM (
+                SELECT content_hash, any_value(embedding_text) AS text FROM pending
+                ANTI JOIN chunk_embeddings USING (content_hash)
+                GROUP BY content_hash
+            )
+            """
+        )
+        con.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE vectors AS
+            SELECT content_hash, any_value(embedding) AS embedding
+            FROM chunk_embeddings
+            WHERE content_hash IN (SELECT content_hash FROM pending)
+            GROUP BY content_hash
+            """
+        )
+
+    row = con.execute("SELECT count(*) FROM unembedded").fetchone()
+    count = row[0] if row is not None else 0
+    if on_start is not None:
+        on_start(count)
+
+    def texts() -> Iterator[tuple[str, str]]:
+        """Read the texts to embed a page at a time, as the embedder asks for them."""
+        for start in range(0, count, EMBED_FETCH_BATCH):
+            yield from con.execute(
+                "SELECT content_hash, text FROM unembedded WHERE n > ? AND n <= ?",
+                [start, start + EMBED_FETCH_BATCH],
+            ).fetchall()
+
+    def store(hashes: list[str], vectors: Vectors) -> None:
+        """Stage the vectors of a finished batch, so they need not be kept."""
+        with TRACER.span("sync.vectors", items=len(hashes)):
+            insert_vectors(con, "vectors", hashes, vectors, embedder.dimension)
+        if on_batch is not None:
+            on_batch(len(hashes))
+
+    await embedder.embed_each(texts(), store)
+
+    total, new, pending, stale, absent, moved = _counts(con)
+    prune = total > 0 and (complete is None or complete())
+    removed, kept = (stale, 0) if prune else (stale - absent, absent)
+    if pending or removed or moved:
+        # The index is rebuilt by the caller once the table is up to date.
+        _drop_hnsw_index(con)
+        scope = "" if prune else "AND chunk_id IN (SELECT chunk_id FROM current_chunks)"
+        con.execute("BEGIN TRANSACTION")
+        try:
+            con.execute(
+                f"""
+                DELETE FROM chunk_embeddings e WHERE NOT EXISTS (
+                    SELECT 1 FROM current_chunks c
+                    WHERE c.chunk_id = e.chunk_id
+                        AND c.content_hash = e.content_hash
+                ) {scope}
+                """  # noqa: S608
+            )
+            # Chunks whose text is unchanged may still have moved within the field
+            con.execute(
+                """
+                UPDATE chunk_embeddings e
+                SET start_offset = c.start_offset, end_offset = c.end_offset
+                FROM current_chunks c
+                WHERE c.chunk_id = e.chunk_id
+                    AND c.content_hash = e.content_hash
+                    AND (c.start_offset IS DISTINCT FROM e.start_offset
+                        OR c.end_offset IS DISTINCT FROM e.end_offset)
+                """
+            )
+            with TRACER.query(con, "sync.insert", items=pending):
+                con.execute(
+                    """
+                    INSERT INTO chunk_embeddings BY NAME
+                    SELECT p.* EXCLUDE (embedding_text), v.embedding
+                    FROM pending p JOIN vectors v USING (content_hash)
+                    """
+                )
+            with TRACER.query(con, "sync.quantize"):
+                quantize_chunk_embeddings(con, embedder.dimension)
+            con.execute("COMMIT")
+        except duckdb.Error:
+            con.execute("ROLLBACK")
+            raise
+
+    return SyncReport(
+        new=new,
+        reused=total - new,
+        removed=removed,
+        kept=kept,
+        changed=bool(pending or removed or moved),
+    )
+
+
+def embedded_chunks(
+    con: duckdb.DuckDBPyConnection, head: int = 5
+) -> Iterator[tuple[str, list[float], int]]:
+    """Yield the chunks embedded by the last sync on con, with their vectors' head.
+
+    Each chunk comes with the first head components of its vector and its
+    dimension; rows are fetched as they are consumed, so con must not run other
+    queries meanwhile.
+    """
+    con.execute(
+        """
+        SELECT content, embedding[:$head], len(embedding) FROM chunk_embeddings
+        WHERE content_hash IN (SELECT content_hash FROM unembedded)
+        ORDER BY chunk_id
+        """,
+        {"head": head},
+    )
+    while rows := con.fetchmany(CHUNK_INSERT_BATCH):
+        yield from rows
+
+
+def _counts(con: duckdb.DuckDBPyConnection) -> tuple[int, int, int, int, int, int]:
+    """Count current, newly embedded, pending, stale, absent and moved chunk rows.
+
+    Absent rows are the stale rows of chunks missing from current_chunks.
+    """
+    row = con.execute(
+        """
+        SELECT
+            (SELECT count(*) FROM current_chunks),
+            (SELECT count(*) FROM current_chunks
+                WHERE content_hash NOT IN (SELECT content_hash FROM chunk_embeddings)),
+            (SELECT count(*) FROM pending),
+            (SELECT count(*) FROM chunk_embeddings e WHERE NOT EXISTS (
+                SELECT 1 FROM current_chunks c
+                WHERE c.chunk_id = e.chunk_id AND c.content_hash = e.content_hash
+            )),
+            (SELECT count(*) FROM chunk_embeddings
+                WHERE chunk_id NOT IN (SELECT chunk_id FROM current_chunks)),
+            (SELECT count(*) FROM current_chunks c JOIN chunk_embeddings e
+                ON c.chunk_id = e.chunk_id AND c.content_hash = e.content_hash
+                WHERE c.start_offset IS DISTINCT FROM e.start_offset
+                    OR c.end_offset IS DISTINCT FROM e.end_offset)
+        """
+    ).fetchone()
+    return row if row is not None else (0, 0, 0, 0, 0, 0)
+
+
+def export_chunk_embeddings(con: duckdb.DuckDBPyConnection, path: Path) -> int:
+    """Write the embedded chunks to a Parquet file; returns the rows written.
+
+    The quantized columns are left out, as they are recomputed on import. DuckDB
+    writes the file itself, so the vectors never pass through Python.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    target = str(path).replace("'", "''")
+    row = con.execute(
+        f"""
+        COPY (
+            SELECT {", ".join(EXPORTED_CHUNK_COLUMNS)} FROM chunk_embeddings
+            ORDER BY rowid
+        ) TO '{target}' (FORMAT parquet, COMPRESSION zstd)
+        """  # noqa: S608
+    ).fetchone()
+    return row[0] if row is not None else 0
+
+
+def import_chunk_embeddings(con: duckdb.DuckDBPyConnection, path: Path) -> int:
+    """Load chunks exported by export_chunk_embeddings; returns the rows loaded.
+
+    Imported rows replace stored rows with the same chunk_id, and a table
+    holding vectors of another dimension is replaced as in ensure_chunk_table.
+    Later syncs reuse the imported vectors by content hash, so a vector set
+    embedded elsewhere saves calling the provider again.
+    """
+    row = con.execute(
+        """
+        SELECT
+            count(*), count(*) FILTER (embedding IS NULL),
+            min(len(embedding)), max(len(embedding))
+        FROM read_parquet($path)
+        """,
+        {"path": str(path)},
+    ).fetchone()
+    count, missing, dimension, widest = row if row is not None else (0, 0, None, None)
+    if not count:
+        return 0
+    if missing:
+        msg = f"{path.name} holds {missing} chunks without an embedding"
+        raise ValueError(msg)
+    if dimension != widest:
+        msg = f"{path.name} mixes vectors of {dimension} and {widest} dimensions"
+        raise ValueError(msg)
+
+    ensure_chunk_table(con, dimension)
+    # The index is rebuilt by the caller once the table is up to date.
+    _drop_hnsw_index(con)
+    columns = ", ".join(EXPORTED_CHUNK_COLUMNS)
+    con.execute("BEGIN TRANSACTION")
+    try:
+        con.execute(
+            """
+            DELETE FROM chunk_embeddings
+            WHERE chunk_id IN (SELECT chunk_id FROM read_parquet($path))
+            """,
+            {"path": str(path)},
+        )
+        with TRACER.query(con, "import.insert", items=count):
+            con.execute(
+                f"""
+                INSERT INTO chunk_embeddings ({columns})
+                SELECT {columns} FROM read_parquet($path)
+                """,  # noqa: S608
+                {"path": str(path)},
+            )
+        with TRACER.query(con, "import.quantize"):
+            quantize_chunk_embeddings(con, dimension)
+        con.execute("COMMIT")
+    except duckdb.Error:
+        con.execute("ROLLBACK")
+        raise
+    return int(count)
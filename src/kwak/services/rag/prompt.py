@@ -0,0 +1,27 @@
+from collections.abc import Iterable
+
+from kwak.schemas.dossier import DossierChunk
+from kwak.services.rag.context import ContextPolicy, assemble_context
+
+# Bump whenever the template below changes, so cached answers are not reused.
+PROMPT_VERSION = "2"
+
+
+def render_prompt(query: str, context: str) -> str:
+    """Build the LLM prompt answering query from an assembled context."""
+    return f"""Beantwoord de volgende vraag zo goed mogelijk op basis van de
+context uit subsidiedossiers hieronder.
+
+Vraag: {query}
+
+Context:
+{context}
+
+Antwoord:"""
+
+
+def build_prompt(
+    query: str, chunks: Iterable[DossierChunk], policy: ContextPolicy | None = None
+) -> str:
+    """Build the LLM prompt answering query from the retrieved chunks."""
+    return render_prompt(query, assemble_context(chunks, policy).text)
@@ -0,0 +1,125 @@
+from typing import Any, Literal
+
+import duckdb
+
+from kwak.services.rag.vectors import vector_literal
+
+Quantization = Literal["none", "int8", "binary"]
+
+# Quantized scans shortlist this many candidates per requested result.
+RESCORE_FACTOR = 10
+
+
+def scale_sql(column: str) -> str:
+    """Build SQL for the largest absolute component of a vector column."""
+    return f"greatest(list_max(list_transform({column}, x -> abs(x))), 1e-12)"
+
+
+def int8_sql(column: str, scale: str, dimension: int) -> str:
+    """Build SQL for the int8 quantization of a vector column.
+
+    Every vector is scaled so its largest component maps to ±127, which keeps
+    cosine similarity intact up to rounding.
+    """
+    return (
+        f"list_transform({column}, x -> round(127 * x / {scale})::TINYINT)"
+        f"::TINYINT[{int(dimension)}]"
+    )
+
+
+def bits_sql(column: str) -> str:
+    """Build SQL for the binary quantization of a vector column.
+
+    Only the sign of each component is kept, so the Hamming distance between
+    two bit strings approximates the angle between the vectors.
+    """
+    return (
+        f"array_to_string(list_transform({column}, "
+        "x -> CASE WHEN x > 0 THEN '1' ELSE '0' END), '')::BIT"
+    )
+
+
+def quantize_chunk_embeddings(con: duckdb.DuckDBPyConnection, dimension: int) -> int:
+    """Fill in the quantized columns of rows that do not have them yet.
+
+    Returns the number of rows updated.
+    """
+    row = con.execute(
+        f"""
+        UPDATE chunk_embeddings e
+        SET
+            embedding_int8 = {int8_sql("s.embedding", "s.scale", dimension)},
+            embedding_bits = {bits_sql("s.embedding")}
+        FROM (
+            SELECT rowid AS rid, embedding, {scale_sql("embedding")} AS scale
+            FROM chunk_embeddings
+            WHERE embedding_bits IS NULL
+        ) s
+        WHERE e.rowid = s.rid
+        """  # noqa: S608
+    ).fetchone()
+    return row[0] if row is not None else 0
+
+
+def _compact_order(quantization: Quantization, dimension: int) -> str:
+    """Build the ORDER BY expression ranking chunks by a quantized column."""
+    if quantization == "int8":
+        return (
+            f"array_cosine_distance(embedding_int8::FLOAT[{int(dimension)}], "
+            f"$query::FLOAT[{int(dimension)}])"
+        )
+    return "bit_count(xor(embedding_bits, $bits::BIT))"
+
+
+def rescored_nearest(  # noqa: PLR0913
+    con: duckdb.DuckDBPyConnection,
+    embedding: list[float],
+    limit: int,
+    quantization: Quantization,
+    *,
+    column: str = "chunk_id",
+    where: str = "TRUE",
+    params: dict[str, Any] | None = None,
+    rescore: int = RESCORE_FACTOR,
+) -> list[Any]:
+    """Rank chunks on a quantized column, then rescore a shortlist exactly.
+
+    Only the compact int8 or binary column is scanned for every chunk; the
+    full-precision vectors are read for the limit * rescore shortlisted rows,
+    which are looked up in the chunk_id index. Chunks without quantized vectors
+    are ranked last rather than filtered out, as a filter costs the scan about
+    as much as the ranking. Returns the given column of the top limit chunks.
+    """
+    dimension = len(embedding)
+    query: dict[str, Any] = {"limit": limit * rescore, **(params or {})}
+    if quantization == "binary":
+        query["bits"] = "".join("1" if x > 0 else "0" for x in embedding)
+    else:
+        query["query"] = vector_literal(embedding)
+
+    shortlist = con.execute(
+        f"""
+        SELECT chunk_id FROM chunk_embeddings
+        WHERE {where}
+        ORDER BY {_compact_order(quantization, dimension)} NULLS LAST
+        LIMIT $limit
+        """,  # noqa: S608
+        query,
+    ).fetchall()
+    if not shortlist:
+        return []
+
+    # DuckDB only uses the index for constants, not for a bound list
+    ids = ", ".join("'{}'".format(row[0].replace("'", "''")) for row in shortlist)
+    rows = con.execute(
+        f"""
+        SELECT {column} FROM chunk_embeddings
+        WHERE chunk_id IN ({ids})
+        ORDER BY array_cosine_similarity(
+            embedding, $query::FLOAT[{int(dimension)}]
+        ) DESC
+        LIMIT $limit
+        """,  # noqa: S608
+        {"query": vector_literal(embedding), "limit": limit},
+    ).fetchall()
+    return [row[0] for row in rows]
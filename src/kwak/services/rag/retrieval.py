@@ -1,10 +1,60 @@
 import asyncio
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import date
 from typing import Any, Literal
 
 import duckdb
 
 from kwak.schemas.dossier import DossierChunk
-from kwak.services.factories import EMBEDDING_REGISTRY
+from kwak.services.cache.embeddings import QueryEmbeddingCache
+from kwak.services.database import DATABASE
+from kwak.services.embedding.base import AbstractEmbeddingProvider, Vectors
+from kwak.services.factories import EMBEDDING_REGISTRY, VECTOR_STORE_REGISTRY
+from kwak.services.rag.index import load_fts
+from kwak.services.rag.ingest import stored_dimension
+from kwak.services.rag.quantize import Quantization
+from kwak.services.rag.vectors import insert_vectors
+from kwak.services.vectorstores.base import AbstractVectorStore, StorePolicy
+from kwak.utils.tracing import TRACER
+
+SearchMode = Literal["vector", "keyword", "hybrid"]
+
+# Constant of reciprocal rank fusion; dampens the weight of the very top ranks.
+RRF_K = 60
+# In hybrid mode, each ranking contributes this many candidates per result.
+HYBRID_CANDIDATES = 4
+
+
+@dataclass(frozen=True)
+class ChunkFilter:
+    """Structured dossier metadata filters applied before vector scoring.
+
+    A dossier matches the date range when its own period overlaps it; unset
+    fields do not constrain the search.
+    """
+
+    type: str | None = None
+    start: date | None = None
+    end: date | None = None
+    min_budget: float | None = None
+    max_budget: float | None = None
+
+    def where(self) -> tuple[str, dict[str, Any]]:
+        """Return the WHERE condition on dossiers and its named parameters."""
+        conditions = {
+            "type": "type = $type",
+            "start": "einddatum >= $start",
+            "end": "startdatum <= $end",
+            "min_budget": "goedgekeurd_budget >= $min_budget",
+            "max_budget": "goedgekeurd_budget <= $max_budget",
+        }
+        params = {
+            name: value
+            for name in conditions
+            if (value := getattr(self, name)) is not None
+        }
+        return " AND ".join(conditions[name] for name in params) or "TRUE", params
 
 
 def _parse_chunk_row(row: tuple[Any, ...]) -> DossierChunk:
@@ -39,45 +89,268 @@ def _parse_chunk_row(row: tuple[Any, ...]) -> DossierChunk:
     )
 
 
-def search_chunks(
+async def embed_query(
+    embedder: AbstractEmbeddingProvider,
+    query: str,
+    *,
+    use_cache: bool,
+    cache: QueryEmbeddingCache | None = None,
+) -> list[float]:
+    """Embed the query, going through the persistent query-embedding cache.
+
+    A long-running caller passes the cache it keeps open; otherwise the cache
+    file is opened for this one query.
+    """
+    with TRACER.span("embed.query", provider=embedder.name):
+        if use_cache and cache is not None:
+            return await cache.embed(embedder, query)
+        if use_cache:
+            try:
+                cache = QueryEmbeddingCache()
+            except duckdb.IOException:
+                # Another process holds the cache file; embed without it.
+                pass
+            else:
+                with cache:
+                    return await cache.embed(embedder, query)
+
+        embedding: list[float] = (await embedder.embed([query]))[0].tolist()
+        return embedding
+
+
+def reciprocal_rank_fusion(*rankings: list[str], k: int = RRF_K) -> list[str]:
+    """Merge ranked id lists, scoring each id by the sum of 1 / (k + rank)."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id_ in enumerate(ranking, 1):
+            scores[id_] = scores.get(id_, 0.0) + 1 / (k + rank)
+    return sorted(scores, key=scores.__getitem__, reverse=True)
+
+
+def _prefilter(filters: ChunkFilter | None) -> tuple[str, dict[str, Any]]:
+    """Build the condition restricting chunks to dossiers matching filters."""
+    where, params = (filters or ChunkFilter()).where()
+    if not params:
+        return "TRUE", {}
+    return f"dossier_id IN (SELECT id FROM dossiers WHERE {where})", params  # noqa: S608
+
+
+def _vector_ranking(
+    store: AbstractVectorStore,
+    embedding: list[float],
+    limit: int,
+    filters: ChunkFilter | None,
+) -> list[str]:
+    """Return the chunk_ids of the chunks nearest to the query embedding."""
+    prefilter, params = _prefilter(filters)
+    with TRACER.query(store.con, "retrieve.vector", store=store.name):
+        return store.nearest(embedding, limit, prefilter, params)
+
+
+def _keyword_ranking(
+    con: duckdb.DuckDBPyConnection,
+    query: str,
+    limit: int,
+    filters: ChunkFilter | None,
+) -> list[str]:
+    """Return the chunk_ids ranked by BM25 over chunk content and dossier titles.
+
+    A chunk scores for its own content and for the title and id of its dossier,
+    so exact titles and dossier ids surface every chunk of that dossier.
+    """
+    load_fts(con)
+    prefilter, params = _prefilter(filters)
+    with TRACER.query(con, "retrieve.keyword"):
+        rows = con.execute(
+            f"""
+            SELECT chunk_id FROM (
+                SELECT
+                    chunk_id,
+                    coalesce(fts_main_chunk_embeddings.match_bm25(chunk_id, $text), 0)
+                    + coalesce(fts_main_dossiers.match_bm25(d.id, $text), 0) AS score
+                FROM chunk_embeddings e
+                INNER JOIN dossiers d ON e.dossier_id = d.id
+                WHERE {prefilter}
+            )
+            WHERE score > 0
+            ORDER BY score DESC
+            LIMIT $limit
+            """,  # noqa: S608
+            {"text": query, "limit": limit, **params},
+        ).fetchall()
+    return [row[0] for row in rows]
+
+
+def nearest_chunk_ids(
+    con: duckdb.DuckDBPyConnection,
+    embeddings: Sequence[Sequence[float]] | Vectors,
+    top_k: int,
+) -> list[list[str]]:
+    """Return the top_k nearest chunk_ids for each of many query embeddings.
+
+    All queries are scored against all chunks in a single exact matrix-vs-matrix
+    query, keeping only the best top_k per query with a top-n aggregate.
+    """
+    if len(embeddings) == 0:
+        return []
+    con.execute(
+        f"""
+        CREATE OR REPLACE TEMP TABLE batch_queries (
+            qid INTEGER, embedding FLOAT[{len(embeddings[0])}]
+        )
+        """
+    )
+    insert_vectors(
+        con,
+        "batch_queries",
+        list(range(len(embeddings))),
+        embeddings,
+        len(embeddings[0]),
+    )
+    with TRACER.query(con, "retrieve.batch", items=len(embeddings)):
+        rows = con.execute(
+            """
+            SELECT
+                q.qid,
+                max_by(
+                    e.chunk_id,
+                    array_cosine_similarity(e.embedding, q.embedding),
+                    $top_k
+                )
+            FROM batch_queries q, chunk_embeddings e
+            GROUP BY q.qid
+            """,
+            {"top_k": top_k},
+        ).fetchall()
+    con.execute("DROP TABLE batch_queries")
+
+    ranked = dict(rows)
+    return [ranked.get(qid, []) for qid in range(len(embeddings))]
+
+
+def fetch_chunks(
+    con: duckdb.DuckDBPyConnection, chunk_ids: list[str]
+) -> dict[str, DossierChunk]:
+    """Load chunks with their dossier metadata, keyed by chunk_id."""
+    with TRACER.query(con, "retrieve.fetch", items=len(chunk_ids)):
+        rows = con.execute(
+            """
+            SELECT
+                chunk_id,
+                dossier_id,
+                origin,
+                content,
+                type,
+                titel,
+                startdatum,
+                einddatum,
+                goedgekeurd_budget
+            FROM chunk_embeddings e
+            INNER JOIN dossiers d ON e.dossier_id = d.id
+            WHERE chunk_id IN (SELECT unnest($ids))
+            """,
+            {"ids": chunk_ids},
+        ).fetchall()
+    return {row[0]: _parse_chunk_row(row[1:]) for row in rows}
+
+
+def search_chunks(  # noqa: PLR0913
     query: str,
     provider: str = "openai",
     top_k: int = 5,
+    *,
+    exact: bool = False,
+    ef_search: int | None = None,
+    use_cache: bool = True,
+    filters: ChunkFilter | None = None,
+    mode: SearchMode = "vector",
+    quantization: Quantization = "none",
+    store: str = "duckdb",
 ) -> list[DossierChunk]:
-    """Embed a user query and return the top_k most relevant chunks
-    from the DuckDB database based on cosine similarity.
+    """Return the top_k chunks most relevant to a user query.
+
+    In "vector" mode the query is embedded and chunks are ranked by cosine
+    similarity; by default the HNSW index built by `embed_chunks` is used, and
+    exact=True forces a brute-force scan. Query embeddings are looked up in the
+    persistent cache before calling the provider unless use_cache=False.
+    "keyword" mode ranks by BM25 over chunk contents and dossier titles without
+    any embedding call, and "hybrid" merges both rankings with reciprocal rank
+    fusion. With filters, only chunks of matching dossiers are considered.
+    With quantization "int8" or "binary", vector ranking scans the compact
+    column and rescores a shortlist with the full-precision vectors. store
+    selects the vector store backend answering the vector ranking. The query
+    runs on a pooled read-only connection, so it never waits for a writer.
     """
     if provider not in EMBEDDING_REGISTRY:
         msg = f"Unsupported embedding provider: {provider}"
         raise ValueError(msg)
+    if store not in VECTOR_STORE_REGISTRY:
+        msg = f"Unsupported vector store: {store}"
+        raise ValueError(msg)
 
-    # Generate query embedding (e.g., 1536-dim OpenAI vector)
-    embedder = EMBEDDING_REGISTRY[provider]()
-    embedding = asyncio.run(embedder.embed([query]))[0]
+    with DATABASE.reader() as con:
+        embedding = None
+        if mode != "keyword":
+            # Embed the query at the dimension the chunks were stored with
+            embedder = EMBEDDING_REGISTRY[provider](dimensions=stored_dimension(con))
+            embedding = asyncio.run(embed_query(embedder, query, use_cache=use_cache))
 
-    # Convert Python list to DuckDB-compatible FLOAT[1536] array literal
-    duck_array = "CAST([" + ", ".join(str(v) for v in embedding) + "] AS FLOAT[1536])"
+        return retrieve(
+            con,
+            query,
+            embedding,
+            top_k,
+            exact=exact,
+            ef_search=ef_search,
+            filters=filters,
+            mode=mode,
+            quantization=quantization,
+            store=store,
+        )
 
-    # Search for top_k most similar chunks using array_cosine_similarity
-    con = duckdb.connect("data/kwak.db")
-    results = con.execute(
-        f"""
-        SELECT
-            dossier_id,
-            origin,
-            content,
-            type,
-            titel,
-            startdatum,
-            einddatum,
-            goedgekeurd_budget,
-            array_cosine_similarity(embedding, {duck_array}) AS score
-        FROM chunk_embeddings e
-        INNER JOIN dossiers d ON e.dossier_id = d.id
-        WHERE e.embedding IS NOT NULL
-        ORDER BY score DESC
-        LIMIT {top_k}
-        """  # noqa: S608
-    ).fetchall()
-
-    return [_parse_chunk_row(row) for row in results]
+
+def retrieve(  # noqa: PLR0913
+    con: duckdb.DuckDBPyConnection,
+    query: str,
+    embedding: list[float] | None,
+    top_k: int = 5,
+    *,
+    exact: bool = False,
+    ef_search: int | None = None,
+    filters: ChunkFilter | None = None,
+    mode: SearchMode = "vector",
+    quantization: Quantization = "none",
+    store: str = "duckdb",
+) -> list[DossierChunk]:
+    """Rank and load the top_k chunks for an already embedded query.
+
+    This is the database half of `search_chunks`, for callers that keep their
+    own connection and embedder; embedding may be None in "keyword" mode.
+    """
+    if embedding is None and mode != "keyword":
+        msg = f"An embedding is required in {mode} mode"
+        raise ValueError(msg)
+    if store not in VECTOR_STORE_REGISTRY:
+        msg = f"Unsupported vector store: {store}"
+        raise ValueError(msg)
+
+    limit = top_k * HYBRID_CANDIDATES if mode == "hybrid" else top_k
+
+    rankings: list[list[str]] = []
+    if embedding is not None and mode != "keyword":
+        policy = StorePolicy(
+            exact=exact, ef_search=ef_search, quantization=quantization
+        )
+        vector_store = VECTOR_STORE_REGISTRY[store](con, policy)
+        rankings.append(_vector_ranking(vector_store, embedding, limit, filters))
+    if mode != "vector":
+        try:
+            rankings.append(_keyword_ranking(con, query, limit, filters))
+        except duckdb.Error:
+            # Without the FTS extension or index, hybrid degrades to vector search.
+            if mode == "keyword":
+                raise
+
+    chunk_ids = reciprocal_rank_fusion(*rankings)[:top_k]
+    chunks = fetch_chunks(con, chunk_ids)
+    return [chunks[id_] for id_ in chunk_ids if id_ in chunks]
@@ -0,0 +1,55 @@
+import contextlib
+from functools import partial
+from pathlib import Path
+
+import duckdb
+
+from kwak.services.database import DATABASE
+from kwak.services.rag.index import (
+    create_chunk_id_index,
+    create_fts_index,
+    create_hnsw_index,
+    load_vss,
+)
+
+
+def db_mtime(db_path: Path) -> float:
+    """Return the last time the database file or its write-ahead log changed."""
+    wal = db_path.with_name(db_path.name + ".wal")
+    return max((p.stat().st_mtime for p in (db_path, wal) if p.exists()), default=0.0)
+
+
+def load_snapshot(db_path: Path) -> duckdb.DuckDBPyConnection:
+    """Copy the dossiers and chunk embeddings into an in-memory database.
+
+    The file is only attached while copying, so `embed-chunks` and `updatedb`
+    can keep writing to it. The chunk id, HNSW and full-text indexes are rebuilt
+    in memory; if an extension is unavailable, search falls back as usual.
+    """
+    con = duckdb.connect(config=DATABASE.settings.config())
+    # Attaching a file that carries an HNSW index requires VSS to be loaded
+    with contextlib.suppress(duckdb.Error):
+        load_vss(con)
+
+    path = str(db_path).replace("'", "''")
+    try:
+        con.execute(f"ATTACH '{path}' AS disk (READ_ONLY)")
+        try:
+            con.execute("CREATE TABLE dossiers AS FROM disk.dossiers")
+            con.execute("CREATE TABLE chunk_embeddings AS FROM disk.chunk_embeddings")
+        finally:
+            con.execute("DETACH disk")
+    except duckdb.Error:
+        con.close()
+        raise
+
+    for build in (
+        partial(create_chunk_id_index, con),
+        partial(create_hnsw_index, con),
+        partial(create_fts_index, con, "chunk_embeddings", "chunk_id", "content"),
+        partial(create_fts_index, con, "dossiers", "id", "id", "titel"),
+    ):
+        with contextlib.suppress(duckdb.Error):
+            build()
+
+    return con
@@ -0,0 +1,62 @@
+from collections.abc import Sequence
+from typing import Any
+
+import duckdb
+
+from kwak.services.embedding.base import Vectors
+
+
+def vector_literal(vector: Sequence[float]) -> str:
+    """Format a vector as a list literal, to bind as a string and cast in SQL.
+
+    DuckDB converts a bound Python list one element at a time, which takes a
+    quarter of a second for 1536 floats; the same vector bound as a string and
+    cast with `::FLOAT[n]` takes milliseconds.
+    """
+    return str([float(x) for x in vector])
+
+
+def insert_vectors(
+    con: duckdb.DuckDBPyConnection,
+    table: str,
+    keys: Sequence[Any],
+    vectors: Sequence[Sequence[float]] | Vectors,
+    dimension: int,
+) -> None:
+    """Insert (key, FLOAT[dimension]) rows into table without binding lists.
+
+    The vectors are packed into one contiguous float32 matrix, which a float32
+    array from an embedding provider already is, and wrapped without copying as
+    a FixedSizeList<float32> column of an Arrow table that DuckDB scans in a
+    single INSERT.
+    """
+    # Imported on first use, as they add noticeably to the startup of every command
+    import numpy as np
+    import pyarrow as pa
+
+    if len(keys) != len(vectors):
+        msg = f"Got {len(keys)} keys for {len(vectors)} vectors"
+        raise ValueError(msg)
+    if not keys:
+        return
+
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    if matrix.shape != (len(keys), dimension):
+        msg = f"Expected vectors of {dimension} dimensions, got {matrix.shape[1:]}"
+        raise ValueError(msg)
+
+    staged = pa.table(
+        {
+            "key": pa.array(keys),
+            "embedding": pa.FixedSizeListArray.from_arrays(
+                pa.array(matrix.reshape(-1)), dimension
+            ),
+        }
+    )
+    con.register("staged_vectors", staged)
+    try:
+        con.execute(
+            f"INSERT INTO {table} SELECT key, embedding FROM staged_vectors"  # noqa: S608
+        )
+    finally:
+        con.unregister("staged_vectors")
@@ -0,0 +1,64 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any
+
+import duckdb
+
+from kwak.services.rag.quantize import Quantization
+
+
+@dataclass(frozen=True)
+class StorePolicy:
+    """How a vector store indexes and searches chunk embeddings.
+
+    Backends ignore the settings that do not apply to them.
+    """
+
+    exact: bool = False
+    ef_search: int | None = None
+    quantization: Quantization = "none"
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 128
+
+
+class AbstractVectorStore(ABC):
+    """Abstract base class for nearest-neighbour search over chunk embeddings.
+
+    chunk_embeddings in DuckDB stays the source of truth for chunks and their
+    vectors; a store answers vector queries from it or from data derived from
+    it by `build`.
+    """
+
+    name: str
+
+    def __init__(
+        self, con: duckdb.DuckDBPyConnection, policy: StorePolicy | None = None
+    ) -> None:
+        """Initialize the store over a connection holding chunk_embeddings."""
+        self.con = con
+        self.policy = policy or StorePolicy()
+
+    @abstractmethod
+    def build(self) -> None:
+        """(Re)build the store after chunk_embeddings changed."""
+        ...
+
+    @abstractmethod
+    def is_built(self) -> bool:
+        """Return True if the store has been built."""
+        ...
+
+    @abstractmethod
+    def nearest(
+        self,
+        embedding: list[float],
+        limit: int,
+        where: str = "TRUE",
+        params: dict[str, Any] | None = None,
+    ) -> list[str]:
+        """Return the chunk_ids of the chunks nearest to the query embedding.
+
+        where is a SQL condition on chunk_embeddings restricting the candidates,
+        with its named parameters in params.
+        """
+        ...
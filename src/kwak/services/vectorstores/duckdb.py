@@ -0,0 +1,81 @@
+from typing import Any
+
+import duckdb
+
+from kwak.services.rag.index import (
+    create_hnsw_index,
+    has_hnsw_index,
+    load_vss,
+    nearest_sql,
+    similarity_order,
+)
+from kwak.services.rag.quantize import rescored_nearest
+from kwak.services.rag.vectors import vector_literal
+from kwak.services.vectorstores.base import AbstractVectorStore
+
+
+class DuckDBVectorStore(AbstractVectorStore):
+    """Vector search in SQL over chunk_embeddings, optionally via HNSW.
+
+    Queries use the HNSW index unless the policy asks for an exact scan, or scan
+    the int8 or binary column and rescore a shortlist under a quantization.
+    """
+
+    name = "duckdb"
+
+    def build(self) -> None:
+        """(Re)build the HNSW index over the embeddings."""
+        create_hnsw_index(
+            self.con,
+            m=self.policy.hnsw_m,
+            ef_construction=self.policy.hnsw_ef_construction,
+        )
+
+    def is_built(self) -> bool:
+        """Return True if chunk_embeddings carries an HNSW index."""
+        return has_hnsw_index(self.con)
+
+    def nearest(
+        self,
+        embedding: list[float],
+        limit: int,
+        where: str = "TRUE",
+        params: dict[str, Any] | None = None,
+    ) -> list[str]:
+        """Return the chunk_ids of the chunks nearest to the query embedding."""
+        params = params or {}
+        if self.policy.quantization != "none":
+            return rescored_nearest(
+                self.con,
+                embedding,
+                limit,
+                self.policy.quantization,
+                where=where,
+                params=params,
+            )
+
+        # The HNSW index cannot serve a filtered top-k, so rank those exactly
+        exact = self.policy.exact or bool(params)
+        if not exact:
+            try:
+                load_vss(self.con)
+            except duckdb.Error:
+                # The VSS extension could not be installed (e.g. offline): scan.
+                exact = True
+            else:
+                if self.policy.ef_search is not None:
+                    self.con.execute(
+                        f"SET hnsw_ef_search = {int(self.policy.ef_search)}"
+                    )
+                else:
+                    # Pooled connections may still carry an earlier setting
+                    self.con.execute("RESET hnsw_ef_search")
+
+        order = similarity_order(
+            "embedding", "$query", exact=exact, dimension=len(embedding)
+        )
+        rows = self.con.execute(
+            nearest_sql("chunk_id", order, where),
+            {"query": vector_literal(embedding), "limit": limit, **params},
+        ).fetchall()
+        return [row[0] for row in rows]
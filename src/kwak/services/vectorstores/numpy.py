@@ -0,0 +1,225 @@
+import functools
+from pathlib import Path
+from typing import Any
+
+import duckdb
+import numpy as np
+
+from kwak.services.database import DATABASE
+from kwak.services.vectorstores.base import AbstractVectorStore, StorePolicy
+from kwak.utils.tracing import TRACER
+
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNK_IDS_FILE = "chunk_ids.npy"
+FINGERPRINT_FILE = "fingerprint"
+# Rows copied from DuckDB into the matrix per fetch while building.
+EXPORT_BATCH = 10_000
+
+# Whether the store in a directory matched its database's chunks, with the
+# stats of the files that answer was given for
+_CURRENT: dict[Path, tuple[tuple[tuple[int, int], ...], bool]] = {}
+
+
+def store_path(db_path: Path) -> Path:
+    """Return the directory of the numpy vector store of a DuckDB file."""
+    return db_path.with_name(db_path.name + ".vectors")
+
+
+def content_fingerprint(con: duckdb.DuckDBPyConnection) -> str:
+    """Fingerprint the chunks in chunk_embeddings and the texts they embed.
+
+    content_hash already identifies the embedded text and model, so the vectors
+    need not be read: this only scans two short columns.
+    """
+    row = con.execute(
+        """
+        SELECT count(*), bit_xor(hash(chunk_id || ':' || content_hash))
+        FROM chunk_embeddings
+        """
+    ).fetchone()
+    count, digest = row if row is not None else (0, None)
+    return f"{count}:{digest or 0}"
+
+
+def _stats(*paths: Path) -> tuple[tuple[int, int], ...]:
+    """Return the modification time and size of files, zeros for missing ones."""
+    stats = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            stats.append((0, 0))
+        else:
+            stats.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(stats)
+
+
+@functools.lru_cache(maxsize=4)
+def _load(path: Path, mtime: float) -> tuple[Any, Any]:  # noqa: ARG001
+    """Memory-map the matrix and chunk ids; cached until the files change."""
+    matrix = np.load(path / EMBEDDINGS_FILE, mmap_mode="r")
+    ids = np.load(path / CHUNK_IDS_FILE, mmap_mode="r")
+    if matrix.shape[0] != ids.shape[0]:
+        msg = f"Vector store at {path} is inconsistent; run `kwak embed-chunks`"
+        raise ValueError(msg)
+    return matrix, ids
+
+
+class NumpyVectorStore(AbstractVectorStore):
+    """Brute-force vector search over a memory-mapped NumPy matrix.
+
+    `build` exports the L2-normalized embeddings to an .npy matrix with the
+    chunk ids in a sidecar .npy file. Queries map both read-only, so processes
+    share the OS page cache without copying, and score all chunks with a single
+    matrix-vector product and argpartition. Results are exact.
+
+    The files live next to the database, in a .vectors directory named after
+    it, with a fingerprint of the chunks they were built from: once the chunks
+    change, the store counts as not built until it is rebuilt.
+    """
+
+    name = "numpy"
+
+    def __init__(
+        self,
+        con: duckdb.DuckDBPyConnection,
+        policy: StorePolicy | None = None,
+        path: Path | None = None,
+    ) -> None:
+        """Initialize the store, kept in files under path.
+
+        path defaults to the store of the configured database file.
+        """
+        super().__init__(con, policy)
+        self.path = path or store_path(DATABASE.settings.path)
+
+    def build(self) -> None:
+        """Export chunk_embeddings to the .npy matrix and chunk id sidecar.
+
+        Both files are written next to the old ones and swapped in afterwards,
+        so readers never map a partially written matrix. The fingerprint of
+        the exported chunks is written last.
+        """
+        fingerprint = content_fingerprint(self.con)
+        row = self.con.execute(
+            """
+            SELECT count(*), max(len(chunk_id)), max(len(embedding))
+            FROM chunk_embeddings
+            """
+        ).fetchone()
+        count, id_width, dimension = row if row is not None else (0, None, None)
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_embeddings = self.path / f"{EMBEDDINGS_FILE}.tmp"
+        tmp_ids = self.path / f"{CHUNK_IDS_FILE}.tmp"
+        matrix = np.lib.format.open_memmap(
+            tmp_embeddings, mode="w+", dtype=np.float32, shape=(count, dimension or 0)
+        )
+        ids = np.lib.format.open_memmap(
+            tmp_ids, mode="w+", dtype=f"<U{id_width or 1}", shape=(count,)
+        )
+
+        result = self.con.execute(
+            """
+            SELECT chunk_id, embedding FROM chunk_embeddings
+            ORDER BY rowid
+            """
+        )
+        start = 0
+        while rows := result.fetchmany(EXPORT_BATCH):
+            end = start + len(rows)
+            block = np.asarray([row[1] for row in rows], dtype=np.float32)
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            matrix[start:end] = block / np.where(norms > 0, norms, 1.0)
+            ids[start:end] = [row[0] for row in rows]
+            start = end
+
+        matrix.flush()
+        ids.flush()
+        del matrix, ids
+        tmp_ids.replace(self.path / CHUNK_IDS_FILE)
+        tmp_embeddings.replace(self.path / EMBEDDINGS_FILE)
+        tmp_fingerprint = self.path / f"{FINGERPRINT_FILE}.tmp"
+        tmp_fingerprint.write_text(fingerprint)
+        tmp_fingerprint.replace(self.path / FINGERPRINT_FILE)
+
+    def is_built(self) -> bool:
+        """Return True if the store was built from the current chunks.
+
+        Fingerprinting the chunks scans chunk_embeddings, so the answer is kept
+        until the database or store files change, rather than paid per query.
+        """
+        row = self.con.execute(
+            "SELECT path FROM duckdb_databases() "
+            "WHERE database_name = current_database()"
+        ).fetchone()
+        if row is None or row[0] is None:
+            # In memory, there are no files to tell whether the chunks changed
+            return self._matches_chunks()
+
+        database = Path(row[0])
+        files = (FINGERPRINT_FILE, EMBEDDINGS_FILE, CHUNK_IDS_FILE)
+        stats = _stats(
+            database,
+            database.with_name(database.name + ".wal"),
+            *(self.path / name for name in files),
+        )
+        cached = _CURRENT.get(self.path)
+        if cached is None or cached[0] != stats:
+            cached = _CURRENT[self.path] = (stats, self._matches_chunks())
+        return cached[1]
+
+    def _matches_chunks(self) -> bool:
+        """Compare the fingerprint the store was built from to the chunks."""
+        try:
+            built = (self.path / FINGERPRINT_FILE).read_text()
+        except FileNotFoundError:
+            return False
+        return built == content_fingerprint(self.con) and all(
+            (self.path / name).exists() for name in (EMBEDDINGS_FILE, CHUNK_IDS_FILE)
+        )
+
+    def nearest(
+        self,
+        embedding: list[float],
+        limit: int,
+        where: str = "TRUE",
+        params: dict[str, Any] | None = None,
+    ) -> list[str]:
+        """Return the chunk_ids of the chunks nearest to the query embedding.
+
+        A where condition is resolved to its chunk ids in DuckDB, and chunks
+        outside it are masked out before taking the top results.
+        """
+        if not self.is_built():
+            msg = (
+                f"No vector store of the current chunks at {self.path}; "
+                "run `kwak embed-chunks --store numpy` first"
+            )
+            raise ValueError(msg)
+        matrix, ids = _load(self.path, (self.path / EMBEDDINGS_FILE).stat().st_mtime)
+        if matrix.shape[0] == 0 or limit <= 0:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        if query.shape[0] != matrix.shape[1]:
+            msg = (
+                f"Query has {query.shape[0]} dimensions, "
+                f"the vector store {matrix.shape[1]}"
+            )
+            raise ValueError(msg)
+        # Rows are unit vectors, so dot products rank like cosine similarity
+        scores = matrix @ query
+
+        if where != "TRUE":
+            allowed = self.con.execute(
+                f"SELECT chunk_id FROM chunk_embeddings WHERE {where}",  # noqa: S608
+                params or {},
+            ).fetchall()
+            scores[~np.isin(ids, [row[0] for row in allowed])] = -np.inf
+
+        TRACER.annotate(rows_scanned=matrix.shape[0], bytes=matrix.nbytes)
+        k = min(limit, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [str(ids[i]) for i in top if np.isfinite(scores[i])]
@@ -0,0 +1,26 @@
+import asyncio
+import random
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+async def retry_async(
+    func: Callable[[], Awaitable[T]],
+    *,
+    retries: int,
+    backoff: float,
+    should_retry: Callable[[Exception], bool],
+) -> T:
+    """Await func(), retrying retryable failures with jittered exponential backoff."""
+    attempt = 0
+    while True:
+        try:
+            return await func()
+        except Exception as e:
+            if attempt >= retries or not should_retry(e):
+                raise
+            delay = backoff * 2**attempt * random.uniform(0.5, 1.5)  # noqa: S311
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -1,30 +1,123 @@
+import contextlib
+import os
+from collections.abc import AsyncIterable, Callable, Iterable, Iterator
 from pathlib import Path
-from typing import TypeVar
+from typing import TextIO, TypeVar
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
 T = TypeVar("T", bound=BaseModel)
 
+# Block size used when scanning a file backwards for its last lines.
+TAIL_BLOCK_SIZE = 64 * 1024
 
-def load_jsonl(path: Path, model: type[T]) -> list[T]:
-    """Load a JSON Lines file and parse each line into a Pydantic model instance."""
-    return [
-        model.model_validate_json(line)
-        for line in path.read_text(encoding="utf-8").splitlines()
-    ]
 
+def _tail_offset(path: Path, n: int) -> int:
+    """Return the byte offset at which the last n lines of a file start."""
+    with path.open("rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        newlines = 0
+        # A trailing newline terminates the last line rather than starting a new one
+        if end:
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                newlines = -1
+        while pos > 0:
+            size = min(TAIL_BLOCK_SIZE, pos)
+            pos -= size
+            f.seek(pos)
+            block = f.read(size)
+            i = len(block)
+            while (i := block.rfind(b"\n", 0, i)) != -1:
+                newlines += 1
+                if newlines == n:
+                    return pos + i + 1
+    return 0
 
-def append_jsonl(path: Path, data: list[T]) -> None:
-    """Append a list of Pydantic model instances to a JSON Lines file."""
+
+def iter_jsonl(
+    path: Path,
+    model: type[T],
+    *,
+    last: int | None = None,
+    on_skip: Callable[[int], None] | None = None,
+) -> Iterator[T]:
+    """Lazily parse a JSON Lines file into Pydantic model instances.
+
+    Lines are validated with pydantic-core's native JSON parser one at a time, so
+    memory stays flat regardless of the file size. Blank lines are ignored and
+    malformed lines are skipped, calling on_skip with their line number. With
+    last=N the file is read from the position of its last N lines only; line
+    numbers then count from that position.
+    """
+    with path.open("rb") as f:
+        if last is not None:
+            if last <= 0:
+                return
+            f.seek(_tail_offset(path, last))
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield model.model_validate_json(line)
+            except ValidationError:
+                if on_skip is not None:
+                    on_skip(lineno)
+
+
+@contextlib.contextmanager
+def _open_for_writing(path: Path, *, append: bool) -> Iterator[TextIO]:
+    """Open a file to append to, or to replace once the block completes.
+
+    A replaced file is written next to the target and renamed over it, so a
+    write that fails halfway leaves the previous contents in place.
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
+    if append:
+        with path.open("a", encoding="utf-8") as f:
+            yield f
+        return
+
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as f:
+            yield f
+        tmp.replace(path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def write_jsonl(path: Path, data: Iterable[T], *, append: bool = False) -> int:
+    """Write Pydantic model instances to a JSON Lines file as they are produced.
+
+    Unless appending, the file is only replaced once all records are written.
+    Returns the number of records written.
+    """
+    count = 0
+    with _open_for_writing(path, append=append) as f:
         for item in data:
             f.write(item.model_dump_json() + "\n")
+            count += 1
+    return count
 
 
-def overwrite_jsonl(path: Path, data: list[T]) -> None:
-    """Overwrite a JSON Lines file with a list of Pydantic model instances."""
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        for item in data:
+async def awrite_jsonl(
+    path: Path, data: AsyncIterable[T], *, append: bool = False
+) -> int:
+    """Write Pydantic model instances from an async iterable to a JSON Lines file.
+
+    Unless appending, the file is only replaced once all records are written.
+    Returns the number of records written.
+    """
+    count = 0
+    with _open_for_writing(path, append=append) as f:
+        async for item in data:
             f.write(item.model_dump_json() + "\n")
+            count += 1
+    return count
+
+
+def append_jsonl(path: Path, data: Iterable[T]) -> None:
+    """Append a list of Pydantic model instances to a JSON Lines file."""
+    write_jsonl(path, data, append=True)
@@ -0,0 +1,9 @@
+import math
+
+# Rough average for OpenAI's cl100k tokenizer on Dutch prose.
+CHARS_PER_TOKEN = 3.5
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens the embedding tokenizer produces for text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
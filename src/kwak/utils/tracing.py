@@ -0,0 +1,185 @@
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import duckdb
+
+Attributes = dict[str, float | int | str]
+
+# Numeric span attributes that are summed in the summary.
+COUNTERS = (
+    "items",
+    "tokens",
+    "prompt_tokens",
+    "completion_tokens",
+    "rows_scanned",
+    "rows_returned",
+    "bytes",
+)
+
+
+@dataclass
+class Span:
+    """A timed section of the pipeline with the measurements recorded in it."""
+
+    name: str
+    start: float
+    duration: float = 0.0
+    track: int = 0
+    attributes: Attributes = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class SpanSummary:
+    """Aggregated wall time and counters of all spans sharing a name."""
+
+    name: str
+    count: int
+    total: float
+    max: float
+    counters: dict[str, float]
+
+
+class Tracer:
+    """Collects spans in memory while enabled; does nothing otherwise.
+
+    Spans of concurrent asyncio tasks and threads land on separate tracks, so
+    the Chrome trace shows them side by side instead of wrongly nested.
+    """
+
+    def __init__(self) -> None:
+        """Create a disabled tracer."""
+        self.enabled = False
+        self.spans: list[Span] = []
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._current: ContextVar[Span | None] = ContextVar("span", default=None)
+        self._profile_dir: tempfile.TemporaryDirectory[str] | None = None
+
+    def enable(self) -> None:
+        """Start recording spans, measured from now."""
+        self.enabled = True
+        self.spans.clear()
+        self.origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: float | str) -> Iterator[Attributes]:
+        """Time the enclosed block as a span named name.
+
+        Yields the span's attribute dict, so the block can add measurements
+        such as token usage once they are known.
+        """
+        if not self.enabled:
+            yield {}
+            return
+
+        span = Span(name, time.perf_counter(), track=_track(), attributes=attributes)
+        token = self._current.set(span)
+        try:
+            yield span.attributes
+        finally:
+            span.duration = time.perf_counter() - span.start
+            self._current.reset(token)
+            with self._lock:
+                self.spans.append(span)
+
+    def annotate(self, **attributes: float | str) -> None:
+        """Add measurements to the innermost open span, if any.
+
+        Lets providers report e.g. token usage from deep inside a traced call.
+        """
+        span = self._current.get()
+        if span is not None:
+            span.attributes.update(attributes)
+
+    @contextlib.contextmanager
+    def query(
+        self, con: duckdb.DuckDBPyConnection, name: str, **attributes: float | str
+    ) -> Iterator[Attributes]:
+        """Time DuckDB work as a span, adding rows scanned and bytes returned.
+
+        DuckDB's JSON profiler is switched on for the connection; the counters
+        are those of the last query run inside the block, if it ran any.
+        """
+        if not self.enabled:
+            yield {}
+            return
+
+        if self._profile_dir is None:
+            self._profile_dir = tempfile.TemporaryDirectory(prefix="kwak-profile-")
+        output = Path(self._profile_dir.name) / f"{id(con)}.json"
+        con.execute("PRAGMA enable_profiling = 'json'")
+        con.execute(f"PRAGMA profiling_output = '{output}'")
+        output.unlink(missing_ok=True)
+        with self.span(name, **attributes) as attrs:
+            yield attrs
+            with contextlib.suppress(OSError, ValueError):
+                profile = json.loads(output.read_text(encoding="utf-8"))
+                # Counters the block recorded itself take precedence
+                attrs.setdefault("rows_scanned", profile["cumulative_rows_scanned"])
+                attrs.setdefault("rows_returned", profile["rows_returned"])
+                attrs.setdefault("bytes", profile["result_set_size"])
+
+    def summary(self) -> list[SpanSummary]:
+        """Aggregate the recorded spans per name, in order of first occurrence."""
+        grouped: dict[str, list[Span]] = {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            grouped.setdefault(span.name, []).append(span)
+
+        summaries = []
+        for name, spans in grouped.items():
+            counters: dict[str, float] = {}
+            for span in spans:
+                for key in COUNTERS:
+                    value = span.attributes.get(key)
+                    if isinstance(value, int | float):
+                        counters[key] = counters.get(key, 0) + value
+            durations = [span.duration for span in spans]
+            summaries.append(
+                SpanSummary(name, len(spans), sum(durations), max(durations), counters)
+            )
+        return summaries
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Write the spans as a Chrome trace (chrome://tracing, Perfetto)."""
+        tracks = {
+            track: i
+            for i, track in enumerate(dict.fromkeys(s.track for s in self.spans))
+        }
+        events = [
+            {
+                "name": span.name,
+                "ph": "X",
+                "ts": (span.start - self.origin) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": os.getpid(),
+                "tid": tracks[span.track],
+                "args": span.attributes,
+            }
+            for span in self.spans
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}) + "\n",
+            encoding="utf-8",
+        )
+
+
+def _track() -> int:
+    """Identify the asyncio task, or else the thread, a span runs in."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return id(task) if task is not None else threading.get_ident()
+
+
+TRACER = Tracer()
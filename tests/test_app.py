@@ -0,0 +1,21 @@
+import duckdb
+import pytest
+
+from kwak.api.app import error_response
+
+
+@pytest.mark.parametrize(
+    ("error", "status_code"),
+    [
+        pytest.param(ValueError("Unsupported model"), 400, id="invalid-request"),
+        pytest.param(RuntimeError("No snapshot loaded"), 503, id="not-ready"),
+        pytest.param(duckdb.CatalogException("No index"), 400, id="missing-index"),
+        pytest.param(duckdb.IOException("Disk failure"), 503, id="database-failure"),
+    ],
+)
+def test_error_response(error: Exception, status_code: int) -> None:
+    """Request errors map to a JSON body carrying the message."""
+    response = error_response(error)
+
+    assert response.status_code == status_code
+    assert response.body == f'{{"error":"{error}"}}'.encode()
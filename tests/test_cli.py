@@ -0,0 +1,34 @@
+import json
+import subprocess
+import sys
+
+# Seconds `import kwak.cli` may take; importing the providers' SDKs on top of
+# it takes about three times as long as the lazy import itself.
+IMPORT_BUDGET = 2.5
+# Modules only commands using a provider or vectors may import
+HEAVY_MODULES = ("openai", "pydantic_ai", "numpy")
+
+IMPORT_CLI = f"""
+import json, sys, time
+start = time.perf_counter()
+import kwak.cli
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "elapsed": elapsed,
+    "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def test_cli_imports_lazily() -> None:
+    """Importing the CLI leaves provider SDKs and numpy unloaded, and is fast."""
+    output = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", IMPORT_CLI],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    result = json.loads(output)
+
+    assert result["loaded"] == []
+    assert result["elapsed"] < IMPORT_BUDGET
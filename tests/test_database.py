@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import pytest
+
+from kwak.services.database import Database, DatabaseSettings
+
+
+@pytest.fixture
+def database(tmp_path: Path) -> Database:
+    """Open a database holding a dossiers table with an index."""
+    database = Database(DatabaseSettings(path=tmp_path / "kwak.db"))
+    with database.writer() as con:
+        con.execute("CREATE TABLE dossiers (id VARCHAR PRIMARY KEY, titel VARCHAR)")
+        con.execute("INSERT INTO dossiers VALUES ('a', 'Eerste'), ('b', 'Tweede')")
+        con.execute("CREATE INDEX dossiers_titel ON dossiers (titel)")
+    return database
+
+
+def titles(database: Database) -> list[str]:
+    """Return the dossier titles in id order."""
+    with database.reader() as con:
+        rows = con.execute("SELECT titel FROM dossiers ORDER BY id").fetchall()
+    return [row[0] for row in rows]
+
+
+def test_swaps_in_written_copy(database: Database) -> None:
+    """Writes land in the database once the block completes."""
+    with database.writer() as con:
+        con.execute("UPDATE dossiers SET titel = 'Nieuw' WHERE id = 'a'")
+        # Readers still see the database file as it was
+        reader = Database(database.settings)
+        assert titles(reader) == ["Eerste", "Tweede"]
+        reader.close()
+
+    assert titles(database) == ["Nieuw", "Tweede"]
+    with database.reader() as con:
+        indexes = con.execute("SELECT index_name FROM duckdb_indexes()").fetchall()
+        constraints = con.execute(
+            "SELECT constraint_type FROM duckdb_constraints() "
+            "WHERE constraint_type = 'PRIMARY KEY'"
+        ).fetchall()
+    assert indexes == [("dossiers_titel",)]
+    assert constraints == [("PRIMARY KEY",)]
+
+
+def test_writes_while_file_is_read(database: Database) -> None:
+    """An open reader neither blocks a write nor sees it until it reopens."""
+    reader = Database(database.settings)
+    assert titles(reader) == ["Eerste", "Tweede"]
+
+    with database.writer() as con:
+        con.execute("DELETE FROM dossiers WHERE id = 'b'")
+
+    assert titles(reader) == ["Eerste", "Tweede"]
+    reader.close()
+    assert titles(reader) == ["Eerste"]
+
+
+def test_discards_failed_write(database: Database) -> None:
+    """A block that raises leaves the database untouched."""
+
+    def fail() -> None:
+        with database.writer() as con:
+            con.execute("DELETE FROM dossiers")
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        fail()
+
+    assert titles(database) == ["Eerste", "Tweede"]
+    assert not any(database.settings.path.parent.glob("*.staging*"))
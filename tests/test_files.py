@@ -0,0 +1,42 @@
+import asyncio
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+from pydantic import BaseModel
+
+from kwak.utils.files import awrite_jsonl, iter_jsonl
+
+
+class Record(BaseModel):
+    """A JSON Lines record."""
+
+    n: int
+
+
+def test_failed_write_keeps_previous_file(tmp_path: Path) -> None:
+    """A stream that fails halfway leaves the file as it was."""
+    path = tmp_path / "records.jsonl"
+    path.write_text('{"n": 1}\n')
+
+    async def records() -> AsyncIterator[Record]:
+        yield Record(n=2)
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(awrite_jsonl(path, records()))
+
+    assert list(iter_jsonl(path, Record)) == [Record(n=1)]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_completed_write_replaces_file(tmp_path: Path) -> None:
+    """A stream that completes replaces the file."""
+    path = tmp_path / "records.jsonl"
+    path.write_text('{"n": 1}\n')
+
+    async def records() -> AsyncIterator[Record]:
+        yield Record(n=2)
+
+    assert asyncio.run(awrite_jsonl(path, records())) == 1
+    assert list(iter_jsonl(path, Record)) == [Record(n=2)]
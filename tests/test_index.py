@@ -0,0 +1,49 @@
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from kwak.services.rag.index import (
+    create_hnsw_index,
+    load_vss,
+    nearest_sql,
+    similarity_order,
+)
+from kwak.services.rag.ingest import ensure_chunk_table
+from kwak.services.rag.vectors import vector_literal
+
+ROOT = Path(__file__).resolve().parents[1]
+DIMENSION = 4
+
+
+@pytest.fixture
+def con(monkeypatch: pytest.MonkeyPatch) -> duckdb.DuckDBPyConnection:
+    """Open an in-memory database holding a few chunks, with VSS loaded."""
+    monkeypatch.chdir(ROOT)
+    con = duckdb.connect()
+    try:
+        load_vss(con)
+    except duckdb.Error as e:
+        pytest.skip(f"VSS extension unavailable: {e}")
+    ensure_chunk_table(con, DIMENSION)
+    con.execute(
+        """
+        INSERT INTO chunk_embeddings (chunk_id, content_hash, embedding)
+        SELECT 'D1:omschrijving:' || i, 'h' || i, [i, 1, 0, -i]::FLOAT[4]
+        FROM range(100) t(i)
+        """
+    )
+    return con
+
+
+def test_nearest_query_uses_hnsw_index(con: duckdb.DuckDBPyConnection) -> None:
+    """An unfiltered nearest-chunks query is answered from the HNSW index."""
+    create_hnsw_index(con)
+    order = similarity_order("embedding", "$query", exact=False, dimension=DIMENSION)
+
+    plan = con.execute(
+        f"EXPLAIN {nearest_sql('chunk_id', order)}",
+        {"query": vector_literal([1.0, 0.0, 0.0, 0.0]), "limit": 3},
+    ).fetchall()
+
+    assert "HNSW_INDEX_SCAN" in "".join(row[1] for row in plan)
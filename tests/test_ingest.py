@@ -0,0 +1,183 @@
+import asyncio
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from kwak.schemas.dossier import ChunkRecord
+from kwak.services.embedding.local import LocalEmbeddingProvider
+from kwak.services.rag.ingest import (
+    SyncReport,
+    ensure_chunk_table,
+    ingest_dossiers,
+    stored_dimension,
+    sync_chunk_embeddings,
+)
+from kwak.utils.files import iter_jsonl
+
+ROOT = Path(__file__).resolve().parents[1]
+OLD_DIMENSION = 4
+NEW_DIMENSION = 8
+HEADER = (
+    "Dossier: Test\nType: Project\nPeriode: 2024-01-01 tot 2024-12-31\n"
+    "Goedgekeurd budget: €1,000.00\n\n"
+)
+
+# chunk_embeddings as created by the last release, before content hashing
+BASELINE_SCHEMA = """
+CREATE TABLE chunk_embeddings (
+    dossier_id VARCHAR,
+    origin VARCHAR,
+    index INTEGER,
+    content TEXT,
+    embedding FLOAT[4]
+)
+"""
+
+
+@pytest.fixture
+def con(monkeypatch: pytest.MonkeyPatch) -> duckdb.DuckDBPyConnection:
+    """Open an in-memory database, with the SQL scripts reachable from the cwd."""
+    monkeypatch.chdir(ROOT)
+    return duckdb.connect()
+
+
+def columns(con: duckdb.DuckDBPyConnection) -> list[str]:
+    """Return the column names of chunk_embeddings in order."""
+    return [row[0] for row in con.execute("DESCRIBE chunk_embeddings").fetchall()]
+
+
+def test_creates_missing_table(con: duckdb.DuckDBPyConnection) -> None:
+    """A database without chunks gets the current table."""
+    ensure_chunk_table(con, OLD_DIMENSION)
+
+    assert stored_dimension(con) == OLD_DIMENSION
+    assert "embedding_bits" in columns(con)
+
+
+def test_replaces_baseline_table(con: duckdb.DuckDBPyConnection) -> None:
+    """The table from before content hashing is replaced by an empty one."""
+    con.execute(BASELINE_SCHEMA)
+    con.execute(
+        "INSERT INTO chunk_embeddings VALUES ('D1', 'omschrijving', 0, $c, $e)",
+        {"c": HEADER + "tekst", "e": [1.0, 0.0, 0.0, 0.0]},
+    )
+
+    ensure_chunk_table(con, OLD_DIMENSION)
+
+    assert "start_offset" in columns(con)
+    assert con.execute("SELECT count(*) FROM chunk_embeddings").fetchone() == (0,)
+
+
+def test_replaces_table_of_another_dimension(con: duckdb.DuckDBPyConnection) -> None:
+    """A table of vectors of another dimension is replaced by an empty one."""
+    ensure_chunk_table(con, OLD_DIMENSION)
+    con.execute(
+        "INSERT INTO chunk_embeddings (chunk_id, content_hash, embedding) "
+        "VALUES ('D1:omschrijving:0', 'h', $e)",
+        {"e": [1.0, 0.0, 0.0, 0.0]},
+    )
+
+    ensure_chunk_table(con, NEW_DIMENSION)
+
+    assert stored_dimension(con) == NEW_DIMENSION
+    assert con.execute("SELECT count(*) FROM chunk_embeddings").fetchone() == (0,)
+
+
+def sync(con: duckdb.DuckDBPyConnection, path: Path) -> SyncReport:
+    """Sync chunk_embeddings with a chunk file as embed-chunks does."""
+    skipped: list[int] = []
+    chunks = iter_jsonl(path, ChunkRecord, on_skip=skipped.append)
+    embedder = LocalEmbeddingProvider(dimensions=OLD_DIMENSION)
+    return asyncio.run(
+        sync_chunk_embeddings(con, chunks, embedder, complete=lambda: not skipped)
+    )
+
+
+def chunk_line(index: int) -> str:
+    """Return the JSON line of a chunk of dossier D1."""
+    return ChunkRecord(
+        dossier_id="D1",
+        origin="omschrijving",
+        index=index,
+        start=None,
+        end=None,
+        content=f"tekst {index}",
+    ).model_dump_json()
+
+
+@pytest.fixture
+def synced(con: duckdb.DuckDBPyConnection, tmp_path: Path) -> Path:
+    """Store two embedded chunks; returns the path of a chunk file to overwrite."""
+    con.execute(
+        Path("queries/create_dossiers.sql")
+        .read_text()
+        .replace("$table_name", "dossiers")
+    )
+    path = tmp_path / "chunks.jsonl"
+    path.write_text(f"{chunk_line(0)}\n{chunk_line(1)}\n")
+    assert sync(con, path).new == 2  # noqa: PLR2004
+    return path
+
+
+def test_sync_prunes_removed_chunks(
+    con: duckdb.DuckDBPyConnection, synced: Path
+) -> None:
+    """Chunks missing from a cleanly read chunk file are removed."""
+    synced.write_text(f"{chunk_line(0)}\n")
+
+    report = sync(con, synced)
+
+    assert (report.removed, report.kept) == (1, 0)
+    assert con.execute("SELECT count(*) FROM chunk_embeddings").fetchone() == (1,)
+
+
+def test_sync_keeps_chunks_when_file_is_empty(
+    con: duckdb.DuckDBPyConnection, synced: Path
+) -> None:
+    """An empty chunk file removes nothing."""
+    synced.write_text("")
+
+    report = sync(con, synced)
+
+    assert (report.removed, report.kept) == (0, 2)
+    assert con.execute("SELECT count(*) FROM chunk_embeddings").fetchone() == (2,)
+
+
+def test_sync_keeps_chunks_when_lines_are_malformed(
+    con: duckdb.DuckDBPyConnection, synced: Path
+) -> None:
+    """Chunks missing from a file with malformed lines are kept, and reused."""
+    synced.write_text(f"{{not json\n{chunk_line(0)}\n")
+
+    report = sync(con, synced)
+
+    assert (report.removed, report.kept) == (0, 1)
+    assert con.execute("SELECT count(*) FROM chunk_embeddings").fetchone() == (2,)
+    synced.write_text(f"{chunk_line(0)}\n{chunk_line(1)}\n")
+    assert (sync(con, synced).new, sync(con, synced).reused) == (0, 2)
+
+
+def dossier_line(id_: str, type_: str) -> str:
+    """Return a JSON Lines record of a dossier of the given type."""
+    return (
+        f'{{"id": "{id_}", "titel": "Dossier {id_}", "type": "{type_}", '
+        '"startdatum": "2024-01-01", "einddatum": "2024-12-31", '
+        '"goedgekeurd_budget": 1000.0, "omschrijving": "tekst", "advies": "tekst"}'
+    )
+
+
+def test_ingest_keeps_dossiers_in_filter_order(
+    con: duckdb.DuckDBPyConnection, tmp_path: Path
+) -> None:
+    """Dossiers of a later ingest are sorted in among the earlier ones."""
+    path = tmp_path / "dossiers.jsonl"
+    path.write_text(f"{dossier_line('a', 'erfgoed')}\n{dossier_line('b', 'sport')}\n")
+    ingest_dossiers(con, path)
+    path.write_text(f"{dossier_line('c', 'cultuur')}\n{dossier_line('b', 'natuur')}\n")
+
+    report = ingest_dossiers(con, path)
+
+    assert (report.inserted, report.updated) == (1, 1)
+    rows = con.execute("SELECT id, type FROM dossiers ORDER BY rowid").fetchall()
+    assert rows == [("c", "cultuur"), ("a", "erfgoed"), ("b", "natuur")]
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from kwak.services.rag.ingest import ensure_chunk_table
+from kwak.services.vectorstores import numpy as numpy_store
+from kwak.services.vectorstores.numpy import NumpyVectorStore
+
+ROOT = Path(__file__).resolve().parents[1]
+DIMENSION = 4
+
+
+def add_chunk(path: Path, index: int) -> None:
+    """Store a chunk in the database file, creating its table if needed."""
+    with duckdb.connect(str(path)) as con:
+        ensure_chunk_table(con, DIMENSION)
+        con.execute(
+            "INSERT INTO chunk_embeddings (chunk_id, content_hash, embedding) "
+            "VALUES ($id, $hash, [1, 0, 0, 0])",
+            {"id": f"D1:omschrijving:{index}", "hash": f"h{index}"},
+        )
+
+
+def test_numpy_store_checks_chunks_once_per_change(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Whether the store is current is re-checked only once the files change."""
+    monkeypatch.chdir(ROOT)
+    path = tmp_path / "kwak.db"
+    add_chunk(path, 0)
+    with duckdb.connect(str(path)) as con:
+        NumpyVectorStore(con, path=tmp_path / "vectors").build()
+
+    scans: list[None] = []
+    fingerprint = numpy_store.content_fingerprint
+
+    def counted(con: duckdb.DuckDBPyConnection) -> str:
+        scans.append(None)
+        return fingerprint(con)
+
+    monkeypatch.setattr(numpy_store, "content_fingerprint", counted)
+
+    def is_built() -> bool:
+        with duckdb.connect(str(path), read_only=True) as con:
+            return NumpyVectorStore(con, path=tmp_path / "vectors").is_built()
+
+    assert is_built()
+    assert is_built()
+    assert len(scans) == 1
+
+    add_chunk(path, 1)
+
+    assert not is_built()
+    assert len(scans) == 2  # noqa: PLR2004